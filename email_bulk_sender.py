@@ -4,9 +4,32 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email.header import Header
-from email.utils import formataddr
-from email import encoders
+from email.utils import formataddr, getaddresses
+from email.generator import BytesGenerator
+from email import encoders, base64mime
+from email.policy import compat32
 import time
+import threading
+import asyncio
+import ssl
+import io
+import queue
+import re
+import copy
+import functools
+import itertools
+import base64
+import bisect
+import contextlib
+import hashlib
+import heapq
+import random
+import signal
+import socket
+import sqlite3
+from collections import OrderedDict, deque
+from collections.abc import Mapping, Sequence, Sized
+from array import array
 from getpass import getpass
 import os
 from urllib.parse import quote
@@ -14,8 +37,9 @@ import mimetypes
 import chardet
 import argparse
 import json
+import sys
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Iterable, Iterator
 
 # ==================== 内部モジュール定義 ====================
 # i18n.py と config.py が存在しない場合に使用される内部定義
@@ -31,6 +55,7 @@ class I18n:
             'cli_smtp_port': 'SMTPポート (デフォルト: 587)',
             'cli_email_address': '送信元メールアドレス',
             'cli_email_password': 'メールパスワード',
+            'cli_profile_password': '送信元アカウント {0} のパスワード',
             'cli_sender_name': '送信元表示名 (不要ならEnter)',
             'cli_csv_file': '受信者リストCSVファイル (デフォルト: list.csv)',
             'cli_template_file': 'メールテンプレートファイル (デフォルト: body.txt)',
@@ -40,16 +65,48 @@ class I18n:
             'cli_confirm_header': '\n=== 送信内容確認 ===',
             'cli_confirm_send': '\n送信を開始しますか？ (yes/no)',
             'cli_cancelled': '送信をキャンセルしました',
+            'cli_pause_hint': '（Ctrl-C で一時停止できます）',
+            'cli_paused': '\n一時停止しました（送信中のメールは送り切ります）。Enterキーで再開、もう一度 Ctrl-C で中止します',
+            'cli_resumed': '送信を再開します',
+            'error_excel_support': 'Excelファイルを読み込むには openpyxl が必要です。pip install openpyxl でインストールしてください',
+            'error_excel_columns': 'Excelファイルに必要な列がありません。必要な列: 所属/affiliation, 氏名/name, メールアドレス/email',
+            'cli_cancelling': '\n送信を中止しています（送信中のメールは送り切ります）...',
             'preview_subject': '件名: {0}',
             'preview_recipients': '送信先: {0}件',
             'preview_sender': '送信元: {0}',
+            'preview_profile': '  送信元アカウント: {0} <{1}> (24時間の上限: {2})',
             'preview_cc': 'CC: {0}',
             'preview_bcc': 'BCC: {0}',
             'preview_reply_to': 'Reply-To: {0}',
             'preview_attachments': '添付ファイル: {0}',
             'send_success': '[{0}/{1}] 送信成功: {2} {3} ({4})',
             'send_failed': '[{0}/{1}] 送信失敗: {2} {3} ({4}) - {5}',
+            'send_refused': '    宛先拒否: {0} - {1} {2}',
+            'send_deferred': '[{0}/{1}] 再送待ち: {2} {3} ({4}) - {5}（{6:.0f}秒後に再送 {7}/{8}）',
+            'send_gave_up': '[{0}/{1}] 送信断念: {2} {3} ({4}) - {5}（{6}回再送しても失敗）',
             'send_complete': '送信完了: 成功 {0}件, 失敗 {1}件',
+            'send_summary': '  うち再送後に成功 {0}件 / 恒久的な失敗 {1}件 / 再送上限で断念 {2}件',
+            'rate_adjusted': '送信レートを調整しました: {0}',
+            'rate_paused': 'サーバーからの制限応答のため {0:.0f}秒間 送信を一時停止します',
+            'rate_per_minute': '{0:.1f}通/分',
+            'rate_unlimited': '制限なし',
+            'resume_skipped': '送信済みの {0}件をスキップして再開します',
+            'preview_sink': '出力先: {0}（送信せずにファイルに書き出します）',
+            'sink_written': '{0}件を {1} に書き出しました（{2:.1f}秒、{3:.0f}通/秒）',
+            'sink_failed': '書き出しに失敗しました: {0}',
+            'spool_not_found': 'スプールディレクトリが見つかりません: {0}',
+            'spool_waiting': '送信待ちのメッセージがありません。準備が完了するまで待機します...',
+            'spool_retry': 'SMTPサーバーに接続できません: {0}（{1:.0f}秒後に再試行します）',
+            'spool_drained': 'スプールの送信を終了しました: 成功 {0}件, 失敗 {1}件, 送信待ち {2}件',
+            'queue_created': '{0}件の受信者をキューに登録しました: {1}',
+            'queue_exists': 'キューが既に存在します: {0}',
+            'queue_not_found': 'キューが見つかりません: {0}',
+            'queue_worker_started': 'ワーカー {0} を開始します（送信待ち {1}件 / 全{2}件）',
+            'queue_waiting': '送信中・再送待ちの受信者が残っています（{0}件）。終了を待っています...',
+            'queue_worker_done': 'ワーカーを終了しました: 成功 {0}件, 失敗 {1}件（キュー全体の送信待ち {2}件, 結果不明 {3}件）',
+            'benchmark_render_header': '\n=== メッセージ作成のベンチマーク（{0}通） ===',
+            'benchmark_render_result': '{0}: {1:.1f} µs/通',
+            'benchmark_render_speedup': 'スケルトンは {0:.1f} 倍高速です',
         },
         'en': {
             'cli_title': '=== Email Bulk Sender ===',
@@ -57,6 +114,7 @@ class I18n:
             'cli_smtp_port': 'SMTP Port (default: 587)',
             'cli_email_address': 'Sender Email Address',
             'cli_email_password': 'Email Password',
+            'cli_profile_password': 'Password for sender profile {0}',
             'cli_sender_name': 'Sender Display Name (press Enter to skip)',
             'cli_csv_file': 'Recipient List CSV File (default: list.csv)',
             'cli_template_file': 'Email Template File (default: body.txt)',
@@ -66,16 +124,48 @@ class I18n:
             'cli_confirm_header': '\n=== Confirm Sending Details ===',
             'cli_confirm_send': '\nStart sending? (yes/no)',
             'cli_cancelled': 'Sending cancelled',
+            'cli_pause_hint': '(Press Ctrl-C to pause)',
+            'cli_paused': '\nPaused (messages in flight will finish). Press Enter to resume, or Ctrl-C again to cancel',
+            'cli_resumed': 'Resuming',
+            'error_excel_support': 'Excel file support requires openpyxl. Install it with: pip install openpyxl',
+            'error_excel_columns': 'Required columns not found in Excel file. Expected: 所属/affiliation, 氏名/name, メールアドレス/email',
+            'cli_cancelling': '\nCancelling (messages in flight will finish)...',
             'preview_subject': 'Subject: {0}',
             'preview_recipients': 'Recipients: {0}',
             'preview_sender': 'Sender: {0}',
+            'preview_profile': '  Sender profile: {0} <{1}> (24h quota: {2})',
             'preview_cc': 'CC: {0}',
             'preview_bcc': 'BCC: {0}',
             'preview_reply_to': 'Reply-To: {0}',
             'preview_attachments': 'Attachments: {0}',
             'send_success': '[{0}/{1}] Success: {2} {3} ({4})',
             'send_failed': '[{0}/{1}] Failed: {2} {3} ({4}) - {5}',
+            'send_deferred': '[{0}/{1}] Deferred: {2} {3} ({4}) - {5} (retry {7}/{8} in {6:.0f}s)',
+            'send_gave_up': '[{0}/{1}] Gave up: {2} {3} ({4}) - {5} (failed after {6} retries)',
+            'send_refused': '    Recipient refused: {0} - {1} {2}',
             'send_complete': 'Sending complete: {0} succeeded, {1} failed',
+            'send_summary': '  Delivered after retry: {0}, permanently failed: {1}, gave up after retries: {2}',
+            'rate_adjusted': 'Send rate adjusted: {0}',
+            'rate_paused': 'Pausing for {0:.0f} seconds due to server throttling',
+            'rate_per_minute': '{0:.1f}/min',
+            'rate_unlimited': 'unlimited',
+            'resume_skipped': 'Resuming: skipping {0} already delivered recipients',
+            'preview_sink': 'Output: {0} (messages are written to files, not sent)',
+            'sink_written': 'Wrote {0} messages to {1} ({2:.1f}s, {3:.0f} messages/s)',
+            'sink_failed': 'Failed to write messages: {0}',
+            'spool_not_found': 'Spool directory not found: {0}',
+            'spool_waiting': 'No messages waiting; waiting for preparation to finish...',
+            'spool_retry': 'Cannot connect to SMTP server: {0} (retrying in {1:.0f}s)',
+            'spool_drained': 'Spool drain finished: {0} succeeded, {1} failed, {2} still queued',
+            'queue_created': 'Queued {0} recipients in {1}',
+            'queue_exists': 'Queue already exists: {0}',
+            'queue_not_found': 'Queue not found: {0}',
+            'queue_worker_started': 'Worker {0} started ({1} pending of {2})',
+            'queue_waiting': '{0} recipients are still being sent or waiting for a retry; waiting...',
+            'queue_worker_done': 'Worker finished: {0} succeeded, {1} failed ({2} pending and {3} unknown in the whole queue)',
+            'benchmark_render_header': '\n=== Message render benchmark ({0} messages) ===',
+            'benchmark_render_result': '{0}: {1:.1f} µs/message',
+            'benchmark_render_speedup': 'Skeleton is {0:.1f}x faster',
         }
     }
 
@@ -116,8 +206,12 @@ class InternalConfigManager:
             "version": self.CONFIG_VERSION,
             "sender": {"email_address": "", "display_name": ""},
             "files": {"csv_file": "", "template_file": "", "attachments": []},
-            "email_options": {"cc": "", "bcc": "", "reply_to": "", "send_delay": 5},
-            "ui": {"language": "ja"}
+            "email_options": {"cc": "", "bcc": "", "reply_to": "", "send_delay": 5, "rate_limits": {}, "adaptive_throttle": {}, "retry": {},
+                              "recycle_messages": 0, "recycle_minutes": 0,
+                              "connections": 1, "engine": "thread", "daily_quota": 0,
+                              "render_ahead": 16, "stream_attachments_mb": 10, "domain_limits": {}},
+            "profiles": [],
+            "ui": {"language": "ja", "cache_recipients": False}
         }
         if self.config_type == "email":
             base_config["smtp"] = {"server": "", "port": 587}
@@ -174,6 +268,30 @@ try:
 except ImportError:
     EXCEL_SUPPORT = False
 
+# keyring対応（GUI版で保存したパスワードを読み込む）
+try:
+    import keyring
+    KEYRING_SUPPORT = True
+except ImportError:
+    KEYRING_SUPPORT = False
+
+KEYRING_SERVICE = "email_bulk_sender"
+
+
+def load_saved_password(email_address: str) -> Optional[str]:
+    """GUI版がkeyringに保存したパスワードを読み込む（keyringがない・保存されていない場合は None）"""
+    if not KEYRING_SUPPORT or not email_address:
+        return None
+    try:
+        return keyring.get_password(KEYRING_SERVICE, email_address)
+    except Exception:
+        return None
+
+
+def read_password(email_address: str, prompt: str) -> str:
+    """keyringに保存されたパスワードを返す（なければ入力を求める）"""
+    return load_saved_password(email_address) or getpass(prompt + ": ")
+
 # ==================== 設定セクション ====================
 # ここで送信元情報とSMTPサーバー設定をしてください
 
@@ -216,6 +334,51 @@ DEFAULT_ATTACHMENTS = ""  # 例: "file1.pdf,file2.docx"
 # 推奨値: 少量(~50通)=3-5秒, 中量(50-100通)=5-10秒, 大量(100通以上)=10秒以上
 DEFAULT_SEND_DELAY = 5  # デフォルト: 5秒
 
+# 送信エンジン - "thread"（接続ごとにスレッド）または "async"（asyncioで1スレッドに多重化）
+DEFAULT_ENGINE = "thread"
+
+# 送信レート制限（Noneの場合は送信間隔 DEFAULT_SEND_DELAY から算出）
+# 期間ごとの上限通数を指定します。数値の代わりに {"limit": 100, "burst": 10} と書くと
+# 連続して送信できる通数（バースト）も指定できます（省略時は1通）
+# 全ての接続・送信エンジンで共有されます
+DEFAULT_RATE_LIMITS = None  # 例: {"per_minute": 100, "per_day": {"limit": 2000, "burst": 200}}
+
+# 自動スロットリング - サーバーが 421/450/451 で制限を返したら送信レートを下げ、
+# 成功が続いたら設定上限まで戻します（Noneの場合は既定値で有効）
+DEFAULT_ADAPTIVE_THROTTLE = None  # 例: {"enabled": True, "decrease": 0.5, "increase": 0.05, "pause": 30}
+
+# 再送 - 一時的なエラー（4xx応答、切断）になった受信者を指数バックオフ（ジッター付き）で再送します
+# 5xx応答は恒久的な失敗として再送しません（Noneの場合は既定値: 最大3回、60秒から倍々に最大30分）
+DEFAULT_RETRY = None  # 例: {"max_retries": 3, "base_delay": 60, "max_delay": 1800}
+
+# 接続の張り替え - 1接続あたりの送信通数・経過時間（分）が上限に達したら接続し直します
+# 1セッションあたりの送信数を制限している中継サーバー向け（0の場合は張り替えなし）
+DEFAULT_RECYCLE_MESSAGES = 0  # 例: 100
+DEFAULT_RECYCLE_MINUTES = 0  # 例: 10
+
+# メッセージの先読み数 - SMTP送信がネットワークやレート制限を待っている間に、
+# 別スレッドで次のメッセージ（差し込み・MIME組み立て・エンコード済み）を作成しておく件数
+# 作成済みのメッセージはこの件数までしか保持しないため、メモリ使用量は一定です（0の場合は先読みなし）
+DEFAULT_RENDER_AHEAD = 16
+
+# 添付ファイルのストリーミング - このサイズ（MB）以上の添付ファイルはメモリに読み込まず、
+# 送信時にファイルから少しずつBase64エンコードしてSMTPのDATAに直接書き出します
+# 同時に送信中のメッセージが使うメモリは添付ファイルのサイズではなく読み込み単位で決まります（0の場合は常に読み込む）
+DEFAULT_STREAM_ATTACHMENTS_MB = 10
+
+# 1日の送信上限 - 送信元アカウントが直近24時間に送信できる通数（0の場合は無制限）
+# 送信ジャーナルの記録から集計し、上限に達したら設定ファイルの profiles の他のアカウントで送信します
+DEFAULT_DAILY_QUOTA = 0  # 例: 2000
+
+# 同時SMTP接続数 - 各接続が共有キューから受信者を取り出して並列送信します
+# 送信レートは全接続の合計に対して適用されます（中継サーバーが許可する同時接続数以内で設定してください）
+DEFAULT_CONNECTIONS = 1  # デフォルト: 1（従来どおりの逐次送信）
+
+# 受信者ドメインごとの上限 - 指定すると受信者をドメインごとに順番に並べ替えて送信し、
+# ドメインごとの同時送信数（concurrency）と期間ごとの上限通数（DEFAULT_RATE_LIMITS と同じ形式）を適用します
+# キーのドメインのサブドメインも同じ上限を共有します。"*" はその他の各ドメインに個別に適用されます
+DEFAULT_DOMAIN_LIMITS = None  # 例: {"gmail.com": {"concurrency": 2, "per_minute": 60}, "*": {"concurrency": 4}}
+
 # =======================================================
 
 class EmailBulkSender:
@@ -235,6 +398,8 @@ class EmailBulkSender:
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.sender_display_name = sender_display_name
+        # 添付ファイルはキャンペーン中に一度だけエンコードして全メッセージで共有する
+        self.attachment_cache = AttachmentCache()
     
     def _get_safe_local_hostname(self) -> str:
         """SMTP EHLO用の安全なローカルホスト名を取得（非ASCIIコンピュータ名対応）"""
@@ -246,378 +411,4588 @@ class EmailBulkSender:
         except UnicodeEncodeError:
             return 'localhost'
 
-    def read_recipients(self, csv_file, i18n=None):
-        """
-        CSVまたはExcelファイルから受信者リストを読み込む（文字コード自動検出）
+    def connect_smtp(self):
+        """
+        SMTPサーバーに接続してログイン済みのセッションを返す
+
+        Returns:
+            smtplib.SMTP または smtplib.SMTP_SSL インスタンス
+        """
+        # ポート465はSSL、それ以外はTLSを使用
+        local_hostname = self._get_safe_local_hostname()
+        if self.smtp_port == 465:
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, local_hostname=local_hostname)
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, local_hostname=local_hostname)
+            server.starttls()
+        server.login(self.email_address, self.email_password)
+        return server
+
+    async def connect_smtp_async(self) -> 'AsyncSmtpClient':
+        """
+        SMTPサーバーにasyncioで接続してログイン済みのクライアントを返す
+
+        Returns:
+            AsyncSmtpClient インスタンス
+        """
+        client = AsyncSmtpClient(self.smtp_server, self.smtp_port,
+                                 local_hostname=self._get_safe_local_hostname())
+        try:
+            await client.connect()
+            await client.login(self.email_address, self.email_password)
+        except Exception:
+            client.close()
+            raise
+        return client
+
+    def read_recipients(self, csv_file, i18n=None, sheet=None, rows=None):
+        """
+        CSVまたはExcelファイルから受信者リストを読み込む（文字コード自動検出）
+
+        Args:
+            csv_file: CSVまたはExcelファイルのパス（所属,氏名,メールアドレスの形式）
+            i18n: 国際化インスタンス
+            sheet: Excelファイルのシート名（省略時はアクティブなシート）
+            rows: 読み込む行番号の範囲 (最初, 最後)（シート上の行番号、ヘッダーは1行目。None は端まで）
+
+        Returns:
+            受信者の RecipientStore（各受信者は {'affiliation': '株式会社ABC', 'name': '山田太郎',
+            'email': 'yamada@example.com', ...} と同じように読み取れる。その他の列も列名をキーとして含み、
+            テンプレートの差し込みに使用できる）
+        """
+        recipients = self.iter_recipients(csv_file, i18n, sheet, rows)
+        try:
+            return RecipientStore.from_recipients(recipients)
+        finally:
+            recipients.close()
+
+    def iter_recipients(self, csv_file, i18n=None, sheet=None, rows=None):
+        """
+        CSVまたはExcelファイルの受信者を先頭から順に返す反復可能オブジェクトを作成
+
+        送信しながら1行ずつ読み込むため、受信者が多くてもファイル全体を
+        メモリに載せずに1件目から送信を始められる。
+
+        Args:
+            csv_file: CSVまたはExcelファイルのパス
+            i18n: 国際化インスタンス
+            sheet: Excelファイルのシート名（省略時はアクティブなシート）
+            rows: 読み込む行番号の範囲 (最初, 最後)（シート上の行番号、ヘッダーは1行目。None は端まで）
+
+        Returns:
+            CsvRecipients または ExcelRecipients（使い終わったら close() を呼ぶ）
+        """
+        first_row, last_row = rows or (None, None)
+
+        # ファイル拡張子で判定
+        file_ext = os.path.splitext(csv_file)[1].lower()
+
+        if file_ext == '.xlsx':
+            # Excelファイルの場合
+            if not EXCEL_SUPPORT:
+                error_msg = "Excel file support requires openpyxl. Install it with: pip install openpyxl" if i18n is None else i18n.get("error_excel_support")
+                raise ImportError(error_msg)
+
+            if i18n:
+                print(f"Reading Excel file: {csv_file}")
+            else:
+                print(f"Excelファイルを読み込み中: {csv_file}")
+
+            return ExcelRecipients(csv_file, sheet, first_row, last_row, i18n)
+        else:
+            # CSVファイルの場合
+            return self._open_csv_recipients(csv_file, i18n, first_row, last_row)
+
+    def _open_csv_recipients(self, csv_file, i18n=None, first_row=None, last_row=None) -> 'CsvRecipients':
+        """CSVファイルを開き、検出した文字コードを表示する"""
+        recipients = CsvRecipients(csv_file, first_row=first_row, last_row=last_row)
+        # i18nがない場合はデフォルトメッセージ（後方互換性のため）
+        if i18n:
+            print(f"CSV encoding: {recipients.encoding} (confidence: {recipients.confidence:.2%})")
+        else:
+            print(f"CSVファイルの文字コード: {recipients.encoding} (信頼度: {recipients.confidence:.2%})")
+        return recipients
+
+    def read_email_template(self, template_file, i18n=None):
+        """
+        メールテンプレートを読み込む（件名と本文を分離、文字コード自動検出）
+
+        Args:
+            template_file: テンプレートファイルのパス
+            i18n: 国際化インスタンス
+
+        Returns:
+            (subject, body) のタプル
+        """
+        # ファイルの文字コードを自動検出
+        with open(template_file, 'rb') as f:
+            raw_data = f.read()
+            detected = chardet.detect(raw_data)
+            encoding = detected['encoding']
+            confidence = detected['confidence']
+            # i18nがない場合はデフォルトメッセージ（後方互換性のため）
+            if i18n:
+                print(f"Template encoding: {encoding} (confidence: {confidence:.2%})")
+            else:
+                print(f"テンプレートファイルの文字コード: {encoding} (信頼度: {confidence:.2%})")
+
+        # 検出された文字コードでファイルを読み込む
+        with open(template_file, 'r', encoding=encoding) as f:
+            content = f.read()
+
+        # 件名と本文を分離（最初の行が件名、2行目は空行、3行目以降が本文）
+        lines = content.split('\n')
+
+        if len(lines) < 3:
+            # i18nがない場合はデフォルトメッセージ（後方互換性のため）
+            if i18n:
+                raise ValueError("Invalid template format. Line 1: Subject, Line 2: Empty, Line 3+: Body")
+            else:
+                raise ValueError("テンプレートファイルの形式が正しくありません。1行目: 件名、2行目: 空行、3行目以降: 本文")
+
+        subject = lines[0].strip()
+        # 2行目をスキップして3行目以降を本文とする
+        body = '\n'.join(lines[2:])
+
+        return subject, body
+    
+    def create_message(self, to_email, to_name, to_affiliation, subject_template, body_template,
+                      cc=None, bcc=None, reply_to=None, attachments=None, fields=None, boundary=None):
+        """
+        メールメッセージを作成
+
+        Args:
+            to_email: 宛先メールアドレス
+            to_name: 宛先氏名
+            to_affiliation: 宛先所属名
+            subject_template: 件名テンプレート（文字列または CompiledTemplate）
+            body_template: 本文テンプレート（文字列または CompiledTemplate）
+            cc: CCアドレス（カンマ区切りまたはリスト）
+            bcc: BCCアドレス（カンマ区切りまたはリスト）
+            reply_to: 返信先アドレス
+            attachments: 添付ファイルパスのリスト
+            fields: 差し込みに使う受信者の全ての列（受信者辞書。省略時は所属・氏名・メールアドレスのみ）
+            boundary: MIMEの境界文字列（省略時はランダム）
+
+        Returns:
+            MIMEMultipartメッセージオブジェクト
+        """
+        if fields is None:
+            fields = {'affiliation': to_affiliation, 'name': to_name, 'email': to_email}
+
+        msg = MIMEMultipart()
+        # 本文・添付ファイルとも全パートがBase64のため、境界文字列が本文と衝突することはない
+        # （先に設定しておくと、シリアライズ時に添付ファイル全体を走査して境界を探す処理を省ける）
+        msg.set_boundary(boundary or '=' * 15 + '%019d' % random.randrange(10 ** 19) + '==')
+
+        # 送信元の設定（表示名がある場合は formataddr を使用）
+        if self.sender_display_name:
+            msg['From'] = formataddr((str(Header(self.sender_display_name, 'utf-8')), self.email_address))
+        else:
+            msg['From'] = self.email_address
+
+        msg['To'] = to_email
+
+        # 件名に受信者の列を展開
+        subject = compile_template(subject_template).render(fields)
+        msg['Subject'] = Header(subject, 'utf-8')
+
+        # CC設定
+        if cc:
+            if isinstance(cc, str):
+                msg['Cc'] = cc
+            else:
+                msg['Cc'] = ', '.join(cc)
+
+        # BCC設定
+        if bcc:
+            if isinstance(bcc, str):
+                msg['Bcc'] = bcc
+            else:
+                msg['Bcc'] = ', '.join(bcc)
+
+        # Reply-To設定
+        if reply_to:
+            msg['Reply-To'] = reply_to
+
+        # 本文に受信者の列を展開
+        body = compile_template(body_template).render(fields)
+        msg.attach(MIMEText(body, 'plain', 'utf-8'))
+
+        # 添付ファイルを追加（エンコード済みのパートをキャッシュから取得）
+        if attachments:
+            for file_path in attachments:
+                part = self.attachment_cache.get(file_path)
+                if part is not None:
+                    msg.attach(part)
+
+        return msg
+    
+    def send_recipients(self, recipients, subject_template, body_template,
+                        cc=None, bcc=None, reply_to=None, attachments=None, delay=1,
+                        connections=1, on_result=None, cancel_event=None, engine="thread",
+                        rate_limits=None, adaptive_throttle=None, on_rate_change=None,
+                        recycle_messages=0, recycle_minutes=0, journal=None, retry=None, profiles=None,
+                        render_ahead=16, stream_attachments_mb=10, total=None, controller=None, sink=None,
+                        domain_limits=None):
+        """
+        受信者リストへ送信（SMTP接続プールまたはasyncioエンジンを使用）
+
+        Args:
+            recipients: 受信者の辞書リスト（total を指定した場合は受信者を順に返す任意の反復可能オブジェクト）
+            subject_template: 件名テンプレート
+            body_template: 本文テンプレート
+            cc: CCアドレス
+            bcc: BCCアドレス
+            reply_to: 返信先アドレス
+            attachments: 添付ファイルパスのリスト
+            delay: メール送信間隔（秒、rate_limits がない場合に使用）
+            connections: 同時SMTP接続数
+            on_result: 1件送信するごとに呼ばれるコールバック on_result(result, done, total)
+            cancel_event: セットされると新しい送信を止める threading.Event
+            engine: 送信エンジン（"thread" または "async"）
+            rate_limits: 送信レート制限の設定（email_options.rate_limits の形式）
+            adaptive_throttle: 自動スロットリングの設定（email_options.adaptive_throttle の形式）
+            on_rate_change: 自動スロットリングでレートが変わったときのコールバック on_rate_change(rate, pause_seconds)
+            recycle_messages: 1接続あたりの送信通数の上限（超えたら接続し直す、0は無制限）
+            recycle_minutes: 1接続あたりの経過時間（分）の上限（超えたら接続し直す、0は無制限）
+            journal: 結果を記録する SendJournal（再開用）
+            retry: 一時的なエラーの再送設定（email_options.retry の形式）
+            profiles: 送信元アカウント（SenderProfile）のリスト。指定した場合はこのインスタンスの
+                      アカウントの代わりに、各アカウントの1日の送信上限に応じて振り分けて送信する
+            render_ahead: 送信と並行して先に作成しておくメッセージ数（0の場合は送信直前に作成）
+            stream_attachments_mb: このサイズ（MB）以上の添付ファイルは送信時にファイルから
+                                   少しずつエンコードして送る（0の場合は常にメモリに読み込む）
+            total: 受信者数（recipients が len() を持たない場合に指定する）
+            controller: 一時停止・再開・中止を受け付ける SendController（指定した場合 cancel_event は不要）
+            sink: 送信の代わりにメッセージを書き出す OutputSink。指定した場合はSMTPサーバーに接続せず、
+                  レート制限・再送・送信ジャーナル・送信元アカウントの振り分けも行わない
+            domain_limits: 受信者ドメインごとの同時送信数・送信レートの上限（email_options.domain_limits の形式）。
+                           指定した場合は受信者をドメインごとに順番に並べ替えて送信する
+
+        Returns:
+            SendSummary（成功・再送後に成功・恒久的な失敗・再送上限で断念の件数）
+
+        Raises:
+            ValueError: domain_limits の形式が正しくない場合
+            TypeError: recipients が len() を持たず、total も指定されていない場合
+        """
+        # テンプレートは送信開始前に一度だけ解析する
+        subject = compile_template(subject_template)
+        body = compile_template(body_template)
+        # ファイルに書き出す場合は境界文字列を固定し、同じ入力から同じ出力になるようにする
+        boundary = sink.BOUNDARY if sink is not None else None
+
+        def render_for(sender):
+            return self._message_renderer(sender, subject, body, cc, bcc, reply_to, attachments, boundary)
+
+        controller = controller or SendController(cancel_event)
+        cancel_event = controller.cancel_event
+
+        # 受信者をドメインごとに順番に並べ替え、送信時にドメインごとの上限を適用する
+        scheduler = DomainScheduler.from_config(domain_limits) if sink is None else None
+        if scheduler is not None:
+            if total is None and not profiles:
+                # 並べ替えた後は件数が分からないため、並べ替える前に数えておく
+                if not isinstance(recipients, Sized):
+                    raise TypeError("total is required when recipients has no len()")
+                total = len(recipients)
+            recipients = scheduler.interleave(recipients)
+
+        def create_pool(sender, pool_rate_limits, pool_connections):
+            return self._create_pool(sender, engine, pool_connections, delay, pool_rate_limits, adaptive_throttle,
+                                     on_rate_change, on_result, controller, recycle_messages, recycle_minutes,
+                                     retry, render_ahead, journal, scheduler)
+
+        # 添付ファイルを送信開始前にまとめてエンコードしておく（大きいファイルはストリーミング）
+        self.attachment_cache.stream_threshold = int(float(stream_attachments_mb or 0) * 1024 * 1024)
+        self.attachment_cache.prepare(attachments or [])
+
+        if sink is not None:
+            return sink.run(recipients, render_for(self), on_result, controller, total)
+
+        if profiles:
+            # アカウントごとのレート制限・接続数（未指定の場合は全体の設定）で振り分けて送信
+            dispatcher = ProfileDispatcher(
+                profiles,
+                lambda profile: create_pool(profile.create_sender(self.attachment_cache),
+                                            profile.rate_limits or rate_limits,
+                                            profile.connections or connections),
+                journal=journal, on_result=on_result, cancel_event=cancel_event
+            )
+            return dispatcher.run(recipients, render_for)
+
+        pool = create_pool(self, rate_limits, connections)
+        return pool.run(recipients, render_for(self), total)
+
+    @staticmethod
+    def _message_renderer(sender: 'EmailBulkSender', subject, body, cc=None, bcc=None, reply_to=None,
+                          attachments=None, boundary=None) -> Callable:
+        """
+        受信者から (from_addr, to_addrs, data) を作成する関数を返す
+
+        Args:
+            sender: 送信元の EmailBulkSender
+            subject: 解析済みの件名テンプレート
+            body: 解析済みの本文テンプレート
+            cc: CCアドレス
+            bcc: BCCアドレス
+            reply_to: 返信先アドレス
+            attachments: 添付ファイルパスのリスト
+            boundary: MIMEの境界文字列（Noneの場合はランダム）
+        """
+        try:
+            # 共通部分をシリアライズ済みのスケルトンに受信者ごとの部分だけを差し込む
+            return MessageSkeleton(sender, subject, body, cc, bcc, reply_to, attachments, boundary).render
+        except ValueError:
+            # スケルトンを作れない場合はメッセージごとに組み立ててシリアライズする
+            return lambda recipient: _flatten_message(sender.create_message(
+                to_email=recipient['email'],
+                to_name=recipient['name'],
+                to_affiliation=recipient['affiliation'],
+                subject_template=subject,
+                body_template=body,
+                cc=cc,
+                bcc=bcc,
+                reply_to=reply_to,
+                attachments=attachments,
+                fields=recipient,
+                boundary=boundary
+            ))
+
+    @staticmethod
+    def _create_pool(sender: 'EmailBulkSender', engine="thread", connections=1, delay=1, rate_limits=None,
+                     adaptive_throttle=None, on_rate_change=None, on_result=None, controller=None,
+                     recycle_messages=0, recycle_minutes=0, retry=None, render_ahead=16,
+                     journal=None, scheduler=None) -> 'SmtpConnectionPool':
+        """送信エンジンに応じた SmtpConnectionPool または AsyncSendEngine を設定から作成"""
+        pool_class = AsyncSendEngine if engine == "async" else SmtpConnectionPool
+        rate_limiter = RateLimiter.from_config(rate_limits, delay)
+        throttle = AdaptiveThrottle.from_config(adaptive_throttle, rate_limiter, on_rate_change)
+        return pool_class(sender, connections=connections, rate_limiter=rate_limiter, throttle=throttle,
+                          on_result=on_result, controller=controller,
+                          recycle_messages=recycle_messages, recycle_minutes=recycle_minutes,
+                          journal=journal, retry_policy=RetryPolicy.from_config(retry),
+                          render_ahead=render_ahead, scheduler=scheduler)
+
+    @staticmethod
+    def _run_batches(fetch: Callable, send: Callable, controller: 'SendController', i18n=None,
+                     poll_interval=5.0, on_idle: Optional[Callable] = None) -> 'SendSummary':
+        """
+        fetch() が返すバッチを send(batch) で送信し続け、結果の SendSummary をまとめて返す
+
+        fetch() は次のバッチを返す（None の場合は終了、空の場合は poll_interval 秒待って
+        もう一度呼ぶ。待ち始めるときに on_idle() を1回呼ぶ）。send(batch) は送信に使った
+        SmtpConnectionPool と、その結果の SendSummary を (pool, summary) で返す。
+        1通も送れずに接続エラーになったバッチの後は、待ってから次のバッチを送信する
+        （待ち時間は最大5分まで倍にする）。controller で中止されたら終了する。
+        """
+        summary = SendSummary()
+        backoff = poll_interval
+        idle = False
+        while not controller.cancelled:
+            batch = fetch()
+            if batch is None:
+                break
+            if not batch:
+                if not idle and on_idle:
+                    on_idle()
+                idle = True
+                controller.cancel_event.wait(poll_interval)
+                continue
+            idle = False
+
+            pool, result = send(batch)
+            for field in SendSummary.__slots__:
+                setattr(summary, field, getattr(summary, field) + getattr(result, field))
+
+            if pool.connect_errors and not (result.delivered or result.failed_total):
+                error = pool.connect_errors[-1]
+                if i18n:
+                    print(i18n.get('spool_retry', error, backoff))
+                else:
+                    print(f"SMTPサーバーに接続できません: {error}（{backoff:.0f}秒後に再試行します）")
+                controller.cancel_event.wait(backoff)
+                backoff = min(backoff * 2, 300)
+            else:
+                backoff = poll_interval
+        return summary
+
+    def benchmark_render(self, csv_file, template_file, cc=None, bcc=None, reply_to=None,
+                         attachments=None, count=200, i18n=None) -> dict:
+        """
+        1通あたりのメッセージ作成時間を、メッセージごとに組み立てる方法とスケルトンを使う方法で比較
+
+        Args:
+            csv_file: 受信者リストCSVファイル
+            template_file: メールテンプレートファイル（件名と本文）
+            cc: CCアドレス
+            bcc: BCCアドレス
+            reply_to: 返信先アドレス
+            attachments: 添付ファイルパスのリスト
+            count: 作成するメッセージ数（受信者を繰り返し使う）
+            i18n: 国際化インスタンス
+
+        Returns:
+            {'generator': 秒/通, 'skeleton': 秒/通} の辞書
+        """
+        recipients = self.read_recipients(csv_file, i18n)
+        subject_template, body_template = self.read_email_template(template_file, i18n)
+        if not recipients:
+            return {}
+        subject = compile_template(subject_template)
+        body = compile_template(body_template)
+        self.attachment_cache.prepare(attachments or [])
+        sample = [recipients[i % len(recipients)] for i in range(max(1, count))]
+
+        def render_generator(recipient):
+            return _flatten_message(self.create_message(
+                recipient['email'], recipient['name'], recipient['affiliation'], subject, body,
+                cc, bcc, reply_to, attachments, fields=recipient
+            ))
+
+        results = {}
+        for label, render in (('generator', render_generator),
+                              ('skeleton', MessageSkeleton(self, subject, body, cc, bcc, reply_to,
+                                                           attachments).render)):
+            # 1通目（添付ファイルのシリアライズなど）は計測から除く
+            render(sample[0])
+            start = time.perf_counter()
+            for recipient in sample:
+                render(recipient)
+            results[label] = (time.perf_counter() - start) / len(sample)
+
+        if i18n:
+            print(i18n.get('benchmark_render_header', len(sample)))
+            print(i18n.get('benchmark_render_result', 'MIME + email.generator', results['generator'] * 1e6))
+            print(i18n.get('benchmark_render_result', 'MessageSkeleton', results['skeleton'] * 1e6))
+            print(i18n.get('benchmark_render_speedup', results['generator'] / max(results['skeleton'], 1e-9)))
+        return results
+
+    def send_bulk_emails(self, csv_file, template_file,
+                        cc=None, bcc=None, reply_to=None, attachments=None, delay=1, i18n=None,
+                        connections=1, engine="thread", rate_limits=None, adaptive_throttle=None,
+                        recycle_messages=0, recycle_minutes=0, journal_dir=None, resume=False,
+                        retry=None, profiles=None, render_ahead=16, stream_attachments_mb=10,
+                        sheet=None, rows=None, sink=None, domain_limits=None):
+        """
+        一斉送信を実行
+
+        Args:
+            csv_file: 受信者リストCSVファイル
+            template_file: メールテンプレートファイル（件名と本文）
+            cc: CCアドレス
+            bcc: BCCアドレス
+            reply_to: 返信先アドレス
+            attachments: 添付ファイルパスのリスト
+            delay: メール送信間隔（秒）
+            i18n: 国際化インスタンス
+            connections: 同時SMTP接続数
+            engine: 送信エンジン（"thread" または "async"）
+            rate_limits: 送信レート制限の設定（Noneの場合は delay から算出）
+            adaptive_throttle: 自動スロットリングの設定
+            recycle_messages: 1接続あたりの送信通数の上限（超えたら接続し直す）
+            recycle_minutes: 1接続あたりの経過時間（分）の上限（超えたら接続し直す）
+            journal_dir: 送信ジャーナルを保存するディレクトリ（Noneの場合は記録しない）
+            resume: 送信ジャーナルで送信済みの受信者をスキップして再開する
+            retry: 一時的なエラーの再送設定
+            profiles: 振り分けて送信する送信元アカウント（SenderProfile）のリスト
+            render_ahead: 送信と並行して先に作成しておくメッセージ数
+            stream_attachments_mb: このサイズ（MB）以上の添付ファイルは送信時にストリーミングする
+            sheet: Excelファイルのシート名（省略時はアクティブなシート）
+            rows: 送信する行番号の範囲 (最初, 最後)（シート上の行番号、ヘッダーは1行目）
+            sink: 送信の代わりにメッセージを書き出す OutputSink（送信ジャーナルには記録しない）
+            domain_limits: 受信者ドメインごとの同時送信数・送信レートの上限
+        """
+        # 受信者リストは送信しながら先頭から読み込む（ここでは件数だけを数える）
+        source = recipients = self.iter_recipients(csv_file, i18n, sheet, rows)
+        subject_template, body_template = self.read_email_template(template_file, i18n)
+
+        # 送信ジャーナル（中断した送信を再開するための記録）
+        journal = None
+        delivered = None
+        if journal_dir is not None and sink is None:
+            journal = SendJournal.for_campaign(journal_dir, csv_file, template_file)
+            if resume:
+                delivered = journal.delivered()
+        total = skipped = 0
+        for recipient in recipients:
+            if delivered and recipient['email'] in delivered:
+                skipped += 1
+            else:
+                total += 1
+        if delivered is not None:
+            if i18n:
+                print(i18n.get('resume_skipped', skipped))
+            else:
+                print(f"送信済みの {skipped}件をスキップして再開します")
+            recipients = (r for r in recipients if r['email'] not in delivered)
+
+        # 確認メッセージ（i18nがある場合は多言語対応、ない場合は日本語デフォルト）
+        if i18n:
+            print(i18n.get('cli_confirm_header'))
+            print(i18n.get('preview_subject', subject_template))
+            print(i18n.get('preview_recipients', total))
+            if self.sender_display_name:
+                print(i18n.get('preview_sender', f"{self.sender_display_name} <{self.email_address}>"))
+            else:
+                print(i18n.get('preview_sender', self.email_address))
+            for profile in profiles or []:
+                quota = profile.daily_quota or i18n.get('rate_unlimited')
+                print(i18n.get('preview_profile', profile.label, profile.email_address, quota))
+            if cc:
+                print(i18n.get('preview_cc', cc))
+            if bcc:
+                print(i18n.get('preview_bcc', bcc))
+            if reply_to:
+                print(i18n.get('preview_reply_to', reply_to))
+            if attachments:
+                print(i18n.get('preview_attachments', ', '.join(attachments)))
+            if sink is not None:
+                print(i18n.get('preview_sink', sink))
+        else:
+            print(f"\n=== 送信内容確認 ===")
+            print(f"件名: {subject_template}")
+            print(f"送信先: {total}件")
+            if self.sender_display_name:
+                print(f"送信元: {self.sender_display_name} <{self.email_address}>")
+            else:
+                print(f"送信元: {self.email_address}")
+            for profile in profiles or []:
+                quota = profile.daily_quota or "制限なし"
+                print(f"  送信元アカウント: {profile.label} <{profile.email_address}> (24時間の上限: {quota})")
+            if cc:
+                print(f"CC: {cc}")
+            if bcc:
+                print(f"BCC: {bcc}")
+            if reply_to:
+                print(f"Reply-To: {reply_to}")
+            if attachments:
+                print(f"添付ファイル: {', '.join(attachments)}")
+            if sink is not None:
+                print(f"出力先: {sink}（送信せずにファイルに書き出します）")
+
+        # 確認
+        if i18n:
+            confirm = input(i18n.get('cli_confirm_send') + ": ")
+        else:
+            confirm = input("\n送信を開始しますか？ (yes/no): ")
+
+        if confirm.lower() != 'yes':
+            if i18n:
+                print(i18n.get('cli_cancelled'))
+            else:
+                print("送信をキャンセルしました。")
+            source.close()
+            if journal:
+                journal.close()
+            return
+
+        print_result = functools.partial(self._print_result, i18n)
+        print_rate = functools.partial(self._print_rate_change, i18n)
+
+        # Ctrl-C で一時停止・中止できるようにする（シグナルはメインスレッドでしか受け取れない）
+        controller = SendController()
+        previous_handler = self._install_interrupt_handler(controller, i18n)
+
+        def print_failure(result, done, total):
+            # ファイルへの書き出しは速いため、1件ごとの表示は作成できなかった受信者だけにする
+            if not result.success:
+                print_result(result, done, total)
+
+        # SMTP接続プールで各受信者にメール送信（sink を指定した場合はファイルに書き出す）
+        started = time.monotonic()
+        try:
+            summary = self.send_recipients(
+                recipients, subject_template, body_template,
+                cc=cc, bcc=bcc, reply_to=reply_to, attachments=attachments,
+                delay=delay, connections=connections,
+                on_result=print_result if sink is None else print_failure,
+                engine=engine, rate_limits=rate_limits,
+                adaptive_throttle=adaptive_throttle, on_rate_change=print_rate,
+                recycle_messages=recycle_messages, recycle_minutes=recycle_minutes,
+                journal=journal, retry=retry, profiles=profiles, render_ahead=render_ahead,
+                stream_attachments_mb=stream_attachments_mb, total=total, controller=controller, sink=sink,
+                domain_limits=domain_limits
+            )
+
+            if controller.cancelled:
+                print(i18n.get('cli_cancelled') if i18n else "送信をキャンセルしました")
+            if i18n:
+                print(f"\n{i18n.get('send_complete', summary.delivered, summary.failed_total)}")
+            else:
+                print(f"\n送信完了: 成功 {summary.delivered}件, 失敗 {summary.failed_total}件")
+            if summary.retried or summary.failed_total:
+                if i18n:
+                    print(i18n.get('send_summary', summary.retried, summary.failed, summary.gave_up))
+                else:
+                    print(f"  うち再送後に成功 {summary.retried}件 / 恒久的な失敗 {summary.failed}件 / 再送上限で断念 {summary.gave_up}件")
+            if sink is not None:
+                elapsed = time.monotonic() - started
+                rate = summary.delivered / elapsed if elapsed > 0 else 0
+                if i18n:
+                    print(i18n.get('sink_written', summary.delivered, sink, elapsed, rate))
+                else:
+                    print(f"{summary.delivered}件を {sink} に書き出しました（{elapsed:.1f}秒、{rate:.0f}通/秒）")
+
+        except Exception as e:
+            if sink is not None:
+                print(i18n.get('sink_failed', e) if i18n else f"書き出しに失敗しました: {e}")
+            elif i18n:
+                print(f"SMTP connection error: {e}")
+            else:
+                print(f"SMTP接続エラー: {e}")
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGINT, previous_handler)
+            source.close()
+            if journal:
+                journal.close()
+
+    def drain_spool(self, spool_dir, delay=1, i18n=None, connections=1, engine="thread",
+                    rate_limits=None, adaptive_throttle=None, recycle_messages=0, recycle_minutes=0,
+                    retry=None, render_ahead=16, stream_attachments_mb=10, poll_interval=5.0):
+        """
+        スプールディレクトリ（--spool-prepare で作成）の送信待ちメッセージを送信
+
+        準備が完了していない間は poll_interval 秒ごとに新しいメッセージを確認して送信を続け、
+        準備が完了して送信待ちがなくなったら終了する。全ての接続が失われた場合は、待ってから
+        接続し直して続きを送信する。1つのスプールを同時に送信するプロセスは1つだけにすること。
+
+        Args:
+            spool_dir: スプールディレクトリ
+            delay: メール送信間隔（秒、rate_limits がない場合に使用）
+            i18n: 国際化インスタンス
+            connections: 同時SMTP接続数
+            engine: 送信エンジン（"thread" または "async"）
+            rate_limits: 送信レート制限の設定
+            adaptive_throttle: 自動スロットリングの設定
+            recycle_messages: 1接続あたりの送信通数の上限（超えたら接続し直す）
+            recycle_minutes: 1接続あたりの経過時間（分）の上限（超えたら接続し直す）
+            retry: 一時的なエラーの再送設定
+            render_ahead: 送信と並行して先に読み込んでおくメッセージ数
+            stream_attachments_mb: このサイズ（MB）以上のメッセージは送信時にファイルから少しずつ読み込む
+            poll_interval: 送信待ちがないときに新しいメッセージを確認する間隔（秒）
+
+        Returns:
+            SendSummary（スプールが見つからない場合は None）
+        """
+        spool = Spool(spool_dir)
+        if not (spool.path / 'new').is_dir():
+            print(i18n.get('spool_not_found', spool_dir) if i18n else f"スプールディレクトリが見つかりません: {spool_dir}")
+            return None
+
+        render = functools.partial(spool.render, stream_threshold=int(float(stream_attachments_mb or 0) * 1024 * 1024))
+        print_result = functools.partial(self._print_result, i18n)
+        print_rate = functools.partial(self._print_rate_change, i18n)
+
+        def on_result(result, done, total):
+            # 送信済み・恒久的な失敗になったファイルを移す（再送待ちは new/ に残す）
+            if result.status != 'deferred':
+                try:
+                    spool.finish(result.recipient, result.success)
+                except FileNotFoundError:
+                    pass
+            print_result(result, done, total)
+
+        def fetch():
+            names = spool.pending()
+            if not names and spool.prepared:
+                return None
+            return [SpoolEntry(spool, name) for name in names]
+
+        def send(entries):
+            pool = self._create_pool(self, engine, connections, delay, rate_limits, adaptive_throttle,
+                                     print_rate, on_result, controller, recycle_messages, recycle_minutes,
+                                     retry, render_ahead)
+            # 接続が失われて送れなかったメッセージは失敗にせず new/ に残す
+            pool.failover = True
+            # 本文を送った後に切断されたメッセージは送り直さずに failed/ に移す
+            pool.at_most_once = True
+            return pool, pool.run(entries, render)
+
+        def on_idle():
+            print(i18n.get('spool_waiting') if i18n else "送信待ちのメッセージがありません。準備が完了するまで待機します...")
+
+        controller = SendController()
+        previous_handler = self._install_interrupt_handler(controller, i18n)
+        try:
+            summary = self._run_batches(fetch, send, controller, i18n, poll_interval, on_idle)
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGINT, previous_handler)
+
+        remaining = len(spool.pending())
+        if i18n:
+            print(f"\n{i18n.get('spool_drained', summary.delivered, summary.failed_total, remaining)}")
+        else:
+            print(f"\nスプールの送信を終了しました: 成功 {summary.delivered}件, 失敗 {summary.failed_total}件, 送信待ち {remaining}件")
+        return summary
+
+    def init_queue(self, queue_path, csv_file, template_file, cc=None, bcc=None, reply_to=None,
+                   attachments=None, i18n=None, sheet=None, rows=None):
+        """
+        受信者リストとテンプレートから、複数のワーカー（--worker）で送信する共有キューを作成
+
+        ワーカーはキューに保存した件名・本文テンプレートとCC・BCC・返信先・添付ファイルで
+        メッセージを作成する（添付ファイルは全てのワーカーから同じパスで読めること）。
+
+        Args:
+            queue_path: 作成するキューファイルのパス
+            csv_file: 受信者リストCSVファイル
+            template_file: メールテンプレートファイル（件名と本文）
+            cc: CCアドレス
+            bcc: BCCアドレス
+            reply_to: 返信先アドレス
+            attachments: 添付ファイルパスのリスト
+            i18n: 国際化インスタンス
+            sheet: Excelファイルのシート名（省略時はアクティブなシート）
+            rows: 登録する行番号の範囲 (最初, 最後)
+
+        Returns:
+            登録した受信者数（キューが既に存在する場合は None）
+        """
+        subject_template, body_template = self.read_email_template(template_file, i18n)
+        recipients = self.iter_recipients(csv_file, i18n, sheet, rows)
+        campaign = {
+            'subject': subject_template,
+            'body': body_template,
+            'cc': cc,
+            'bcc': bcc,
+            'reply_to': reply_to,
+            'attachments': [os.path.abspath(path) for path in attachments or []],
+            'csv_file': os.path.abspath(csv_file),
+            'template_file': os.path.abspath(template_file),
+        }
+        try:
+            lease_queue = LeaseQueue.create(queue_path, recipients, campaign)
+        except FileExistsError:
+            print(i18n.get('queue_exists', queue_path) if i18n else f"キューが既に存在します: {queue_path}")
+            return None
+        finally:
+            recipients.close()
+
+        total = sum(lease_queue.counts().values())
+        lease_queue.close()
+        print(i18n.get('queue_created', total, queue_path) if i18n else f"{total}件の受信者をキューに登録しました: {queue_path}")
+        return total
+
+    def run_worker(self, queue_path, worker_id=None, batch_size=100, lease_seconds=300, delay=1, i18n=None,
+                   connections=1, engine="thread", rate_limits=None, adaptive_throttle=None,
+                   recycle_messages=0, recycle_minutes=0, retry=None, render_ahead=16,
+                   stream_attachments_mb=10, poll_interval=5.0):
+        """
+        共有キュー（--queue-init で作成）から受信者を借り受けて送信するワーカー
+
+        同じキューに対して複数のプロセス・ホストで同時に実行できる。受信者を batch_size 件ずつ
+        借り受けて送信し、送信待ちがなくなり他のワーカーが借り受けている受信者もなくなったら終了する。
+        送信中はリースを定期的に延長し、停止したワーカーの受信者は期限切れ後に他のワーカーが送信する。
+
+        Args:
+            queue_path: キューファイル
+            worker_id: ワーカーID（省略時は ホスト名:プロセスID）
+            batch_size: 一度に借り受ける受信者数
+            lease_seconds: リースの期限（秒）
+            delay: メール送信間隔（秒、rate_limits がない場合に使用）
+            i18n: 国際化インスタンス
+            connections: 同時SMTP接続数
+            engine: 送信エンジン（"thread" または "async"）
+            rate_limits: 送信レート制限の設定（このワーカーの分）
+            adaptive_throttle: 自動スロットリングの設定
+            recycle_messages: 1接続あたりの送信通数の上限（超えたら接続し直す）
+            recycle_minutes: 1接続あたりの経過時間（分）の上限（超えたら接続し直す）
+            retry: 一時的なエラーの再送設定
+            render_ahead: 送信と並行して先に作成しておくメッセージ数
+            stream_attachments_mb: このサイズ（MB）以上の添付ファイルは送信時にストリーミングする
+            poll_interval: 他のワーカーのリースの期限切れを確認する間隔（秒）
+
+        Returns:
+            SendSummary（キューが見つからない場合は None）
+        """
+        if not os.path.isfile(queue_path):
+            print(i18n.get('queue_not_found', queue_path) if i18n else f"キューが見つかりません: {queue_path}")
+            return None
+        lease_queue = LeaseQueue(queue_path)
+        owner = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        campaign = lease_queue.campaign()
+        attachments = campaign.get('attachments') or None
+        self.attachment_cache.stream_threshold = int(float(stream_attachments_mb or 0) * 1024 * 1024)
+        self.attachment_cache.prepare(attachments or [])
+        render = self._message_renderer(self, compile_template(campaign['subject']), compile_template(campaign['body']),
+                                        campaign.get('cc'), campaign.get('bcc'), campaign.get('reply_to'), attachments)
+
+        counts = lease_queue.counts()
+        total = sum(counts.values())
+        if i18n:
+            print(i18n.get('queue_worker_started', owner, counts['pending'], total))
+        else:
+            print(f"ワーカー {owner} を開始します（送信待ち {counts['pending']}件 / 全{total}件）")
+
+        print_result = functools.partial(self._print_result, i18n)
+        print_rate = functools.partial(self._print_rate_change, i18n)
+
+        def on_result(result, done, batch_total):
+            # 再送待ちは on_defer でキューに戻す
+            if result.status == 'deferred':
+                pass
+            elif result.success:
+                lease_queue.finish(owner, result.index, 'sent')
+            else:
+                state = 'unknown' if _is_delivery_uncertain(result.error) else 'failed'
+                lease_queue.finish(owner, result.index, state, str(result.error))
+            print_result(result, done, total)
+
+        # 送信中はリースの期限の3分の1ごとに延長する
+        stop_renewing = threading.Event()
+
+        def renew_leases():
+            while not stop_renewing.wait(lease_seconds / 3):
+                try:
+                    lease_queue.renew(owner, lease_seconds)
+                except sqlite3.Error:
+                    # 一時的にロックを取れなくても、次の延長までに期限が切れなければよい
+                    pass
+
+        renewer = threading.Thread(target=renew_leases, daemon=True)
+        renewer.start()
+
+        remaining = 0
+
+        def fetch():
+            nonlocal remaining
+            items = lease_queue.claim(owner, batch_size, lease_seconds)
+            if items:
+                return items
+            counts = lease_queue.counts()
+            remaining = counts['pending'] + counts['leased'] + counts['sending']
+            # 他のワーカーが送信中の受信者や再送待ちの受信者が残っている間は待つ
+            return items if remaining else None
+
+        def send(items):
+            pool = self._create_pool(self, engine, connections, delay, rate_limits, adaptive_throttle,
+                                     print_rate, on_result, controller, recycle_messages, recycle_minutes,
+                                     retry, render_ahead)
+            # 接続が失われて送れなかった受信者は失敗にせずキューに返す
+            pool.failover = True
+            # 送信直前に送信中として記録し、届いたかどうか分からない受信者は再送しない
+            pool.before_send = lambda item: lease_queue.begin(owner, item.index)
+            pool.at_most_once = True
+            # 再送待ちはバッチに残さずキューに戻し、次のバッチを待たせない
+            pool.on_defer = lambda item, delay: lease_queue.defer(owner, item, delay)
+            try:
+                return pool, pool.run_queue(SendQueue(items), render, total)
+            finally:
+                # 未送信の受信者を返す
+                lease_queue.release(owner)
+
+        def on_idle():
+            print(i18n.get('queue_waiting', remaining) if i18n else
+                  f"送信中・再送待ちの受信者が残っています（{remaining}件）。終了を待っています...")
+
+        controller = SendController()
+        previous_handler = self._install_interrupt_handler(controller, i18n)
+        try:
+            summary = self._run_batches(fetch, send, controller, i18n, poll_interval, on_idle)
+        finally:
+            stop_renewing.set()
+            if previous_handler is not None:
+                signal.signal(signal.SIGINT, previous_handler)
+            counts = lease_queue.counts()
+            lease_queue.close()
+
+        if i18n:
+            print(f"\n{i18n.get('queue_worker_done', summary.delivered, summary.failed_total, counts['pending'], counts['unknown'])}")
+        else:
+            print(f"\nワーカーを終了しました: 成功 {summary.delivered}件, 失敗 {summary.failed_total}件"
+                  f"（キュー全体の送信待ち {counts['pending']}件, 結果不明 {counts['unknown']}件）")
+        return summary
+
+    @staticmethod
+    def _print_result(i18n, result, done, total):
+        """送信結果を1件表示（CLI用）"""
+        recipient = result.recipient
+        if result.success:
+            if i18n:
+                print(i18n.get('send_success', result.index, total, recipient['affiliation'],
+                              recipient['name'], recipient['email']))
+            else:
+                print(f"[{result.index}/{total}] 送信成功: {recipient['affiliation']} {recipient['name']} ({recipient['email']})")
+        elif result.status == 'deferred':
+            if i18n:
+                print(i18n.get('send_deferred', result.index, total, recipient['affiliation'],
+                              recipient['name'], recipient['email'], str(result.error),
+                              result.retry_in, result.attempt + 1, result.max_retries))
+            else:
+                print(f"[{result.index}/{total}] 再送待ち: {recipient['affiliation']} {recipient['name']} ({recipient['email']}) - {result.error}"
+                      f"（{result.retry_in:.0f}秒後に再送 {result.attempt + 1}/{result.max_retries}）")
+        elif result.status == 'gave_up':
+            if i18n:
+                print(i18n.get('send_gave_up', result.index, total, recipient['affiliation'],
+                              recipient['name'], recipient['email'], str(result.error), result.attempt))
+            else:
+                print(f"[{result.index}/{total}] 送信断念: {recipient['affiliation']} {recipient['name']} ({recipient['email']}) - {result.error}"
+                      f"（{result.attempt}回再送しても失敗）")
+        else:
+            if i18n:
+                print(i18n.get('send_failed', result.index, total, recipient['affiliation'],
+                              recipient['name'], recipient['email'], str(result.error)))
+            else:
+                print(f"[{result.index}/{total}] 送信失敗: {recipient['affiliation']} {recipient['name']} ({recipient['email']}) - エラー: {result.error}")
+
+        # CC/BCCなど、To以外で拒否された宛先を個別に表示
+        for addr, code, message in result.refused_others():
+            if i18n:
+                print(i18n.get('send_refused', addr, code, message))
+            else:
+                print(f"    宛先拒否: {addr} - {code} {message}")
+
+    @staticmethod
+    def _print_rate_change(i18n, rate, pause_seconds):
+        """自動スロットリングによるレートの変更を表示（CLI用）"""
+        if i18n:
+            rate_text = i18n.get('rate_per_minute', rate * 60) if rate else i18n.get('rate_unlimited')
+            print(i18n.get('rate_adjusted', rate_text))
+            if pause_seconds:
+                print(i18n.get('rate_paused', pause_seconds))
+        else:
+            rate_text = f"{rate * 60:.1f}通/分" if rate else "制限なし"
+            print(f"送信レートを調整しました: {rate_text}")
+            if pause_seconds:
+                print(f"サーバーからの制限応答のため {pause_seconds:.0f}秒間 送信を一時停止します")
+
+    @classmethod
+    def _install_interrupt_handler(cls, controller: 'SendController', i18n=None):
+        """
+        Ctrl-C で送信を一時停止・中止できるようにする（シグナルはメインスレッドでしか受け取れない）
+
+        Returns:
+            元のシグナルハンドラ（設定しなかった場合は None）
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return None
+        previous_handler = signal.signal(
+            signal.SIGINT, lambda signum, frame: cls._handle_interrupt(controller, i18n)
+        )
+        print(i18n.get('cli_pause_hint') if i18n else "（Ctrl-C で一時停止できます）")
+        return previous_handler
+
+    @staticmethod
+    def _handle_interrupt(controller: 'SendController', i18n=None):
+        """
+        送信中の Ctrl-C の処理
+
+        1回目は一時停止し、Enterキーで再開する。一時停止中にもう一度押すと中止する。
+        """
+        if controller.paused or controller.cancelled:
+            controller.cancel()
+            print(i18n.get('cli_cancelling') if i18n else "\n送信を中止しています（送信中のメールは送り切ります）...")
+            return
+        controller.pause()
+        print(i18n.get('cli_paused') if i18n else
+              "\n一時停止しました（送信中のメールは送り切ります）。Enterキーで再開、もう一度 Ctrl-C で中止します")
+
+        def wait_for_enter():
+            # シグナルハンドラ内では入力を待てないため、別スレッドでEnterキーを待つ
+            if not sys.stdin.readline():
+                return
+            if controller.paused and not controller.cancelled:
+                controller.resume()
+                print(i18n.get('cli_resumed') if i18n else "送信を再開します")
+
+        threading.Thread(target=wait_for_enter, daemon=True).start()
+
+
+# ==================== 差し込みテンプレート ====================
+
+# 受信者リストの日本語の列名と、受信者辞書・プレースホルダーで使う英語のキーの対応
+COLUMN_ALIASES = {'所属': 'affiliation', '氏名': 'name', 'メールアドレス': 'email'}
+
+
+def _column_keys(header) -> list:
+    """
+    受信者リストのヘッダー行から受信者辞書のキーのリストを作成
+
+    所属・氏名・メールアドレスは英語のキーにそろえ、その他の列は列名をそのままキーにする。
+    日本語と英語の列名が両方ある場合は日本語の列を使う。空の列名は None
+    """
+    names = ['' if name is None else str(name).strip() for name in header]
+    aliased = {COLUMN_ALIASES[name] for name in names if name in COLUMN_ALIASES}
+    keys = []
+    for name in names:
+        if not name or (name in aliased and name not in COLUMN_ALIASES):
+            keys.append(None)
+        else:
+            keys.append(COLUMN_ALIASES.get(name, name))
+    return keys
+
+
+class CompiledTemplate:
+    """
+    プレースホルダー（{列名}）を含むテンプレートを一度だけ解析したもの
+
+    固定文字列と差し込み項目に分けておき、受信者ごとに1回の join で展開する。
+    受信者にない列のプレースホルダーはそのまま残す。
+    """
+
+    _FIELD = re.compile(r'\{([^{}\r\n]+)\}')
+
+    def __init__(self, text: str):
+        self.text = text
+        # 固定文字列は str、差し込み項目は (キー, 元の文字列) のタプル
+        self._segments = []
+        position = 0
+        for match in self._FIELD.finditer(text):
+            if match.start() > position:
+                self._segments.append(text[position:match.start()])
+            name = match.group(1).strip()
+            self._segments.append((COLUMN_ALIASES.get(name, name), match.group(0)))
+            position = match.end()
+        if position < len(text):
+            self._segments.append(text[position:])
+
+    @property
+    def fields(self) -> list:
+        """テンプレートで使われている列のキー"""
+        return [segment[0] for segment in self._segments if segment.__class__ is tuple]
+
+    def render(self, values: Dict[str, str]) -> str:
+        """受信者の列を差し込んだ文字列を返す"""
+        return ''.join([
+            segment if segment.__class__ is str else values.get(segment[0], segment[1])
+            for segment in self._segments
+        ])
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_template_text(text: str) -> CompiledTemplate:
+    return CompiledTemplate(text)
+
+
+def compile_template(template) -> CompiledTemplate:
+    """文字列のテンプレートを解析（解析済みの CompiledTemplate はそのまま返す）"""
+    if isinstance(template, CompiledTemplate):
+        return template
+    return _compile_template_text(template)
+
+
+# ==================== 受信者リストの読み込み ====================
+
+class CsvRecipients:
+    """
+    CSVファイルの受信者を先頭から1件ずつ読み込む（ファイル全体をメモリに載せない）
+
+    文字コードはファイル先頭の一部だけから検出し、列の対応付けはヘッダー行から一度だけ行う。
+    繰り返し反復でき、反復のたびにファイルを先頭から読み直す。
+    """
+
+    # 文字コードの検出に使うファイル先頭の最大サイズ
+    SAMPLE_SIZE = 1024 * 1024
+    _BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, csv_file: str, encoding: Optional[str] = None,
+                 first_row: Optional[int] = None, last_row: Optional[int] = None):
+        """
+        Args:
+            csv_file: CSVファイルのパス
+            encoding: 文字コード（省略時はファイル先頭から自動検出）
+            first_row: 読み込む最初の行番号（ヘッダーを1行目とした行番号。省略時は2行目から）
+            last_row: 読み込む最後の行番号（省略時は最終行まで）
+
+        Raises:
+            KeyError: 所属・氏名・メールアドレスの列がない場合
+        """
+        self.csv_file = csv_file
+        self.first_row = max(2, first_row or 2)
+        self.last_row = last_row
+        self.confidence = 1.0
+        if encoding is None:
+            encoding, self.confidence = self.detect_encoding(csv_file)
+        self.encoding = encoding
+
+        # CSVのカラム名を受信者辞書のキーに対応付け（全ての列を保持）
+        with self._open() as f:
+            header = next(csv.reader(f), None)
+        self.keys = _column_keys(header) if header is not None else []
+        if header is not None:
+            for required in ('affiliation', 'name', 'email'):
+                if required not in self.keys:
+                    raise KeyError(required)
+
+    @classmethod
+    def detect_encoding(cls, csv_file: str) -> tuple:
+        """
+        ファイル先頭の最大 SAMPLE_SIZE バイトから文字コードを検出
+
+        Returns:
+            (文字コード, 信頼度) のタプル
+        """
+        detector = chardet.UniversalDetector()
+        read = 0
+        with open(csv_file, 'rb') as f:
+            while read < cls.SAMPLE_SIZE and not detector.done:
+                block = f.read(cls._BLOCK_SIZE)
+                if not block:
+                    break
+                detector.feed(block)
+                read += len(block)
+        detected = detector.close()
+        encoding = detected['encoding']
+        # 先頭がASCIIのみでも後半に日本語が現れることがあるため、上位互換のUTF-8で読む
+        if encoding == 'ascii':
+            encoding = 'utf-8'
+        return encoding, detected['confidence']
+
+    def _open(self):
+        """検出した文字コードでファイルを開く（newline=''で改行コードを適切に処理）"""
+        return open(self.csv_file, 'r', encoding=self.encoding, newline='')
+
+    def __iter__(self):
+        if not self.keys:
+            return
+        columns = [(index, key) for index, key in enumerate(self.keys) if key]
+        with self._open() as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row_number, row in enumerate(reader, 2):
+                if self.last_row is not None and row_number > self.last_row:
+                    break
+                if not row or row_number < self.first_row:
+                    continue
+                width = len(row)
+                yield {key: row[index].strip() if index < width else '' for index, key in columns}
+
+    def close(self):
+        """ExcelRecipients と同じインターフェース（反復のたびにファイルを開き直すため何もしない）"""
+
+
+class ExcelRecipients:
+    """
+    Excelファイル（.xlsx）のシートの受信者を1行ずつ読み込む（シート全体をメモリに載せない）
+
+    openpyxl の読み取り専用モードで行を順に読み、列の対応付けはヘッダー行から一度だけ行う。
+    ブックは一度だけ開き（共有文字列の読み込みは大きなブックでは数秒かかる）、
+    繰り返し反復するたびにシートを先頭から読み直す。使い終わったら close() を呼ぶこと。
+    """
+
+    def __init__(self, xlsx_file: str, sheet: Optional[str] = None,
+                 first_row: Optional[int] = None, last_row: Optional[int] = None, i18n=None):
+        """
+        Args:
+            xlsx_file: Excelファイルのパス
+            sheet: シート名（省略時はアクティブなシート）
+            first_row: 読み込む最初の行番号（シート上の行番号、ヘッダーは1行目。省略時は2行目から）
+            last_row: 読み込む最後の行番号（省略時は最終行まで）
+            i18n: 国際化インスタンス（エラーメッセージ用）
+
+        Raises:
+            KeyError: 指定したシートがない場合
+            ValueError: 所属・氏名・メールアドレスの列がない場合
+        """
+        self.xlsx_file = xlsx_file
+        self.sheet = sheet
+        self.first_row = max(2, first_row or 2)
+        self.last_row = last_row
+
+        self._workbook = load_workbook(xlsx_file, read_only=True)
+        try:
+            if sheet is None:
+                self._worksheet = self._workbook.active
+            elif sheet in self._workbook.sheetnames:
+                self._worksheet = self._workbook[sheet]
+            else:
+                raise KeyError(sheet)
+
+            # ヘッダー行からカラムを特定（全ての列を保持）
+            header = next(self._worksheet.iter_rows(min_row=1, max_row=1, values_only=True), None)
+            self.keys = _column_keys(header) if header is not None else []
+            if header is not None and not all(required in self.keys for required in ('affiliation', 'name', 'email')):
+                error_msg = "Required columns not found in Excel file. Expected: 所属/affiliation, 氏名/name, メールアドレス/email" if i18n is None else i18n.get("error_excel_columns")
+                raise ValueError(error_msg)
+        except Exception:
+            self._workbook.close()
+            raise
+
+    def __iter__(self):
+        if not self.keys or (self.last_row is not None and self.last_row < self.first_row):
+            return
+        email_idx = self.keys.index('email')
+        columns = [(index, key) for index, key in enumerate(self.keys) if key]
+        for row in self._worksheet.iter_rows(min_row=self.first_row, max_row=self.last_row, values_only=True):
+            if email_idx < len(row) and row[email_idx]:  # メールアドレスがある行のみ
+                width = len(row)
+                yield {key: str(row[index]).strip() if index < width and row[index] is not None else ''
+                       for index, key in columns}
+
+    def close(self):
+        """ブックを閉じる（以降は反復できない）"""
+        self._workbook.close()
+
+
+class _PackedColumn:
+    """1列分の値をUTF-8で連結したバイト列と終端位置の配列で保持する（1値あたり4バイト+本文）"""
+
+    __slots__ = ('data', 'ends', '_lower')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array('I')
+        self._lower = None
+
+    def __getitem__(self, index: int) -> str:
+        start = self.ends[index - 1] if index else 0
+        return str(memoryview(self.data)[start:self.ends[index]], 'utf-8')
+
+    def find_all(self, needle: bytes, start: int = 0, stop: Optional[int] = None) -> list:
+        """
+        値に needle を含む行の位置を昇順で返す（英字の大文字小文字は区別しない）
+
+        Args:
+            needle: 英字を小文字にしたUTF-8のバイト列
+            start: 検索を始める行
+            stop: 検索を終える行（この行は含まない。省略時は最後まで）
+        """
+        ends = self.ends
+        stop = len(ends) if stop is None else min(stop, len(ends))
+        if start >= stop:
+            return []
+        # 英字だけを小文字にした連結バイト列を作っておき、値ごとではなく全体をまとめて検索する
+        if self._lower is None or len(self._lower) != len(self.data):
+            self._lower = self.data.lower()
+        haystack = self._lower
+        end = ends[stop - 1]
+        rows = []
+        pos = haystack.find(needle, ends[start - 1] if start else 0, end)
+        while pos >= 0:
+            row = bisect.bisect_right(ends, pos, start, stop)
+            # 隣の値にまたがる一致は除外する（その値の中で後ろから始まる一致もまたがるため次の値へ進む）
+            if pos + len(needle) <= ends[row]:
+                rows.append(row)
+            pos = haystack.find(needle, ends[row], end)
+        return rows
+
+
+class RecipientRow(Mapping):
+    """RecipientStore の1行を受信者辞書と同じように読み取るビュー"""
+
+    __slots__ = ('_columns', '_index')
+
+    def __init__(self, columns: Dict[str, _PackedColumn], index: int):
+        self._columns = columns
+        self._index = index
+
+    def __getitem__(self, key: str) -> str:
+        return self._columns[key][self._index]
+
+    def get(self, key, default=None):
+        column = self._columns.get(key)
+        return default if column is None else column[self._index]
+
+    def __contains__(self, key) -> bool:
+        return key in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class RecipientStore(Sequence):
+    """
+    受信者リストを列ごとにまとめて保持するコンパクトなリスト
+
+    各列の値をUTF-8で連結して保持し、受信者を取り出すときに RecipientRow（読み取り専用の
+    辞書ビュー）を作る。1件ごとに辞書と文字列オブジェクトを持つ場合に比べてメモリ使用量が
+    数分の1になる。len()・インデックス・スライス（列を共有するビューを返す）に対応する。
+    """
+
+    def __init__(self, keys: Iterable[Optional[str]] = ()):
+        """
+        Args:
+            keys: 列のキー（None の列は保持しない）
+        """
+        self._columns = {}
+        for key in keys:
+            if key and key not in self._columns:
+                self._columns[key] = _PackedColumn()
+        self._rows = range(0)
+        self._is_view = False
+
+    @classmethod
+    def from_recipients(cls, recipients: Iterable[Dict[str, str]], keys=None) -> 'RecipientStore':
+        """
+        受信者を順に追加して作成
+
+        Args:
+            recipients: 受信者辞書の反復可能オブジェクト（CsvRecipients など）
+            keys: 列のキー（省略時は recipients.keys、なければ1件目の受信者のキー）
+        """
+        if keys is None:
+            keys = getattr(recipients, 'keys', None)
+            if not isinstance(keys, list):
+                keys = None
+        iterator = iter(recipients)
+        if keys is None:
+            first = next(iterator, None)
+            store = cls(first or ())
+            if first is not None:
+                store.append(first)
+        else:
+            store = cls(keys)
+        store.extend(iterator)
+        return store
+
+    @property
+    def keys(self) -> list:
+        """列のキー"""
+        return list(self._columns)
+
+    def append(self, recipient: Dict[str, str]):
+        """受信者を末尾に追加（ない列は空文字列）"""
+        self.extend((recipient,))
+
+    def extend(self, recipients: Iterable[Dict[str, str]]):
+        """受信者をまとめて末尾に追加（ない列は空文字列）"""
+        if self._is_view:
+            raise TypeError("Cannot append to a slice of RecipientStore")
+        columns = [(key, column.data, column.ends) for key, column in self._columns.items()]
+        count = len(self._rows)
+        for recipient in recipients:
+            get = recipient.get
+            for key, data, ends in columns:
+                data += (get(key) or '').encode('utf-8')
+                ends.append(len(data))
+            count += 1
+        self._rows = range(count)
+
+    def search(self, text: str, keys: Optional[Iterable[str]] = None,
+               start: int = 0, stop: Optional[int] = None) -> Sequence:
+        """
+        指定した列のいずれかに text を含む受信者の位置を返す（英字の大文字小文字は区別しない）
+
+        列ごとに連結したバイト列をまとめて検索するため、受信者ごとの文字列を作らずに済む。
+        start・stop で範囲を区切れば、大きなリストを少しずつ検索できる。
+
+        Args:
+            text: 検索する文字列（空の場合は範囲内の全件）
+            keys: 検索する列のキー（省略時は全ての列）
+            start: 検索を始める位置
+            stop: 検索を終える位置（この位置は含まない。省略時は最後まで）
+
+        Returns:
+            このリスト内の位置（0始まり）の昇順の配列
+        """
+        positions = range(len(self))[start:stop]
+        needle = text.encode('utf-8').lower()
+        if not needle or not positions:
+            return positions
+        rows = self._rows[positions.start:positions.stop]
+        low, high = min(rows[0], rows[-1]), max(rows[0], rows[-1]) + 1
+        found = set()
+        for key in (self._columns if keys is None else keys):
+            column = self._columns.get(key)
+            if column is not None:
+                found.update(column.find_all(needle, low, high))
+        if rows.step != 1:
+            return array('I', sorted(self._rows.index(index) for index in found if index in rows))
+        offset = self._rows.start
+        return array('I', [index - offset for index in sorted(found)])
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            view = RecipientStore.__new__(RecipientStore)
+            view._columns = self._columns
+            view._rows = self._rows[index]
+            view._is_view = True
+            return view
+        return RecipientRow(self._columns, self._rows[index])
+
+    def __iter__(self):
+        columns = self._columns
+        for index in self._rows:
+            yield RecipientRow(columns, index)
+
+    def __repr__(self) -> str:
+        return f"<RecipientStore {len(self)} recipients, columns={self.keys}>"
+
+    # 3: CSVのメールアドレスが空の行を再び含めるようにした（バージョン2のキャッシュは読み直す）
+    _DUMP_VERSION = 3
+
+    def dump(self, f, meta: Optional[Dict[str, Any]] = None):
+        """
+        列のデータをそのままバイナリファイルに書き出す（load で高速に読み込める）
+
+        Args:
+            f: バイナリモードで開いたファイル
+            meta: 一緒に保存する情報（元ファイルのサイズ・更新日時など）
+        """
+        if self._is_view:
+            raise TypeError("Cannot dump a slice of RecipientStore")
+        header = {
+            "version": self._DUMP_VERSION,
+            "byteorder": sys.byteorder,
+            "itemsize": array('I').itemsize,
+            "rows": len(self._rows),
+            "columns": [[key, len(column.data)] for key, column in self._columns.items()],
+            "meta": meta or {},
+        }
+        f.write(json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n')
+        for column in self._columns.values():
+            column.ends.tofile(f)
+            f.write(column.data)
+
+    @classmethod
+    def load(cls, f) -> tuple:
+        """
+        dump で書き出したファイルを読み込む
+
+        Returns:
+            (RecipientStore, meta) のタプル
+
+        Raises:
+            ValueError: 形式が異なる（別の環境・バージョンで書き出した）場合
+        """
+        header = json.loads(f.readline().decode('utf-8'))
+        if (header.get("version") != cls._DUMP_VERSION or header.get("byteorder") != sys.byteorder
+                or header.get("itemsize") != array('I').itemsize):
+            raise ValueError("Incompatible recipient cache")
+        rows = header["rows"]
+        store = cls(key for key, _ in header["columns"])
+        for (key, size), column in zip(header["columns"], store._columns.values()):
+            column.ends.fromfile(f, rows)
+            column.data = bytearray(f.read(size))
+            if len(column.data) != size:
+                raise ValueError("Truncated recipient cache")
+        store._rows = range(rows)
+        return store, header["meta"]
+
+
+# ==================== 読み込み結果のキャッシュ ====================
+
+class ParsedFileCache:
+    """
+    受信者リストとテンプレートを読み込んだ結果を (パス, サイズ, 更新日時) をキーにキャッシュする
+
+    ファイルが変更されるまでは同じ結果を返す。sidecar_dir を指定すると、読み込んだ受信者リストを
+    そのディレクトリにも保存し、次回の起動時も解析し直さずに読み込む（最近使った max_sidecars 件のみ保持）。
+    保存する受信者リストには個人情報が含まれるため、ディレクトリは 0700、ファイルは 0600 で作成する。
+    """
+
+    def __init__(self, sidecar_dir=None, max_sidecars: int = 8):
+        """
+        Args:
+            sidecar_dir: 受信者リストの保存先ディレクトリ（Noneの場合はメモリ上のみ）
+            max_sidecars: 保存しておく受信者リストの最大数
+        """
+        self.sidecar_dir = Path(sidecar_dir) if sidecar_dir is not None else None
+        self.max_sidecars = max_sidecars
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @staticmethod
+    def _signature(path: str) -> tuple:
+        """ファイルの変更を検出するための (サイズ, 更新日時) を返す"""
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _lookup(self, kind: str, path: str, load: Callable, sidecar: bool = False):
+        key = (kind, os.path.abspath(path))
+        signature = self._signature(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+        value = self._load_sidecar(key[1], signature) if sidecar else None
+        if value is None:
+            value = load(path)
+            if sidecar:
+                self._save_sidecar(key[1], signature, value)
+        with self._lock:
+            self._entries[key] = (signature, value)
+        return value
+
+    def recipients(self, path: str, load: Callable) -> 'RecipientStore':
+        """
+        受信者リストを返す（変更されていなければキャッシュから）
+
+        Args:
+            path: 受信者リストのファイルパス
+            load: キャッシュがない場合にファイルを読み込んで RecipientStore を返す関数 load(path)
+        """
+        return self._lookup('recipients', path, load, sidecar=self.sidecar_dir is not None)
+
+    def template(self, path: str, load: Callable) -> tuple:
+        """
+        テンプレートの (件名, 本文) を返す（変更されていなければキャッシュから）
+
+        Args:
+            path: テンプレートファイルのパス
+            load: キャッシュがない場合にファイルを読み込んで (件名, 本文) を返す関数 load(path)
+        """
+        subject, body = self._lookup('template', path, load)
+        # 解析済みのテンプレートは compile_template のキャッシュで共有される
+        compile_template(subject)
+        compile_template(body)
+        return subject, body
+
+    def _sidecar_path(self, path: str) -> Path:
+        return self.sidecar_dir / (hashlib.sha1(path.encode('utf-8')).hexdigest()[:16] + ".recipients")
+
+    def _load_sidecar(self, path: str, signature: tuple) -> Optional['RecipientStore']:
+        """保存済みの受信者リストを読み込む（元ファイルが変更されていれば None）"""
+        sidecar = self._sidecar_path(path)
+        try:
+            with open(sidecar, 'rb') as f:
+                store, meta = RecipientStore.load(f)
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+        if meta.get("path") != path or tuple(meta.get("signature", ())) != signature:
+            return None
+        try:
+            os.utime(sidecar)  # 最近使ったものとして残す
+        except OSError:
+            pass
+        return store
+
+    def _save_sidecar(self, path: str, signature: tuple, store: 'RecipientStore'):
+        """受信者リストを保存する（保存に失敗しても読み込み結果はそのまま使う）"""
+        try:
+            self.sidecar_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            os.chmod(self.sidecar_dir, 0o700)
+            sidecar = self._sidecar_path(path)
+            temp = sidecar.with_suffix(".tmp")
+            with open(temp, 'wb', opener=lambda file, flags: os.open(file, flags, 0o600)) as f:
+                store.dump(f, {"path": path, "signature": list(signature)})
+            os.replace(temp, sidecar)
+
+            # 古いものから削除して max_sidecars 件に保つ
+            sidecars = sorted(self.sidecar_dir.glob("*.recipients"), key=lambda p: p.stat().st_mtime, reverse=True)
+            for old in sidecars[self.max_sidecars:]:
+                old.unlink()
+        except (OSError, TypeError):
+            pass
+
+
+# ==================== 添付ファイルのキャッシュ ====================
+
+class CachedAttachment(MIMEBase):
+    """
+    エンコード済みの添付ファイルのパート
+
+    複数のメッセージで同じインスタンスを共有し、シリアライズしたバイト列も改行コードごとに
+    一度だけ作成して再利用する（_CachingBytesGenerator を使用した場合）。
+    """
+
+    def __init__(self, maintype: str, subtype: str, **params):
+        super().__init__(maintype, subtype, **params)
+        self.serialized = {}
+
+
+class StreamedAttachment(CachedAttachment):
+    """
+    送信時にファイルから少しずつBase64エンコードして書き出す添付ファイルのパート
+
+    ペイロードをメモリに持たず、シリアライズ時はヘッダーの後に目印（token）だけを書き出す。
+    _flatten_message がその位置でメッセージを分割し（StreamedMessage）、
+    DATA送信時に chunks() の出力を差し込む。
+    """
+
+    # 76文字のBase64行がちょうど並ぶよう、読み込みサイズは57バイトの倍数にする
+    CHUNK_SIZE = 57 * 4096
+
+    def __init__(self, file_path: str, maintype: str, subtype: str, **params):
+        super().__init__(maintype, subtype, **params)
+        self.file_path = file_path
+        self.token = b'\0stream-%032x\0' % random.getrandbits(128)
+
+    def chunks(self):
+        """ファイルを CHUNK_SIZE ずつ読み込み、CRLF改行のBase64にして返す"""
+        with open(self.file_path, 'rb') as f:
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield base64.encodebytes(chunk).replace(b'\n', b'\r\n')
+
+
+class StreamedMessage:
+    """添付ファイルの本体を送信時に読み込むメッセージ（bytes と StreamedAttachment の並び）"""
+
+    __slots__ = ('parts',)
+
+    def __init__(self, parts: list):
+        self.parts = parts
+
+    @classmethod
+    def split(cls, data: bytes, attachments: list) -> 'StreamedMessage':
+        """シリアライズしたメッセージを StreamedAttachment の目印の位置で分割"""
+        parts = []
+        for attachment in attachments:
+            head, found, data = data.partition(attachment.token)
+            if not found:
+                raise ValueError("Streamed attachment is missing from the serialized message")
+            parts += [head, attachment]
+        parts.append(data)
+        return cls(parts)
+
+    def chunks(self):
+        """メッセージ本体を先頭から順に返す（どのチャンクも行頭から始まる）"""
+        for part in self.parts:
+            if isinstance(part, bytes):
+                yield part
+            else:
+                yield from part.chunks()
+
+
+class AttachmentCache:
+    """添付ファイルのパートを (パス, サイズ, 更新日時) をキーにキャッシュする"""
+
+    def __init__(self, stream_threshold: int = 0):
+        """
+        Args:
+            stream_threshold: このサイズ（バイト）以上の添付ファイルはメモリに読み込まず、
+                              送信時にファイルから少しずつエンコードする（0の場合は常に読み込む）
+        """
+        self._lock = threading.Lock()
+        self._parts = {}
+        self.stream_threshold = stream_threshold
+
+    def get(self, file_path: str) -> Optional[CachedAttachment]:
+        """
+        添付ファイルのパートを返す（ファイルが変更されていれば作り直す）
+
+        Returns:
+            CachedAttachment（stream_threshold 以上のファイルは StreamedAttachment）。
+            ファイルが存在しない場合は None
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        streamed = bool(self.stream_threshold) and stat.st_size >= self.stream_threshold
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime, streamed)
+        with self._lock:
+            part = self._parts.get(key[0])
+            if part is not None and part[0] == key:
+                return part[1]
+        built = self._build(file_path, streamed)
+        with self._lock:
+            self._parts[key[0]] = (key, built)
+        return built
+
+    def prepare(self, attachments: Iterable[str]):
+        """添付ファイルを先にまとめてエンコードしておく"""
+        for file_path in attachments:
+            self.get(file_path)
+
+    @staticmethod
+    def _build(file_path: str, streamed: bool = False) -> CachedAttachment:
+        """添付ファイルを読み込んでBase64エンコードしたパートを作成（streamed の場合は読み込まない）"""
+        # ファイルのMIMEタイプを推測
+        filename = os.path.basename(file_path)
+        mime_type, _ = mimetypes.guess_type(file_path)
+        if mime_type is None:
+            mime_type = 'application/octet-stream'
+
+        # MIMEタイプを分割（例: 'image/png' -> 'image', 'png'）
+        maintype, subtype = mime_type.split('/', 1)
+
+        if streamed:
+            part = StreamedAttachment(file_path, maintype, subtype)
+            part['Content-Transfer-Encoding'] = 'base64'
+        else:
+            part = CachedAttachment(maintype, subtype)
+            with open(file_path, 'rb') as f:
+                part.set_payload(f.read())
+            encoders.encode_base64(part)
+
+        # Content-Typeヘッダーにnameパラメータを追加（日本語ファイル名対応）
+        encoded_filename = str(Header(filename, 'utf-8'))
+        part.set_param('name', encoded_filename)
+        # Content-Dispositionヘッダーを設定
+        part.add_header('Content-Disposition', 'attachment', filename=encoded_filename)
+        return part
+
+
+class _CachingBytesGenerator(BytesGenerator):
+    """
+    CachedAttachment をシリアライズ済みのバイト列で書き出す BytesGenerator
+
+    StreamedAttachment はヘッダーと本体の目印だけを書き出す。
+    """
+
+    def __init__(self, outfp, *args, **kwargs):
+        super().__init__(outfp, *args, **kwargs)
+        self._out = outfp
+
+    def flatten(self, msg, unixfrom=False, linesep=None):
+        if isinstance(msg, CachedAttachment) and not unixfrom:
+            data = msg.serialized.get(linesep)
+            if data is None:
+                with io.BytesIO() as buffer:
+                    BytesGenerator.flatten(self.clone(buffer), msg, linesep=linesep)
+                    data = buffer.getvalue()
+                if isinstance(msg, StreamedAttachment):
+                    data += msg.token
+                msg.serialized[linesep] = data
+            self._out.write(data)
+            return
+        super().flatten(msg, unixfrom, linesep)
+
+
+# ==================== SMTP送信ヘルパー ====================
+
+def _flatten_message(msg) -> tuple:
+    """
+    smtplib.send_message と同じ規則でメッセージをエンベロープと本体に展開
+
+    Args:
+        msg: email.message.Message インスタンス
+
+    Returns:
+        (from_addr, to_addrs, data) のタプル。data はCRLF改行のバイト列
+        （StreamedAttachment を含む場合は StreamedMessage）
+    """
+    from_addr = getaddresses([msg['Sender'] or msg['From']])[0][1]
+    addr_fields = [f for f in (msg['To'], msg['Bcc'], msg['Cc']) if f is not None]
+    to_addrs = [addr for _, addr in getaddresses(addr_fields)]
+
+    # BCCはヘッダーに残さない
+    msg_copy = copy.copy(msg)
+    del msg_copy['Bcc']
+    del msg_copy['Resent-Bcc']
+    with io.BytesIO() as bytesmsg:
+        _CachingBytesGenerator(bytesmsg).flatten(msg_copy, linesep='\r\n')
+        data = bytesmsg.getvalue()
+    streamed = [part for part in msg.walk() if isinstance(part, StreamedAttachment)]
+    if streamed:
+        data = StreamedMessage.split(data, streamed)
+    return from_addr, to_addrs, data
+
+
+def _dot_stuff(data: bytes) -> bytes:
+    """DATA送信用に行頭のピリオドをエスケープし、終端シーケンスを付加"""
+    data = re.sub(br'(?m)^\.', b'..', data)
+    if not data.endswith(b'\r\n'):
+        data += b'\r\n'
+    return data + b'.\r\n'
+
+
+def _data_chunks(data) -> Iterable[bytes]:
+    """
+    DATA送信用に行頭のピリオドをエスケープしたバイト列を順に返す（最後に終端シーケンスを付加）
+
+    StreamedMessage の場合は添付ファイルを少しずつ読み込んでエンコードするため、
+    メモリに載るのは一度に1チャンク分だけになる。
+    """
+    if not isinstance(data, StreamedMessage):
+        yield _dot_stuff(data)
+        return
+    last = b''
+    for chunk in data.chunks():
+        if chunk:
+            last = chunk
+            yield re.sub(br'(?m)^\.', b'..', chunk)
+    yield b'.\r\n' if last.endswith(b'\r\n') else b'\r\n.\r\n'
+
+
+def _create_tls_context() -> ssl.SSLContext:
+    """smtplib の starttls() 既定動作と同じく、証明書を検証しないTLSコンテキストを作成"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def _safe_rset(server):
+    """RSETを送信（切断済みの場合は無視）"""
+    try:
+        server.rset()
+    except (smtplib.SMTPException, OSError):
+        pass
+
+
+def _check_pipelined_replies(from_addr: str, to_addrs: list, mail_reply: tuple,
+                             rcpt_replies: list, data_reply: tuple) -> dict:
+    """
+    パイプラインでまとめて受け取った MAIL/RCPT/DATA の応答を検証
+
+    Returns:
+        拒否された宛先の辞書 {address: (code, message)}
+
+    Raises:
+        smtplib.SMTPSenderRefused / SMTPRecipientsRefused / SMTPDataError
+    """
+    refused = {
+        addr: reply for addr, reply in zip(to_addrs, rcpt_replies)
+        if reply[0] not in (250, 251)
+    }
+    if mail_reply[0] != 250:
+        raise smtplib.SMTPSenderRefused(mail_reply[0], mail_reply[1], from_addr)
+    if len(refused) == len(to_addrs):
+        raise smtplib.SMTPRecipientsRefused(refused)
+    if data_reply[0] != 354:
+        raise smtplib.SMTPDataError(data_reply[0], data_reply[1])
+    return refused
+
+
+def _sendmail_pipelined(server, from_addr: str, to_addrs: list, data) -> dict:
+    """
+    PIPELINING (RFC 2920) で MAIL FROM / RCPT TO / DATA を1往復で送信
+
+    Args:
+        server: ログイン済みの smtplib.SMTP インスタンス
+        from_addr: エンベロープ送信元
+        to_addrs: エンベロープ宛先のリスト（To/CC/BCC）
+        data: CRLF改行のメッセージ本体（bytes または StreamedMessage）
+
+    Returns:
+        拒否された宛先の辞書 {address: (code, message)}
+    """
+    commands = [f"MAIL FROM:<{from_addr}>"] + [f"RCPT TO:<{addr}>" for addr in to_addrs] + ["DATA"]
+    server.send(''.join(command + '\r\n' for command in commands))
+
+    # 送ったコマンドの順に応答を読み、宛先ごとの結果に対応付ける
+    replies = []
+    for _ in range(len(to_addrs) + 2):
+        replies.append(server.getreply())
+        if replies[-1][0] == 421:
+            # サーバーは接続を閉じるため、残りの応答は読まずに421応答として扱う
+            server.close()
+            raise smtplib.SMTPResponseException(*replies[-1])
+    mail_reply, rcpt_replies, data_reply = replies[0], replies[1:-1], replies[-1]
+    try:
+        refused = _check_pipelined_replies(from_addr, to_addrs, mail_reply, rcpt_replies, data_reply)
+    except smtplib.SMTPException:
+        if data_reply[0] == 354:
+            # DATAが受理されてしまった場合は空の本文で終端してから取り消す
+            server.send('.\r\n')
+            server.getreply()
+        _safe_rset(server)
+        raise
+
+    code, message = _send_data(server, data)
+    if code != 250:
+        raise smtplib.SMTPDataError(code, message)
+    return refused
+
+
+def _sendmail_streamed(server, from_addr: str, to_addrs: list, data) -> dict:
+    """
+    smtplib.sendmail と同じ手順で1コマンドずつ送信し、本体は少しずつ書き出す
+    （PIPELINING に対応していないサーバーで使用。本文を送り始めた後のエラーを区別できる）
+
+    Returns:
+        拒否された宛先の辞書 {address: (code, message)}
+    """
+    server.ehlo_or_helo_if_needed()
+    code, message = server.mail(from_addr)
+    if code != 250:
+        _safe_rset(server)
+        raise smtplib.SMTPSenderRefused(code, message, from_addr)
+    refused = {}
+    for addr in to_addrs:
+        code, message = server.rcpt(addr)
+        if code not in (250, 251):
+            refused[addr] = (code, message)
+    if len(refused) == len(to_addrs):
+        _safe_rset(server)
+        raise smtplib.SMTPRecipientsRefused(refused)
+    code, message = server.docmd("DATA")
+    if code != 354:
+        _safe_rset(server)
+        raise smtplib.SMTPDataError(code, message)
+
+    code, message = _send_data(server, data)
+    if code != 250:
+        raise smtplib.SMTPDataError(code, message)
+    return refused
+
+
+def _send_data(server, data) -> tuple:
+    """
+    DATA の本文を送信して終了の応答 (code, message) を返す
+
+    本文を送り始めた後の切断・タイムアウトはサーバーが受け取ったかどうか分からないため、
+    例外に after_data を付けて区別できるようにする（_is_delivery_uncertain を参照）。
+    """
+    try:
+        for chunk in _data_chunks(data):
+            server.send(chunk)
+        return server.getreply()
+    except Exception as e:
+        e.after_data = True
+        raise
+
+
+def _is_delivery_uncertain(error: Optional[Exception]) -> bool:
+    """本文を送り始めた後の切断・タイムアウト（サーバーが受け取ったかどうか分からない）かどうか"""
+    return error is not None and getattr(error, 'after_data', False) and _is_connection_error(error)
+
+
+def _reply_text(message) -> str:
+    """SMTP応答メッセージ（バイト列）を表示用の文字列に変換"""
+    if isinstance(message, bytes):
+        return message.decode('utf-8', 'replace')
+    return str(message)
+
+
+def _recipient_error(to_email: str, refused: dict) -> Optional[Exception]:
+    """To の宛先自体が拒否された場合、その受信者の送信失敗として扱う例外を返す"""
+    if to_email in refused:
+        return smtplib.SMTPRecipientsRefused({to_email: refused[to_email]})
+    return None
+
+
+# ==================== メッセージのスケルトン ====================
+
+class MessageSkeleton:
+    """
+    キャンペーンで共通の部分をシリアライズ済みのバイト列として一度だけ作成し、
+    受信者ごとに To・件名・本文だけを差し込んで送信用のバイト列を組み立てる
+
+    From・Cc・Reply-To・MIME構造・添付ファイルはメッセージごとに email.generator を通さない。
+    差し込む部分も BytesGenerator と同じ規則（compat32 の折り返し・76文字ごとのBase64）で
+    エンコードするため、出力は create_message + _flatten_message と境界文字列以外同じになる。
+    """
+
+    # BytesGenerator が SMTP 送信時に使う規則と同じもの
+    _POLICY = compat32.clone(linesep='\r\n')
+
+    def __init__(self, sender, subject_template, body_template,
+                 cc=None, bcc=None, reply_to=None, attachments=None, boundary=None):
+        """
+        Args:
+            sender: 送信元の EmailBulkSender
+            subject_template: 件名テンプレート（文字列または CompiledTemplate）
+            body_template: 本文テンプレート（文字列または CompiledTemplate）
+            cc: CCアドレス
+            bcc: BCCアドレス
+            reply_to: 返信先アドレス
+            attachments: 添付ファイルパスのリスト
+            boundary: MIMEの境界文字列（省略時はランダム）
+
+        Raises:
+            ValueError: 差し込み位置をスケルトン内で一意に特定できない場合
+        """
+        self.subject = compile_template(subject_template)
+        self.body = compile_template(body_template)
+
+        # 差し込み位置の目印を入れたメッセージを一度だけ組み立ててシリアライズする
+        marker = 'skeleton%032x' % random.getrandbits(128)
+        to_marker = marker + '@to.invalid'
+        subject_marker = marker + '-subject'
+        body_marker = marker + '-body'
+        msg = sender.create_message(to_marker, '', '', '', '', cc, bcc, reply_to, attachments,
+                                    fields={}, boundary=boundary)
+        msg.replace_header('Subject', subject_marker)
+        msg.get_payload(0).set_payload(body_marker + '\n')
+        self.from_addr, to_addrs, data = _flatten_message(msg)
+        # エンベロープの宛先は To の後に BCC・CC（_flatten_message と同じ順）
+        self.other_addrs = to_addrs[1:]
+        # ストリーミングする添付ファイルは送信時に読み込むため、その位置以降はそのまま持つ
+        self._streamed_parts = []
+        if isinstance(data, StreamedMessage):
+            data, self._streamed_parts = data.parts[0], data.parts[1:]
+
+        self._segments = []
+        for cut in (b'To: %s\r\n' % to_marker.encode('ascii'),
+                    b'Subject: %s\r\n' % subject_marker.encode('ascii'),
+                    b'%s\r\n' % body_marker.encode('ascii')):
+            head, found, data = data.partition(cut)
+            if not found or cut in data or cut in head:
+                raise ValueError("Cannot locate placeholder in message skeleton")
+            self._segments.append(head)
+        self._segments.append(data)
+
+    def render(self, recipient: Dict[str, str]) -> tuple:
+        """
+        受信者のメッセージを組み立てる
+
+        Args:
+            recipient: 受信者辞書（全ての列を差し込みに使う）
+
+        Returns:
+            (from_addr, to_addrs, data) のタプル。data はCRLF改行のバイト列
+            （ストリーミングする添付ファイルがある場合は StreamedMessage）
+        """
+        to_email = recipient['email']
+        before_to, before_subject, before_body, tail = self._segments
+        body = self.body.render(recipient).encode('utf-8')
+        data = b''.join((
+            before_to,
+            self._POLICY.fold_binary('To', to_email),
+            before_subject,
+            self._POLICY.fold_binary('Subject', Header(self.subject.render(recipient), 'utf-8')),
+            before_body,
+            base64mime.body_encode(body, eol='\r\n').encode('ascii'),
+            tail,
+        ))
+        to_addrs = [addr for _, addr in getaddresses([to_email])] + self.other_addrs
+        if self._streamed_parts:
+            data = StreamedMessage([data] + self._streamed_parts)
+        return self.from_addr, to_addrs, data
+
+
+# ==================== 送信レート制限 ====================
+
+class TokenBucket:
+    """1期間分のトークンバケット（rate: 1秒あたりの補充数、capacity: バースト許容数）"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_token(self) -> float:
+        """次のトークンが貯まるまでの秒数"""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    秒/分/時/日ごとのトークンバケットを組み合わせた送信レート制限（スレッドセーフ）
+
+    全てのバケットにトークンがあるときだけ1通分を消費する。
+    複数の接続・送信エンジンから共有して使用する。
+    """
+
+    PERIODS = {'per_second': 1, 'per_minute': 60, 'per_hour': 3600, 'per_day': 86400}
+
+    def __init__(self, buckets: Optional[Dict[str, TokenBucket]] = None):
+        self._lock = threading.Lock()
+        self.buckets = buckets or {}
+        # 自動スロットリングで一時的に追加される上限と一時停止
+        self.adaptive = None
+        self.paused_until = 0.0
+
+    @classmethod
+    def from_config(cls, rate_limits: Optional[Dict[str, Any]], delay: Optional[float] = None) -> 'RateLimiter':
+        """
+        設定からレート制限を作成
+
+        Args:
+            rate_limits: {"per_minute": 100, "per_day": {"limit": 2000, "burst": 200}} 形式の辞書
+            delay: rate_limits がない場合に使用する送信間隔（秒）
+
+        Returns:
+            RateLimiter インスタンス（制限がない場合はバケットなし）
+        """
+        buckets = {}
+        for period, value in (rate_limits or {}).items():
+            if period not in cls.PERIODS or not value:
+                continue
+            if isinstance(value, dict):
+                limit = float(value.get('limit') or 0)
+                burst = float(value.get('burst') or 1)
+            else:
+                limit = float(value)
+                burst = 1
+            if limit > 0:
+                buckets[period] = TokenBucket(limit / cls.PERIODS[period], min(burst, limit))
+
+        # 後方互換: rate_limits がなければ送信間隔を1通ずつの秒間レートとして扱う
+        if not buckets and delay:
+            buckets['per_second'] = TokenBucket(1.0 / float(delay), 1)
+        return cls(buckets)
+
+    def reserve(self) -> float:
+        """
+        1通分の送信枠を取得する
+
+        Returns:
+            取得できた場合は 0、できなかった場合は次に取得できるまでの待ち秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            buckets = list(self.buckets.values())
+            if self.adaptive is not None:
+                buckets.append(self.adaptive)
+            wait = max(0.0, self.paused_until - now)
+            for bucket in buckets:
+                bucket.refill(now)
+                wait = max(wait, bucket.time_until_token())
+            if wait > 0:
+                return wait
+            for bucket in buckets:
+                bucket.tokens -= 1
+            return 0.0
+
+    def base_rate(self) -> Optional[float]:
+        """設定上の最も厳しい秒間レート（制限なしの場合は None）"""
+        rates = [bucket.rate for bucket in self.buckets.values()]
+        return min(rates) if rates else None
+
+    def effective_rate(self) -> Optional[float]:
+        """自動スロットリングを含めた現在の秒間レート（制限なしの場合は None）"""
+        rates = [bucket.rate for bucket in self.buckets.values()]
+        if self.adaptive is not None:
+            rates.append(self.adaptive.rate)
+        return min(rates) if rates else None
+
+    def set_adaptive_rate(self, rate: Optional[float]):
+        """自動スロットリングによる上限を設定（None で解除）"""
+        with self._lock:
+            if rate is None:
+                self.adaptive = None
+            elif self.adaptive is None:
+                self.adaptive = TokenBucket(rate, 1)
+            else:
+                self.adaptive.refill(time.monotonic())
+                self.adaptive.rate = rate
+
+    def pause(self, seconds: float):
+        """全ての送信を指定秒数停止する"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self, cancel_event: Optional[threading.Event] = None) -> bool:
+        """
+        送信枠が取れるまで待機する（ワーカースレッド用）
+
+        Returns:
+            取得できたら True、待機中にキャンセルされたら False
+        """
+        while True:
+            wait = self.reserve()
+            if wait <= 0:
+                return True
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+    async def acquire_async(self, cancel_event: Optional[threading.Event] = None) -> bool:
+        """送信枠が取れるまで待機する（asyncioワーカー用）"""
+        while True:
+            wait = self.reserve()
+            if wait <= 0:
+                return True
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline:
+                if cancel_event is not None and cancel_event.is_set():
+                    return False
+                await asyncio.sleep(min(deadline - time.monotonic(), 0.2))
+
+    def describe(self) -> str:
+        """設定内容を表示用の文字列にする（例: "100/per_minute, 2000/per_day"）"""
+        parts = []
+        for period, bucket in self.buckets.items():
+            limit = bucket.rate * self.PERIODS[period]
+            text = f"{limit:g}/{period}"
+            if bucket.capacity > 1:
+                text += f" (burst {bucket.capacity:g})"
+            parts.append(text)
+        return ', '.join(parts)
+
+
+THROTTLE_CODES = (421, 450, 451)
+
+
+def _smtp_error_code(error) -> Optional[int]:
+    """SMTP例外から応答コードを取り出す（複数宛先の場合は最も小さいコード）"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return min(codes) if codes else None
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code
+    return None
+
+
+class AdaptiveThrottle:
+    """
+    SMTPの制限応答（421/450/451）に応じて送信レートを調整するAIMD制御
+
+    制限応答を受けたらレートを乗算的に下げ（421の場合は一時停止も行う）、
+    成功が続いたら設定上限に向けて加算的に戻す。
+    """
+
+    def __init__(self, rate_limiter: RateLimiter, decrease: float = 0.5, increase: float = 0.05,
+                 pause: float = 30, min_rate: float = 1 / 60, on_change: Optional[Callable] = None):
+        """
+        Args:
+            rate_limiter: 調整対象の RateLimiter
+            decrease: 制限応答を受けたときにレートに掛ける係数
+            increase: 成功1件ごとに戻すレート（上限レートに対する割合）
+            pause: 421応答を受けたときの一時停止秒数
+            min_rate: 下げる際の最低レート（通/秒）
+            on_change: レートが変わったときに呼ばれるコールバック on_change(rate, pause_seconds)
+        """
+        self.rate_limiter = rate_limiter
+        self.decrease = decrease
+        self.increase = increase
+        self.pause = pause
+        self.min_rate = min_rate
+        self.on_change = on_change
+
+        self._lock = threading.Lock()
+        self._rate = None
+        self._reference = None
+        self._reported_rate = None
+        self._last_decrease = 0.0
+        self._recent_successes = deque(maxlen=20)
+
+    @classmethod
+    def from_config(cls, options: Optional[Dict[str, Any]], rate_limiter: RateLimiter,
+                    on_change: Optional[Callable] = None) -> Optional['AdaptiveThrottle']:
+        """設定（email_options.adaptive_throttle）から作成。無効の場合は None"""
+        options = options or {}
+        if not options.get('enabled', True):
+            return None
+        return cls(
+            rate_limiter,
+            decrease=float(options.get('decrease', 0.5)),
+            increase=float(options.get('increase', 0.05)),
+            pause=float(options.get('pause', 30)),
+            on_change=on_change,
+        )
+
+    def record(self, result: 'SendResult'):
+        """送信結果を1件反映する"""
+        codes = [_smtp_error_code(result.error)] + [code for code, _ in result.refused.values()]
+        throttle_codes = [code for code in codes if code in THROTTLE_CODES]
+        if throttle_codes:
+            self._slow_down(min(throttle_codes))
+        elif result.success:
+            self._speed_up()
+
+    def _observed_rate(self, now: float) -> float:
+        """直近の成功間隔から実際の送信レートを推定"""
+        if len(self._recent_successes) >= 2:
+            elapsed = now - self._recent_successes[0]
+            if elapsed > 0:
+                return (len(self._recent_successes) - 1) / elapsed
+        return 1.0
+
+    def _slow_down(self, code: int):
+        with self._lock:
+            now = time.monotonic()
+            # 同時に送信中だった複数の応答で何度も下げないよう、短時間の連続は1回とみなす
+            if now - self._last_decrease < 2:
+                return
+            self._last_decrease = now
+
+            current = self._rate or self.rate_limiter.base_rate() or self._observed_rate(now)
+            if self._reference is None:
+                self._reference = current
+            self._rate = max(self.min_rate, current * self.decrease)
+            self.rate_limiter.set_adaptive_rate(self._rate)
+
+            pause_seconds = 0
+            if code == 421:
+                pause_seconds = self.pause
+                self.rate_limiter.pause(pause_seconds)
+            self._notify(pause_seconds)
+
+    def _speed_up(self):
+        with self._lock:
+            now = time.monotonic()
+            self._recent_successes.append(now)
+            if self._rate is None:
+                return
+            ceiling = self.rate_limiter.base_rate() or self._reference
+            self._rate += ceiling * self.increase
+            if self._rate >= ceiling:
+                # 設定上限まで戻ったら自動スロットリングの上限を解除
+                self._rate = None
+                self._reference = None
+            self.rate_limiter.set_adaptive_rate(self._rate)
+
+            # 10%以上変化したときと上限に戻ったときだけ通知する
+            reported = self._reported_rate
+            if self._rate is None or reported is None or self._rate >= reported * 1.1:
+                self._notify(0)
+
+    def _notify(self, pause_seconds: float):
+        self._reported_rate = self._rate
+        if self.on_change:
+            self.on_change(self.rate_limiter.effective_rate(), pause_seconds)
+
+
+# ==================== 受信者ドメインごとのスケジューリング ====================
+
+class _DomainState:
+    """1ドメイン（設定のキーが同じドメインはまとめて1つ）の送信状況"""
+
+    __slots__ = ('limiter', 'concurrency', 'in_flight')
+
+    def __init__(self, limiter: RateLimiter, concurrency: int):
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.in_flight = 0
+
+
+class DomainScheduler:
+    """
+    受信者のドメインごとに送信を振り分けるスケジューラ
+
+    受信者リストを先読みしてドメインごとに分け、ドメインを順番に（ラウンドロビンで）並べ替える。
+    会社ごとに並んだ受信者リストでも、同じドメインに続けて送らないようにする。
+    送信時には SendQueue から呼ばれ、ドメインごとの同時送信数と送信レートの上限を適用する
+    （上限に達したドメインの受信者は保留し、その間は他のドメインの受信者を送る）。
+
+    設定（email_options.domain_limits）はドメインをキーにした辞書で、値には同時送信数
+    （concurrency）と rate_limits と同じ形式の期間ごとの上限通数を指定する。キーのドメインの
+    サブドメインも同じ上限を共有する。"*" はその他の各ドメインに個別に適用する既定値。
+    """
+
+    DEFAULT_KEY = '*'
+    # 並べ替えのために先読みする受信者数
+    WINDOW = 10000
+    # 上限に達したドメインの受信者を保留する最大件数（超えたら受信者リストの読み込みを止める）
+    HOLD_LIMIT = 1000
+    # 同時送信数の上限に達しているドメインを再確認するまでの秒数
+    BUSY_WAIT = 0.05
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, Any]]] = None, window: int = WINDOW):
+        """
+        Args:
+            limits: {"gmail.com": {"concurrency": 2, "per_minute": 60}, "*": {"concurrency": 4}} 形式の辞書
+            window: 並べ替えのために先読みする受信者数
+
+        Raises:
+            ValueError: 設定の形式が正しくない場合
+        """
+        self.limits = {}
+        for domain, config in (limits or {}).items():
+            if not isinstance(config, dict):
+                raise ValueError(f"invalid domain limit for '{domain}': {config!r}")
+            # 設定が正しいかここで確認しておく
+            int(config.get('concurrency') or 0)
+            RateLimiter.from_config(config)
+            self.limits[domain.strip().lower().lstrip('.')] = config
+        self.window = max(1, int(window))
+        self.hold_limit = self.HOLD_LIMIT
+        self._lock = threading.Lock()
+        self._groups = {}  # ドメイン -> 上限を共有するグループ（設定のキーまたはドメイン自身）
+        self._states = {}  # グループ -> _DomainState
+
+    @classmethod
+    def from_config(cls, domain_limits: Optional[Dict[str, Dict[str, Any]]]) -> Optional['DomainScheduler']:
+        """設定から作成（設定がない場合は None）"""
+        return cls(domain_limits) if domain_limits else None
+
+    def group_of(self, email: str) -> str:
+        """メールアドレスのドメインが属するグループ（最も長く一致する設定のキー、なければドメイン）"""
+        domain = email.rpartition('@')[2].strip().lower().rstrip('.')
+        group = self._groups.get(domain)
+        if group is None:
+            group = domain
+            parts = domain.split('.')
+            for i in range(len(parts)):
+                candidate = '.'.join(parts[i:])
+                if candidate in self.limits:
+                    group = candidate
+                    break
+            self._groups[domain] = group
+        return group
+
+    def _state(self, group: str) -> _DomainState:
+        state = self._states.get(group)
+        if state is None:
+            config = self.limits.get(group) or self.limits.get(self.DEFAULT_KEY) or {}
+            state = _DomainState(RateLimiter.from_config(config), int(config.get('concurrency') or 0))
+            self._states[group] = state
+        return state
+
+    def interleave(self, recipients: Iterable[Dict[str, str]]):
+        """
+        受信者をドメインごとに1件ずつ順番に返す（先読みは window 件まで）
+
+        Args:
+            recipients: 受信者の辞書（またはMapping）を順に返す反復可能オブジェクト
+        """
+        source = iter(recipients)
+        buffers = OrderedDict()  # グループ -> 受信者の deque（先頭のグループから順に返す）
+        buffered = 0
+        exhausted = False
+        while True:
+            while not exhausted and buffered < self.window:
+                recipient = next(source, None)
+                if recipient is None:
+                    exhausted = True
+                    break
+                group = self.group_of(recipient['email'])
+                pending = buffers.get(group)
+                if pending is None:
+                    pending = buffers[group] = deque()
+                pending.append(recipient)
+                buffered += 1
+            if not buffers:
+                return
+            group, pending = next(iter(buffers.items()))
+            recipient = pending.popleft()
+            buffered -= 1
+            if pending:
+                buffers.move_to_end(group)
+            else:
+                del buffers[group]
+            yield recipient
+
+    def acquire(self, recipient: Dict[str, str]) -> float:
+        """
+        受信者のドメインの送信枠を取得する
+
+        Returns:
+            取得できた場合は 0（送信後に release を呼ぶこと）、できなかった場合は再確認するまでの秒数
+        """
+        group = self.group_of(recipient['email'])
+        with self._lock:
+            state = self._state(group)
+            if state.concurrency and state.in_flight >= state.concurrency:
+                return self.BUSY_WAIT
+            wait = state.limiter.reserve()
+            if wait > 0:
+                return wait
+            state.in_flight += 1
+            return 0.0
+
+    def release(self, recipient: Dict[str, str]):
+        """acquire で取得した送信枠を返す"""
+        group = self.group_of(recipient['email'])
+        with self._lock:
+            state = self._states.get(group)
+            if state is not None and state.in_flight > 0:
+                state.in_flight -= 1
+
+    def describe(self) -> str:
+        """設定内容を表示用の文字列にする（例: "gmail.com: concurrency 2, 60/per_minute"）"""
+        parts = []
+        for domain, config in self.limits.items():
+            details = []
+            if config.get('concurrency'):
+                details.append(f"concurrency {int(config['concurrency'])}")
+            rate = RateLimiter.from_config(config).describe()
+            if rate:
+                details.append(rate)
+            parts.append(f"{domain}: {', '.join(details) or 'interleave only'}")
+        return '; '.join(parts)
+
+
+# ==================== 送信ジャーナル ====================
+
+class SendJournal:
+    """
+    受信者ごとの送信結果を記録する追記型ジャーナル（SQLite WALモード）
+
+    キャンペーン（受信者リストとテンプレートの組み合わせ）とメールアドレスを
+    キーに結果を追記し、中断した送信を送信済みの受信者を飛ばして再開できるようにする。
+    書き込みはまとめてコミットし、送信処理のボトルネックにならないようにする。
+    """
+
+    def __init__(self, path, campaign: str, batch_size: int = 100, flush_interval: float = 1.0):
+        """
+        Args:
+            path: ジャーナルファイル（SQLite）のパス
+            campaign: キャンペーンID
+            batch_size: まとめてコミットする件数
+            flush_interval: 最後のコミットからこの秒数が経ったら件数に関わらずコミット
+        """
+        self.path = str(path)
+        self.campaign = campaign
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outcomes ("
+            "id INTEGER PRIMARY KEY, campaign TEXT NOT NULL, email TEXT NOT NULL, "
+            "status TEXT NOT NULL, detail TEXT, ts REAL NOT NULL, sender TEXT)"
+        )
+        # 送信元列のない古いジャーナルには列を追加する
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(outcomes)")]
+        if 'sender' not in columns:
+            self._db.execute("ALTER TABLE outcomes ADD COLUMN sender TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outcomes_campaign ON outcomes (campaign, email)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outcomes_sender ON outcomes (sender, ts)")
+        self._db.commit()
+
+    @staticmethod
+    def campaign_id(csv_file: str, template_file: str) -> str:
+        """受信者リストとテンプレートのパスからキャンペーンIDを作成"""
+        key = os.path.abspath(csv_file) + "\0" + os.path.abspath(template_file)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def for_campaign(cls, config_dir, csv_file: str, template_file: str) -> 'SendJournal':
+        """設定ディレクトリのジャーナルファイルを開く"""
+        return cls(Path(config_dir) / "journal.sqlite3", cls.campaign_id(csv_file, template_file))
+
+    def record(self, email: str, status: str, detail: str = '', sender: Optional[str] = None):
+        """結果を1件追記（まとめてコミットするまではメモリに保持）"""
+        with self._lock:
+            self._pending.append((self.campaign, email, status, detail, time.time(), sender))
+            if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def record_result(self, result: 'SendResult', sender: Optional[str] = None):
+        """SendResult を記録（status は sent / deferred / failed / gave_up、sender は送信元アドレス）"""
+        if result.success:
+            self.record(result.recipient['email'], result.status, sender=sender)
+        else:
+            self.record(result.recipient['email'], result.status, str(result.error), sender)
+
+    def flush(self):
+        """保持している結果をコミット"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending:
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO outcomes (campaign, email, status, detail, ts, sender) VALUES (?, ?, ?, ?, ?, ?)",
+                    self._pending
+                )
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def delivered(self) -> set:
+        """このキャンペーンで送信済みのメールアドレスの集合"""
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT email FROM outcomes WHERE campaign = ? AND status = 'sent'",
+                (self.campaign,)
+            )
+            return {row[0] for row in rows}
+
+    def sent_count(self, sender: str, seconds: float = 86400) -> int:
+        """送信元アドレスが直近 seconds 秒間に送信した通数（全キャンペーン合計）"""
+        self.flush()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*) FROM outcomes WHERE sender = ? AND status = 'sent' AND ts >= ?",
+                (sender, time.time() - seconds)
+            ).fetchone()
+            return row[0]
+
+    def pending(self, recipients) -> list:
+        """送信済みの受信者を除いたリストを返す"""
+        delivered = self.delivered()
+        return [r for r in recipients if r['email'] not in delivered]
+
+    def close(self):
+        """残りをコミットして閉じる"""
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+# ==================== 送信の一時停止・中止 ====================
+
+class SendController:
+    """
+    送信中のキャンペーンの一時停止・再開・中止
+
+    画面やシグナルハンドラから操作し、送信ワーカーは次のメッセージを送る前に checkpoint で
+    状態を確認する。一時停止・中止しても送信中のメッセージは最後まで送り切る。
+    待機中のワーカーは cancel_event で中止を受け取るため、中止はすぐに反映される。
+    """
+
+    POLL_INTERVAL = 0.2    # 一時停止中に状態を確認する間隔（秒）
+
+    def __init__(self, cancel_event: Optional[threading.Event] = None):
+        """
+        Args:
+            cancel_event: 中止を伝える threading.Event（省略時は新しく作成）
+        """
+        self.cancel_event = cancel_event or threading.Event()
+        self._resumed = threading.Event()
+        self._resumed.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def pause(self):
+        """次のメッセージから送信を止める（送信中のメッセージは送り切る）"""
+        self._resumed.clear()
+
+    def resume(self):
+        """一時停止を解除する"""
+        self._resumed.set()
+
+    def cancel(self):
+        """送信を中止する（一時停止中のワーカーもすぐに終了する）"""
+        self.cancel_event.set()
+        self._resumed.set()
+
+    def checkpoint(self) -> bool:
+        """
+        一時停止中は再開されるまで待つ（ワーカースレッド用）
+
+        Returns:
+            送信を続けてよければ True、中止された場合は False
+        """
+        while not self._resumed.wait(self.POLL_INTERVAL):
+            if self.cancel_event.is_set():
+                return False
+        return not self.cancel_event.is_set()
+
+    async def checkpoint_async(self) -> bool:
+        """一時停止中は再開されるまで待つ（asyncioワーカー用）"""
+        while not self._resumed.is_set():
+            if self.cancel_event.is_set():
+                return False
+            await asyncio.sleep(self.POLL_INTERVAL)
+        return not self.cancel_event.is_set()
+
+
+# ==================== 並列送信（SMTP接続プール） ====================
+
+class SendResult:
+    """
+    1受信者分の送信結果
+
+    status は次のいずれか:
+        sent: 送信成功
+        deferred: 一時的なエラーのため retry_in 秒後に再送する
+        failed: 恒久的なエラー（5xx応答など）で失敗
+        gave_up: 一時的なエラーが再送上限まで続いたため断念
+    """
+
+    __slots__ = ('index', 'recipient', 'error', 'refused', 'attempt', 'status', 'retry_in', 'max_retries')
+
+    def __init__(self, index: int, recipient: Dict[str, str], error: Optional[Exception] = None,
+                 refused: Optional[dict] = None, attempt: int = 0):
+        self.index = index
+        self.recipient = recipient
+        self.error = error
+        # CC/BCCなど、To以外で拒否された宛先 {address: (code, message)}
+        self.refused = refused or {}
+        # これまでの再送回数
+        self.attempt = attempt
+        self.status = 'sent' if error is None else 'failed'
+        self.retry_in = 0.0
+        self.max_retries = 0
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+    def refused_others(self) -> list:
+        """To以外で拒否された宛先を [(address, code, message), ...] で返す"""
+        return [
+            (addr, code, _reply_text(message))
+            for addr, (code, message) in self.refused.items()
+            if addr != self.recipient['email']
+        ]
+
+
+class SendSummary:
+    """送信全体の集計結果"""
+
+    __slots__ = ('delivered', 'retried', 'failed', 'gave_up')
+
+    def __init__(self, delivered: int = 0, retried: int = 0, failed: int = 0, gave_up: int = 0):
+        # 成功件数（うち retried 件は再送後に成功）
+        self.delivered = delivered
+        self.retried = retried
+        # 恒久的な失敗と、再送上限で断念した件数
+        self.failed = failed
+        self.gave_up = gave_up
+
+    @property
+    def failed_total(self) -> int:
+        return self.failed + self.gave_up
+
+    def add(self, result: 'SendResult') -> bool:
+        """
+        送信結果を集計に加える
+
+        Returns:
+            結果が確定した（再送待ちではない）場合 True
+        """
+        if result.status == 'sent':
+            self.delivered += 1
+            if result.attempt:
+                self.retried += 1
+        elif result.status == 'failed':
+            self.failed += 1
+        elif result.status == 'gave_up':
+            self.gave_up += 1
+        return result.status != 'deferred'
+
+
+def _is_transient_error(error: Exception) -> bool:
+    """再送すれば成功する見込みのある一時的なエラー（4xx応答、切断、タイムアウト）かどうか"""
+    code = _smtp_error_code(error)
+    if code is not None:
+        return 400 <= code < 500
+    return _is_connection_error(error)
+
+
+class RetryPolicy:
+    """一時的なエラーになった受信者の再送間隔（指数バックオフ、ジッター付き）"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 60, max_delay: float = 1800,
+                 jitter: float = 0.5):
+        """
+        Args:
+            max_retries: 1受信者あたりの最大再送回数（0の場合は再送しない）
+            base_delay: 1回目の再送までの秒数（以降は倍々に延ばす）
+            max_delay: 再送までの最大秒数
+            jitter: 再送間隔をランダムに短くする最大割合（再送が同時刻に集中しないように）
+        """
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = max(0.0, float(base_delay))
+        self.max_delay = max(self.base_delay, float(max_delay))
+        self.jitter = min(1.0, max(0.0, float(jitter)))
+
+    @classmethod
+    def from_config(cls, options: Optional[Dict[str, Any]]) -> 'RetryPolicy':
+        """設定（email_options.retry）から作成。無効の場合は再送しないポリシー"""
+        options = options or {}
+        if not options.get('enabled', True):
+            return cls(max_retries=0)
+        return cls(
+            max_retries=options.get('max_retries', 3),
+            base_delay=options.get('base_delay', 60),
+            max_delay=options.get('max_delay', 1800),
+            jitter=options.get('jitter', 0.5),
+        )
+
+    def delay(self, attempt: int) -> float:
+        """attempt 回目（0始まり）の再送までの秒数"""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * (1 - self.jitter * random.random())
+
+
+class SendItem:
+    """送信キューの1件（再送待ちの場合は再送回数と直前のエラーを持つ）"""
+
+    __slots__ = ('index', 'recipient', 'attempt', 'error', 'envelope', 'payload')
+
+    def __init__(self, index: int, recipient: Dict[str, str], attempt: int = 0,
+                 error: Optional[Exception] = None, envelope: Optional[list] = None):
+        self.index = index
+        self.recipient = recipient
+        self.attempt = attempt
+        self.error = error
+        # 再送時に送る宛先（前回一部の宛先にだけ届いた場合は拒否された宛先だけ。None は全ての宛先）
+        self.envelope = envelope
+        # 作成済みのメッセージ (from_addr, to_addrs, data)。作成に失敗した場合はその例外
+        self.payload = None
+
+
+class RenderAhead:
+    """
+    送信する受信者のメッセージを別スレッドで先に作成しておく先読みバッファ
+
+    SMTP送信がネットワークやレート制限を待っている間に次のメッセージを作成する。
+    作成済みのメッセージは最大 depth 件までしか保持しないため、受信者が多くてもメモリ使用量は一定。
+    """
+
+    _END = object()
+
+    def __init__(self, items: Iterable[SendItem], render: Callable, depth: int):
+        """
+        Args:
+            items: 送信する SendItem
+            render: 受信者から (from_addr, to_addrs, data) を作成する関数
+            depth: 先に作成しておく最大件数
+        """
+        self._items = iter(items)
+        self._render = render
+        self._buffer = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._unbuffered = None
+        self._finished = False
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """メッセージ作成スレッド"""
+        try:
+            for item in self._items:
+                try:
+                    item.payload = self._render(item.recipient)
+                except Exception as e:
+                    item.payload = e
+                if not self._put(item):
+                    self._unbuffered = item
+                    return
+        except Exception as e:
+            # 受信者リストの読み込みに失敗した場合は、ここまでの受信者だけを送信する
+            self.error = e
+        self._put(self._END)
+
+    def _put(self, item) -> bool:
+        """バッファに空きができるまで待って追加（停止された場合は False）"""
+        while not self._stop.is_set():
+            try:
+                self._buffer.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def take(self) -> Optional[SendItem]:
+        """
+        作成済みの次の SendItem を取り出す（待たない）
+
+        Returns:
+            SendItem。全て取り出し済みの場合は None
+
+        Raises:
+            queue.Empty: 次のメッセージがまだ作成されていない場合
+        """
+        if self._finished:
+            return None
+        item = self._buffer.get_nowait()
+        if item is self._END:
+            self._finished = True
+            return None
+        return item
+
+    def close(self) -> Iterable[SendItem]:
+        """先読みを止め、まだ取り出されていない SendItem を返す（未読の受信者は読み込まずに残す）"""
+        self._stop.set()
+        self._thread.join()
+        rest = []
+        while True:
+            try:
+                item = self._buffer.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._END:
+                rest.append(item)
+        if self._unbuffered is not None:
+            rest.append(self._unbuffered)
+        self._finished = True
+        if self.error is not None:
+            return rest
+        return itertools.chain(rest, self._items)
+
+
+class SendQueue:
+    """
+    送信待ち受信者を複数のワーカーへ払い出すスレッドセーフなキュー
+
+    再送待ちの受信者は再送予定時刻順のヒープに入れ、予定時刻を過ぎたものから
+    新しい受信者の間に挟んで払い出す（再送待ちが通常の送信を止めることはない）。
+    scheduler を設定すると、ドメインの上限に達している受信者も同じヒープで保留する。
+    """
+
+    # 1回の払い出しで、上限に達したドメインの受信者を飛ばして探す最大件数
+    SCHEDULE_TRIES = 64
+
+    def __init__(self, items: Iterable[SendItem], limit: Optional[int] = None,
+                 scheduler: Optional[DomainScheduler] = None):
+        """
+        Args:
+            items: 送信する SendItem
+            limit: 払い出す件数の上限（再送を含む。Noneの場合は制限なし）
+            scheduler: ドメインごとの同時送信数・送信レートの上限を適用する DomainScheduler
+        """
+        self._lock = threading.Lock()
+        self._items = iter(items)
+        self._render_ahead = None
+        self._fresh_remaining = True
+        self._retries = []  # (再送予定時刻, 追加順, SendItem) のヒープ
+        self._retry_seq = 0
+        self._in_flight = 0
+        self.limit = limit
+        self.scheduler = scheduler
+        self.taken = 0
+        self.error = None  # 受信者リストの読み込み中に発生した例外
+
+    @classmethod
+    def from_recipients(cls, recipients: Iterable[Dict[str, str]]) -> 'SendQueue':
+        """受信者リストから作成（受信者番号は1から）"""
+        return cls(SendItem(index, recipient) for index, recipient in enumerate(recipients, 1))
+
+    def start_render(self, render: Callable, depth: int):
+        """
+        新しい受信者のメッセージを別スレッドで先に作成し始める
+
+        Args:
+            render: 受信者から (from_addr, to_addrs, data) を作成する関数
+            depth: 先に作成しておく最大件数（0の場合は先読みしない）
+        """
+        if depth > 0:
+            with self._lock:
+                self._render_ahead = RenderAhead(self._items, render, depth)
+
+    def stop_render(self):
+        """メッセージの先読みを止める（未送信の受信者はキューに残る）"""
+        with self._lock:
+            if self._render_ahead is not None:
+                self._items = iter(self._render_ahead.close())
+                self._render_ahead = None
+
+    def _next_fresh(self) -> Optional[SendItem]:
+        """新しい受信者を1件取り出す（先読み中でまだ作成されていなければ queue.Empty）"""
+        if self._render_ahead is not None:
+            item = self._render_ahead.take()
+            if item is None and self._render_ahead.error is not None:
+                self.error = self._render_ahead.error
+            return item
+        try:
+            return next(self._items, None)
+        except Exception as e:
+            # 受信者リストの読み込みに失敗した場合は、ここまでの受信者だけを送信する
+            self.error = e
+            return None
+
+    def next_item(self) -> tuple:
+        """
+        次に送信する受信者を取り出す（取り出したら送信後に task_done を呼ぶこと）
+
+        Returns:
+            (item, wait) のタプル。item は SendItem（今すぐ送れるものがなければ None）、
+            wait は item が None の場合に次を確認するまで待つ秒数（全て送信済みなら None）
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.limit is not None and self.taken >= self.limit:
+                # 上限に達したら残りは drain で呼び出し元に返す
+                return None, (0.5 if self._in_flight else None)
+            for _ in range(self.SCHEDULE_TRIES):
+                item = None
+                if self._retries and self._retries[0][0] <= now:
+                    item = heapq.heappop(self._retries)[2]
+                elif self._fresh_remaining and not (self.scheduler is not None
+                                                    and len(self._retries) >= self.scheduler.hold_limit):
+                    try:
+                        item = self._next_fresh()
+                    except queue.Empty:
+                        # 先読み中のメッセージの作成を少し待つ
+                        if self._retries:
+                            return None, max(0.0, min(0.05, self._retries[0][0] - now))
+                        return None, 0.05
+                    if item is None:
+                        self._fresh_remaining = False
+                if item is None:
+                    break
+
+                if self.scheduler is not None:
+                    wait = self.scheduler.acquire(item.recipient)
+                    if wait > 0:
+                        # ドメインの上限に達している場合は保留して、他のドメインの受信者を先に送る
+                        self._retry_seq += 1
+                        heapq.heappush(self._retries, (now + wait, self._retry_seq, item))
+                        continue
+                self._in_flight += 1
+                self.taken += 1
+                return item, 0
+            if self._retries:
+                return None, max(0.0, self._retries[0][0] - now)
+            if self._in_flight:
+                # 送信中のものが再送待ちになる可能性があるので少し待って確認する
+                return None, 0.5
+            return None, None
+
+    def task_done(self, item: Optional[SendItem] = None):
+        """next_item で取り出した1件の処理が終わったことを通知（ドメインの送信枠も返す）"""
+        with self._lock:
+            self._in_flight -= 1
+        if self.scheduler is not None and item is not None:
+            self.scheduler.release(item.recipient)
+
+    def defer(self, item: SendItem, delay: float):
+        """delay 秒後に再送する"""
+        with self._lock:
+            self._retry_seq += 1
+            heapq.heappush(self._retries, (time.monotonic() + delay, self._retry_seq, item))
+
+    def drain(self) -> Iterator[SendItem]:
+        """
+        未送信の受信者を再送予定時刻に関わらず全て取り出す（作成済みのメッセージは破棄する）
+
+        再送待ちの受信者の後に、まだ読み込んでいない受信者を返すイテレータ。
+        受信者リストは取り出した分だけ読み込む（大きなリストを一度にメモリに読み込まない）。
+        """
+        self.stop_render()
+        with self._lock:
+            retries = [entry[2] for entry in sorted(self._retries)]
+            self._retries = []
+            self._fresh_remaining = False
+            remaining = self._items if self.error is None else iter(())
+            self._items = iter(())
+        return self._drained(itertools.chain(retries, remaining))
+
+    def _drained(self, items: Iterator[SendItem]) -> Iterator[SendItem]:
+        try:
+            for item in items:
+                item.payload = None
+                yield item
+        except Exception as e:
+            # 受信者リストの読み込みに失敗した場合は、そこまでの受信者だけを返す
+            self.error = e
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """
+    接続し直せば再送できるエラー（切断、タイムアウト）かどうか
+
+    ソケットレベルのエラーだけを対象にする（添付ファイルが読めないなどの OSError は含めない）。
+    421応答は含めない（_is_closing_reply を参照）。
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, (ConnectionError, socket.timeout, ssl.SSLError, asyncio.TimeoutError))
+
+
+def _is_closing_reply(error: Exception) -> bool:
+    """
+    サーバーが接続を閉じると通知した（421応答）エラーかどうか
+
+    接続数・送信数の制限で返されることが多いため、その場で送り直さずに
+    AdaptiveThrottle と再送キュー（RetryPolicy）に任せる。
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code == 421 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code == 421
+
+
+class PooledConnection:
+    """
+    プール内の1接続
+
+    切断されたら接続し直して送信中のメッセージを1回だけ再送し、
+    一定の通数・経過時間ごとに接続を張り替える。
+    421応答の場合は接続を閉じるだけで再送せず（次のメッセージの送信時に接続し直す）、例外をそのまま送出する。
+    """
+
+    def __init__(self, connect: Callable, max_messages: int = 0, max_age: float = 0,
+                 resend_after_data: bool = False):
+        """
+        Args:
+            connect: ログイン済みのセッションを返す関数
+            max_messages: 張り替えまでの送信通数（0の場合は制限なし）
+            max_age: 張り替えまでの経過秒数（0の場合は制限なし）
+            resend_after_data: 本文を送り始めた後に切断された場合も再送するか
+                               （False の場合は接続し直すだけで、例外をそのまま送出する。
+                               サーバーが受け取っていると2通届くため既定では再送しない）
+        """
+        self.connect = connect
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.resend_after_data = resend_after_data
+        self.server = None
+        self.messages = 0
+        self.opened = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.server is not None
+
+    def open(self):
+        """接続を開く（開いている場合は閉じてから接続し直す）"""
+        self.close()
+        self.server = self.connect()
+        self.messages = 0
+        self.opened = time.monotonic()
+
+    def _needs_recycle(self) -> bool:
+        if self.max_messages and self.messages >= self.max_messages:
+            return True
+        return bool(self.max_age) and time.monotonic() - self.opened >= self.max_age
+
+    def send(self, deliver: Callable):
+        """
+        deliver(server) を実行する。切断系のエラーなら接続し直して1回だけ再実行
+
+        Returns:
+            deliver の戻り値
+        """
+        if not self.alive or self._needs_recycle():
+            self.open()
+        try:
+            result = deliver(self.server)
+        except Exception as e:
+            if _is_closing_reply(e):
+                self.close()
+            if not _is_connection_error(e):
+                raise
+            if not self.resend_after_data and _is_delivery_uncertain(e):
+                # 接続だけ張り直し、サーバーが受け取った可能性のあるメッセージは送り直さない
+                try:
+                    self.open()
+                except Exception:
+                    pass
+                raise
+            self.open()
+            result = deliver(self.server)
+        self.messages += 1
+        return result
+
+    def close(self):
+        """QUITを送信して接続を閉じる"""
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+        self.server = None
+
+
+class SmtpConnectionPool:
+    """ログイン済みのSMTP接続を複数張り、共有キューから並列に送信するワーカープール"""
+
+    def __init__(self, sender: 'EmailBulkSender', connections: int = 1,
+                 rate_limiter: Optional[RateLimiter] = None, throttle: Optional[AdaptiveThrottle] = None,
+                 on_result: Optional[Callable] = None, cancel_event: Optional[threading.Event] = None,
+                 recycle_messages: int = 0, recycle_minutes: float = 0,
+                 journal: Optional[SendJournal] = None, retry_policy: Optional[RetryPolicy] = None,
+                 render_ahead: int = 0, controller: Optional[SendController] = None,
+                 scheduler: Optional[DomainScheduler] = None):
+        """
+        Args:
+            sender: 接続情報を持つ EmailBulkSender インスタンス
+            connections: 同時SMTP接続数
+            rate_limiter: 全接続で共有する送信レート制限
+            throttle: 制限応答に応じてレートを調整する AdaptiveThrottle
+            on_result: 1件送信するごとに呼ばれるコールバック on_result(result, done, total)
+            cancel_event: セットされると新しい送信を止める threading.Event（controller を指定した場合は不要）
+            recycle_messages: 1接続あたりの送信通数の上限（超えたら接続し直す）
+            recycle_minutes: 1接続あたりの経過時間（分）の上限（超えたら接続し直す）
+            journal: 結果を記録する SendJournal
+            retry_policy: 一時的なエラーの再送ポリシー（Noneの場合は既定値）
+            render_ahead: 送信と並行して先に作成しておくメッセージ数（0の場合は送信直前に作成）
+            controller: 一時停止・中止を受け付ける SendController
+            scheduler: ドメインごとの同時送信数・送信レートの上限を適用する DomainScheduler
+
+        failover を True にすると、送れなかった受信者を失敗として報告せずに leftovers（イテレータ）に残す
+        （ProfileDispatcher が別の送信元アカウントで送り直す）。
+        before_send を設定すると送信の直前に before_send(item) を呼び、False を返した受信者は
+        送信せず結果も報告しない（共有キューでリースを失った受信者を飛ばす）。
+        at_most_once（既定は True）の場合、本文を送り始めた後の切断・タイムアウトでは再送せず、
+        失敗として報告する（サーバーが受け取っている可能性があるため、同じ受信者に2通送らないことを
+        優先し、送り直すかどうかは送信ジャーナルからの再開に任せる）。False にすると接続し直して再送する。
+        on_defer を設定すると、再送待ちの受信者をこのプールのキューに入れずに
+        on_defer(item, delay) に渡す（共有キューに戻して他のワーカーにも再送を任せる）。
+        最初の接続・ログインに失敗した例外は connect_errors に、送信中に接続が失われて接続し直せなかった
+        例外は disconnect_errors に記録される（failover でない場合、1本も接続できなければ run が最初の
+        例外を送出する。途中で接続が失われた場合は送れなかった受信者を失敗として報告する）。
+        """
+        self.sender = sender
+        self.connections = max(1, int(connections))
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.throttle = throttle
+        self.on_result = on_result
+        self.controller = controller or SendController(cancel_event)
+        self.cancel_event = self.controller.cancel_event
+        self.recycle_messages = int(recycle_messages or 0)
+        self.recycle_seconds = float(recycle_minutes or 0) * 60
+        self.journal = journal
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.render_ahead = max(0, int(render_ahead or 0))
+        self.scheduler = scheduler
+
+        self.failover = False
+        self.leftovers = iter(())
+        self.before_send = None
+        self.at_most_once = True
+        self.on_defer = None
+
+        self._lock = threading.Lock()
+        self.connect_errors = []
+        self.disconnect_errors = []
+        self.summary = SendSummary()
+        self._done = 0
+        self._total = 0
+
+    def run(self, recipients, render: Callable, total: Optional[int] = None) -> SendSummary:
+        """
+        全受信者への送信を実行し、全ワーカーの終了を待つ
+
+        Args:
+            recipients: 受信者の辞書リスト（または受信者を順に返す反復可能オブジェクト）
+            render: 受信者から (from_addr, to_addrs, data) を作成する関数
+            total: 受信者数（省略時は len(recipients)）
+
+        Returns:
+            SendSummary
+        """
+        if total is None:
+            total = len(recipients)
+        return self.run_queue(SendQueue.from_recipients(recipients), render, total)
+
+    def run_queue(self, send_queue: SendQueue, render: Callable, total: int) -> SendSummary:
+        """
+        送信キューの受信者への送信を実行し、全ワーカーの終了を待つ
+
+        Args:
+            send_queue: 送信する SendQueue
+            render: 受信者から (from_addr, to_addrs, data) を作成する関数
+            total: キュー内の受信者数
+
+        Returns:
+            SendSummary
+        """
+        self._total = total
+        if self.scheduler is not None:
+            send_queue.scheduler = self.scheduler
+        send_queue.start_render(render, self.render_ahead)
+
+        workers = [
+            threading.Thread(target=self._worker, args=(send_queue, render), daemon=True)
+            for _ in range(min(self.connections, max(1, self._total)))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        return self._finish(send_queue, len(workers))
+
+    @staticmethod
+    def _payload(item: SendItem, render: Callable) -> tuple:
+        """先に作成済みのメッセージ（なければここで作成）を返す。再送時も同じものを使う"""
+        if item.payload is None:
+            item.payload = render(item.recipient)
+        if isinstance(item.payload, Exception):
+            raise item.payload
+        if item.envelope is not None:
+            # 前回の送信でCC/BCCなど一部の宛先には届いているため、拒否された宛先にだけ再送する
+            from_addr, _, data = item.payload
+            return from_addr, list(item.envelope), data
+        return item.payload
+
+    def _finish(self, send_queue: SendQueue, worker_count: int) -> SendSummary:
+        """全ワーカー終了後の後処理"""
+        send_queue.stop_render()
+        if self.journal:
+            self.journal.flush()
+        if send_queue.error is not None:
+            # 受信者リストを最後まで読めなかった場合は、送信済みの結果を記録した上で中断を知らせる
+            raise send_queue.error
+
+        if self.failover:
+            if not self.cancel_event.is_set():
+                self.leftovers = send_queue.drain()
+            return self.summary
+
+        # 1本も接続できなかった場合は接続エラーとして扱う
+        if len(self.connect_errors) == worker_count:
+            raise self.connect_errors[0]
+
+        # 全接続が失われて送れなかった受信者（再送待ちを含む）は失敗として報告する
+        if not self.cancel_event.is_set():
+            errors = self.disconnect_errors or self.connect_errors
+            error = errors[-1] if errors else None
+            for item in send_queue.drain():
+                self._report(SendResult(item.index, item.recipient,
+                                        item.error or error or smtplib.SMTPServerDisconnected("Not sent"),
+                                        attempt=item.attempt))
+            if send_queue.error is not None:
+                raise send_queue.error
+
+        return self.summary
+
+    def _worker(self, send_queue: SendQueue, render: Callable):
+        """1接続分のワーカー（バックグラウンドスレッド）"""
+        connection = PooledConnection(self.sender.connect_smtp, self.recycle_messages, self.recycle_seconds,
+                                      resend_after_data=not self.at_most_once)
+        try:
+            connection.open()
+        except Exception as e:
+            with self._lock:
+                self.connect_errors.append(e)
+            return
+
+        try:
+            while not self.cancel_event.is_set():
+                item, wait = send_queue.next_item()
+                if item is None:
+                    if wait is None:
+                        break
+                    # 再送予定時刻まで待つ（キャンセルされたらすぐ抜ける）
+                    self.cancel_event.wait(min(wait, 1.0))
+                    continue
+
+                try:
+                    # 送信枠を確保（全接続で共有するレート制限）
+                    if not self.rate_limiter.acquire(self.cancel_event):
+                        break
+                    # 一時停止中は再開を待つ
+                    if not self.controller.checkpoint():
+                        break
+                    try:
+                        payload = self._payload(item, render)
+                    except Exception as e:
+                        # メッセージを作成できない（添付ファイルが読めないなど）場合は再送せずに失敗とする
+                        self._report(SendResult(item.index, item.recipient, e, attempt=item.attempt))
+                        continue
+                    if self.before_send is not None and not self.before_send(item):
+                        continue
+                    try:
+                        refused = connection.send(lambda server: self._deliver(server, payload))
+                        self._complete(send_queue, item, _recipient_error(item.recipient['email'], refused), refused)
+                    except Exception as e:
+                        self._complete(send_queue, item, e)
+                        # 接続し直せなかった場合はこのワーカーを終了する
+                        # （421応答で閉じた接続は次のメッセージの送信時に接続し直す）
+                        if not connection.alive and not _is_closing_reply(e):
+                            with self._lock:
+                                self.disconnect_errors.append(e)
+                            break
+                finally:
+                    send_queue.task_done(item)
+        finally:
+            connection.close()
+
+    def _deliver(self, server, payload: tuple) -> dict:
+        """
+        1通送信（サーバーがPIPELININGに対応していればコマンドをまとめて送る）
+
+        Args:
+            server: ログイン済みの smtplib.SMTP
+            payload: (from_addr, to_addrs, data) のタプル
+
+        Returns:
+            拒否された宛先の辞書 {address: (code, message)}
+        """
+        from_addr, to_addrs, data = payload
+        if server.has_extn('pipelining'):
+            return _sendmail_pipelined(server, from_addr, to_addrs, data)
+        return _sendmail_streamed(server, from_addr, to_addrs, data)
+
+    def _complete(self, send_queue: SendQueue, item: SendItem, error: Optional[Exception],
+                  refused: Optional[dict] = None):
+        """
+        1件の送信結果を確定する
+
+        一時的なエラーで再送回数が残っていれば再送待ちに入れ、
+        残っていなければ再送上限で断念したものとして報告する。
+        """
+        result = SendResult(item.index, item.recipient, error, refused, attempt=item.attempt)
+        if self.at_most_once and _is_delivery_uncertain(error):
+            # 届いたかどうか分からないため再送しない
+            pass
+        elif error is not None and _is_transient_error(error):
+            result.max_retries = self.retry_policy.max_retries
+            if item.attempt < self.retry_policy.max_retries:
+                result.status = 'deferred'
+                result.retry_in = self.retry_policy.delay(item.attempt)
+                envelope = item.envelope
+                if refused:
+                    # 受け付けられた宛先には届いているため、一時的なエラーで拒否された宛先にだけ再送する
+                    envelope = [addr for addr, (code, _) in refused.items() if 400 <= code < 500]
+                retry_item = SendItem(item.index, item.recipient, item.attempt + 1, error, envelope)
+                if self.on_defer is not None:
+                    self.on_defer(retry_item, result.retry_in)
+                else:
+                    send_queue.defer(retry_item, result.retry_in)
+            elif item.attempt > 0:
+                result.status = 'gave_up'
+        self._report(result)
+
+    def _report(self, result: SendResult):
+        """送信結果を集計してコールバックに通知（再送待ちは完了件数に含めない）"""
+        with self._lock:
+            if self.summary.add(result):
+                self._done += 1
+            if self.journal:
+                self.journal.record_result(result, self.sender.email_address)
+            if self.throttle:
+                self.throttle.record(result)
+            if self.on_result:
+                self.on_result(result, self._done, self._total)
+
+
+# ==================== asyncio送信エンジン ====================
+
+class AsyncSmtpClient:
+    """asyncioストリーム上で EHLO/STARTTLS/AUTH/MAIL/RCPT/DATA を話す最小限のSMTPクライアント"""
+
+    def __init__(self, host: str, port: int, local_hostname: str = 'localhost', timeout: float = 60):
+        self.host = host
+        self.port = port
+        self.local_hostname = local_hostname
+        self.timeout = timeout
+        self.esmtp_features = {}
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        """接続してグリーティングとEHLOを処理（ポート465はSSL、それ以外はSTARTTLS）"""
+        ssl_context = _create_tls_context() if self.port == 465 else None
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=ssl_context), self.timeout
+        )
+        code, message = await self.read_reply()
+        if code != 220:
+            raise smtplib.SMTPConnectError(code, message)
+        await self.ehlo()
+        if ssl_context is None:
+            await self.starttls()
+
+    async def read_reply(self) -> tuple:
+        """複数行を含むSMTP応答を読み込む（smtplib.getreply と同じく本文はバイト列）"""
+        lines = []
+        while True:
+            line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+            if not line:
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            line = line.rstrip(b'\r\n')
+            lines.append(line[4:])
+            if len(line) < 4 or line[3:4] != b'-':
+                break
+        try:
+            code = int(line[:3])
+        except ValueError:
+            code = -1
+        return code, b'\n'.join(lines)
+
+    async def command(self, line: str) -> tuple:
+        """コマンドを1行送信して応答を返す"""
+        self._writer.write(line.encode('ascii') + b'\r\n')
+        await self._writer.drain()
+        return await self.read_reply()
+
+    async def ehlo(self):
+        """EHLOを送信し、ESMTP拡張の一覧を記録"""
+        code, message = await self.command(f"EHLO {self.local_hostname}")
+        if code != 250:
+            raise smtplib.SMTPHeloError(code, message)
+        self.esmtp_features = {}
+        for feature in message.decode('ascii', 'replace').split('\n')[1:]:
+            name, _, params = feature.partition(' ')
+            self.esmtp_features[name.lower()] = params
+
+    async def starttls(self):
+        """STARTTLSで接続を暗号化し、EHLOをやり直す"""
+        if 'starttls' not in self.esmtp_features:
+            raise smtplib.SMTPNotSupportedError("STARTTLS extension not supported by server.")
+        code, message = await self.command("STARTTLS")
+        if code != 220:
+            raise smtplib.SMTPResponseException(code, message)
+        context = _create_tls_context()
+        if hasattr(self._writer, 'start_tls'):
+            # Python 3.11以降
+            await self._writer.start_tls(context, server_hostname=self.host)
+        else:
+            # Python 3.10以前: 同じTCP接続のソケットを複製してTLSのストリームを開き直す
+            # （古いストリームを閉じても複製したソケットが残るため接続は切れない）
+            raw = self._writer.get_extra_info('socket')
+            sock = socket.socket(raw.family, raw.type, raw.proto, fileno=os.dup(raw.fileno()))
+            self._writer.close()
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(sock=sock, ssl=context, server_hostname=self.host), self.timeout
+                )
+            except BaseException:
+                sock.close()
+                raise
+        await self.ehlo()
+
+    async def login(self, user: str, password: str):
+        """AUTH PLAIN または AUTH LOGIN で認証"""
+        mechanisms = self.esmtp_features.get('auth', '').upper().split()
+        if 'PLAIN' in mechanisms:
+            token = base64.b64encode(f"\0{user}\0{password}".encode('utf-8')).decode('ascii')
+            code, message = await self.command(f"AUTH PLAIN {token}")
+        elif 'LOGIN' in mechanisms:
+            code, message = await self.command("AUTH LOGIN")
+            if code == 334:
+                code, message = await self.command(base64.b64encode(user.encode('utf-8')).decode('ascii'))
+            if code == 334:
+                code, message = await self.command(base64.b64encode(password.encode('utf-8')).decode('ascii'))
+        else:
+            raise smtplib.SMTPNotSupportedError("No suitable authentication method found.")
+        if code != 235:
+            raise smtplib.SMTPAuthenticationError(code, message)
+
+    async def sendmail(self, from_addr: str, to_addrs: list, data) -> dict:
+        """
+        1通のメールを送信（smtplib.sendmail と同じ例外を送出）
+
+        サーバーがPIPELININGに対応している場合は MAIL/RCPT/DATA をまとめて送信し、
+        応答を順に読んで宛先ごとに対応付ける。
+
+        Returns:
+            拒否された宛先の辞書 {address: (code, message)}
+        """
+        if 'pipelining' in self.esmtp_features:
+            commands = [f"MAIL FROM:<{from_addr}>"] + [f"RCPT TO:<{addr}>" for addr in to_addrs] + ["DATA"]
+            self._writer.write(''.join(command + '\r\n' for command in commands).encode('ascii'))
+            await self._writer.drain()
+            replies = []
+            for _ in range(len(to_addrs) + 2):
+                replies.append(await self.read_reply())
+                if replies[-1][0] == 421:
+                    # サーバーは接続を閉じるため、残りの応答は読まずに421応答として扱う
+                    self.close()
+                    raise smtplib.SMTPResponseException(*replies[-1])
+            mail_reply, rcpt_replies, data_reply = replies[0], replies[1:-1], replies[-1]
+            try:
+                refused = _check_pipelined_replies(from_addr, to_addrs, mail_reply, rcpt_replies, data_reply)
+            except smtplib.SMTPException:
+                if data_reply[0] == 354:
+                    # DATAが受理されてしまった場合は空の本文で終端してから取り消す
+                    self._writer.write(b'.\r\n')
+                    await self.read_reply()
+                await self._rset()
+                raise
+        else:
+            code, message = await self.command(f"MAIL FROM:<{from_addr}>")
+            if code != 250:
+                await self._rset()
+                raise smtplib.SMTPSenderRefused(code, message, from_addr)
+
+            refused = {}
+            for addr in to_addrs:
+                code, message = await self.command(f"RCPT TO:<{addr}>")
+                if code not in (250, 251):
+                    refused[addr] = (code, message)
+            if len(refused) == len(to_addrs):
+                await self._rset()
+                raise smtplib.SMTPRecipientsRefused(refused)
+
+            code, message = await self.command("DATA")
+            if code != 354:
+                await self._rset()
+                raise smtplib.SMTPDataError(code, message)
+
+        # 添付ファイルをストリーミングする場合もチャンクごとに書き込んで送信バッファを空ける
+        # （ファイルの読み込みとエンコードはイベントループを止めないように別スレッドで行う）
+        try:
+            if isinstance(data, StreamedMessage):
+                loop = asyncio.get_event_loop()
+                chunks = _data_chunks(data)
+                while True:
+                    chunk = await loop.run_in_executor(None, next, chunks, None)
+                    if chunk is None:
+                        break
+                    self._writer.write(chunk)
+                    await self._writer.drain()
+            else:
+                for chunk in _data_chunks(data):
+                    self._writer.write(chunk)
+                    await self._writer.drain()
+            code, message = await self.read_reply()
+        except Exception as e:
+            # 本文を送り始めた後のエラーはサーバーが受け取ったかどうか分からない（_send_data と同じ）
+            e.after_data = True
+            raise
+        if code != 250:
+            raise smtplib.SMTPDataError(code, message)
+        return refused
+
+    async def _rset(self):
+        try:
+            await self.command("RSET")
+        except (smtplib.SMTPException, OSError, asyncio.TimeoutError):
+            pass
+
+    async def quit(self):
+        """QUITを送信して接続を閉じる"""
+        if self._writer is None:
+            return
+        try:
+            await self.command("QUIT")
+        except (smtplib.SMTPException, OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        """接続を閉じる"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class AsyncPooledConnection(PooledConnection):
+    """asyncioエンジン用のプール内の1接続（再接続と張り替えは PooledConnection と同じ）"""
+
+    async def open(self):
+        await self.close()
+        self.server = await self.connect()
+        self.messages = 0
+        self.opened = time.monotonic()
+
+    async def send(self, deliver: Callable):
+        if not self.alive or self._needs_recycle():
+            await self.open()
+        try:
+            result = await deliver(self.server)
+        except Exception as e:
+            if _is_closing_reply(e):
+                await self.close()
+            if not _is_connection_error(e):
+                raise
+            if not self.resend_after_data and _is_delivery_uncertain(e):
+                # 接続だけ張り直し、サーバーが受け取った可能性のあるメッセージは送り直さない
+                try:
+                    await self.open()
+                except Exception:
+                    pass
+                raise
+            await self.open()
+            result = await deliver(self.server)
+        self.messages += 1
+        return result
+
+    async def close(self):
+        if self.server is None:
+            return
+        await self.server.quit()
+        self.server = None
+
+
+class AsyncSendEngine(SmtpConnectionPool):
+    """
+    1スレッドのasyncioイベントループ上で複数のSMTP接続を多重化して送信するエンジン
+
+    接続ごとに1つのコルーチンが1通ずつ送信する（前のメールの本文の応答を待ってから次のメールの
+    MAIL/RCPT を送る）ため、同時に送信中になるメールの数は接続数と同じで、SmtpConnectionPool と変わらない。
+    スレッドを使わない分、多数の接続を張る場合の負荷が小さい。
+    """
+
+    def run_queue(self, send_queue: SendQueue, render: Callable, total: int) -> SendSummary:
+        """
+        送信キューの受信者への送信を実行（呼び出し元スレッドで専用のイベントループを回す）
+
+        Args:
+            send_queue: 送信する SendQueue
+            render: 受信者から (from_addr, to_addrs, data) を作成する関数
+            total: キュー内の受信者数
+
+        Returns:
+            SendSummary
+        """
+        self._total = total
+        worker_count = min(self.connections, max(1, self._total))
+        if self.scheduler is not None:
+            send_queue.scheduler = self.scheduler
+        send_queue.start_render(render, self.render_ahead)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._run_workers(send_queue, render, worker_count))
+        finally:
+            loop.close()
+
+        return self._finish(send_queue, worker_count)
+
+    async def _run_workers(self, send_queue: SendQueue, render: Callable, worker_count: int):
+        """ワーカーコルーチンを起動して全ての終了を待つ"""
+        await asyncio.gather(*[self._async_worker(send_queue, render) for _ in range(worker_count)])
+
+    async def _async_worker(self, send_queue: SendQueue, render: Callable):
+        """1接続分のワーカー（コルーチン）"""
+        loop = asyncio.get_event_loop()
+        connection = AsyncPooledConnection(self.sender.connect_smtp_async,
+                                           self.recycle_messages, self.recycle_seconds,
+                                           resend_after_data=not self.at_most_once)
+        try:
+            await connection.open()
+        except Exception as e:
+            self.connect_errors.append(e)
+            return
+
+        try:
+            while not self.cancel_event.is_set():
+                item, wait = send_queue.next_item()
+                if item is None:
+                    if wait is None:
+                        break
+                    # 再送予定時刻まで待つ（キャンセルを確認するため細かく区切る）
+                    await asyncio.sleep(min(wait, 0.5))
+                    continue
+
+                try:
+                    # 送信枠を確保（全接続で共有するレート制限）
+                    if not await self.rate_limiter.acquire_async(self.cancel_event):
+                        break
+                    # 一時停止中は再開を待つ
+                    if not await self.controller.checkpoint_async():
+                        break
+                    # メッセージの作成・添付ファイルの読み込みと before_send（SQLiteへの書き込み）は
+                    # イベントループを止めないように別スレッドで実行する
+                    try:
+                        from_addr, to_addrs, data = await loop.run_in_executor(None, self._payload, item, render)
+                    except Exception as e:
+                        # メッセージを作成できない（添付ファイルが読めないなど）場合は再送せずに失敗とする
+                        self._report(SendResult(item.index, item.recipient, e, attempt=item.attempt))
+                        continue
+                    if self.before_send is not None and not await loop.run_in_executor(None, self.before_send, item):
+                        continue
+                    try:
+                        refused = await connection.send(lambda client: client.sendmail(from_addr, to_addrs, data))
+                        self._complete(send_queue, item, _recipient_error(item.recipient['email'], refused), refused)
+                    except Exception as e:
+                        self._complete(send_queue, item, e)
+                        # 接続し直せなかった場合はこのワーカーを終了する
+                        # （421応答で閉じた接続は次のメッセージの送信時に接続し直す）
+                        if not connection.alive and not _is_closing_reply(e):
+                            self.disconnect_errors.append(e)
+                            break
+                finally:
+                    send_queue.task_done(item)
+        finally:
+            await connection.close()
+
+
+# ==================== 複数アカウントでの分散送信 ====================
+
+class SenderProfile:
+    """送信元アカウント（SMTPサーバー、認証情報、アカウントごとの送信レートと1日の送信上限）"""
+
+    def __init__(self, email_address: str, email_password: str, smtp_server: str, smtp_port: int,
+                 display_name: str = "", name: str = "", rate_limits: Optional[Dict[str, Any]] = None,
+                 daily_quota: int = 0, connections: Optional[int] = None):
+        """
+        Args:
+            email_address: 送信元メールアドレス
+            email_password: メールパスワード
+            smtp_server: SMTPサーバー
+            smtp_port: SMTPポート
+            display_name: 送信元表示名
+            name: プロファイル名（表示用）
+            rate_limits: このアカウントの送信レート制限（Noneの場合は全体の設定を使用）
+            daily_quota: 直近24時間の送信上限（0の場合は無制限）
+            connections: このアカウントの同時接続数（Noneの場合は全体の設定を使用）
+        """
+        self.email_address = email_address
+        self.email_password = email_password
+        self.smtp_server = smtp_server
+        self.smtp_port = int(smtp_port)
+        self.display_name = display_name
+        self.name = name
+        self.rate_limits = rate_limits or None
+        self.daily_quota = max(0, int(daily_quota or 0))
+        self.connections = int(connections) if connections else None
+
+    @property
+    def label(self) -> str:
+        return self.name or self.email_address
+
+    @classmethod
+    def from_config(cls, entry: Dict[str, Any], password: str) -> 'SenderProfile':
+        """
+        設定ファイルの profiles の1項目から作成（パスワードは設定ファイルに保存しない）
+
+        Raises:
+            ValueError: サーバーまたはメールアドレスが指定されていない場合
+        """
+        if not entry.get('server') or not entry.get('email_address'):
+            raise ValueError(f"Sender profile requires 'server' and 'email_address': {entry}")
+        return cls(
+            email_address=entry['email_address'],
+            email_password=password,
+            smtp_server=entry['server'],
+            smtp_port=entry.get('port') or 587,
+            display_name=entry.get('display_name', ''),
+            name=entry.get('name', ''),
+            rate_limits=entry.get('rate_limits'),
+            daily_quota=entry.get('daily_quota', 0),
+            connections=entry.get('connections'),
+        )
+
+    def create_sender(self, attachment_cache: Optional['AttachmentCache'] = None) -> 'EmailBulkSender':
+        """
+        このアカウントで送信する EmailBulkSender を作成
+
+        Args:
+            attachment_cache: 他のアカウントと共有する添付ファイルのキャッシュ
+        """
+        sender = EmailBulkSender(self.email_address, self.email_password,
+                                 self.smtp_server, self.smtp_port, self.display_name)
+        if attachment_cache is not None:
+            sender.attachment_cache = attachment_cache
+        return sender
+
+
+class ProfileDispatcher:
+    """
+    1つのキャンペーンを複数の送信元アカウントに振り分けて送信
+
+    受信者は各アカウントの残り送信可能数に比例して（順番が偏らないよう交互に）割り当て、
+    アカウントごとの接続プールで並列に送信する。上限に達したアカウントや接続できなくなった
+    アカウントで送れなかった受信者は、残りのアカウントに割り当て直して送信する。
+    """
+
+    def __init__(self, profiles: list, create_pool: Callable, journal: Optional[SendJournal] = None,
+                 on_result: Optional[Callable] = None, cancel_event: Optional[threading.Event] = None):
+        """
+        Args:
+            profiles: SenderProfile のリスト
+            create_pool: プロファイルから送信プールを作成する関数 create_pool(profile)
+            journal: 結果を記録する SendJournal（1日の送信上限の集計にも使用）
+            on_result: 1件送信するごとに呼ばれるコールバック on_result(result, done, total)
+            cancel_event: セットされると新しい送信を止める threading.Event
+        """
+        self.profiles = list(profiles)
+        self.create_pool = create_pool
+        self.journal = journal
+        self.on_result = on_result
+        self.cancel_event = cancel_event or threading.Event()
+
+        self._lock = threading.Lock()
+        self.summary = SendSummary()
+        self._done = 0
+        self._total = 0
+
+    def _remaining_quota(self, profile: SenderProfile) -> Optional[int]:
+        """直近24時間の残り送信可能数（無制限の場合は None）"""
+        if not profile.daily_quota:
+            return None
+        used = self.journal.sent_count(profile.email_address) if self.journal else 0
+        return max(0, profile.daily_quota - used)
+
+    @staticmethod
+    def _split(items: list, profiles: list, remaining: dict) -> tuple:
+        """
+        受信者を残り送信可能数に比例して割り当てる（smooth weighted round-robin）
+
+        Returns:
+            (各プロファイルに割り当てた SendItem のリスト, 割り当てられなかった SendItem のリスト)
+        """
+        weights = [remaining[id(p)] if remaining[id(p)] is not None else len(items) for p in profiles]
+        shards = [[] for _ in profiles]
+        current = [0] * len(profiles)
+        unassigned = []
+        for item in items:
+            candidates = [
+                i for i, p in enumerate(profiles)
+                if weights[i] > 0 and (remaining[id(p)] is None or len(shards[i]) < remaining[id(p)])
+            ]
+            if not candidates:
+                unassigned.append(item)
+                continue
+            total_weight = sum(weights[i] for i in candidates)
+            for i in candidates:
+                current[i] += weights[i]
+            best = max(candidates, key=lambda i: current[i])
+            current[best] -= total_weight
+            shards[best].append(item)
+        return shards, unassigned
+
+    def run(self, recipients, render_for: Callable) -> SendSummary:
+        """
+        全受信者への送信を実行
+
+        Args:
+            recipients: 受信者の辞書リスト
+            render_for: 送信元の EmailBulkSender から (from_addr, to_addrs, data) を作成する関数を返す関数
+
+        Returns:
+            SendSummary
+
+        Raises:
+            Exception: どのアカウントにも接続できなかった場合は最初の接続エラー
+        """
+        items = [SendItem(index, recipient) for index, recipient in enumerate(recipients, 1)]
+        self._total = len(items)
+        active = list(self.profiles)
+        remaining = {id(p): self._remaining_quota(p) for p in active}
+        connect_errors = []
+
+        while items and not self.cancel_event.is_set():
+            usable = [p for p in active if remaining[id(p)] is None or remaining[id(p)] > 0]
+            if not usable:
+                break
+            shards, items = self._split(items, usable, remaining)
+
+            # アカウントごとの接続プールを並列に実行
+            runs = []
+            for profile, shard in zip(usable, shards):
+                if not shard:
+                    continue
+                pool = self.create_pool(profile)
+                pool.failover = True
+                pool.on_result = self._report_from_pool
+                send_queue = SendQueue(shard, limit=remaining[id(profile)])
+                thread = threading.Thread(
+                    target=pool.run_queue,
+                    args=(send_queue, render_for(pool.sender), len(shard)),
+                    daemon=True
+                )
+                runs.append((profile, pool, send_queue, thread))
+            for _, _, _, thread in runs:
+                thread.start()
+            for _, _, _, thread in runs:
+                thread.join()
+
+            # 上限に達したアカウント、接続できなくなったアカウントの残りを割り当て直す
+            for profile, pool, send_queue, _ in runs:
+                if remaining[id(profile)] is not None:
+                    remaining[id(profile)] -= send_queue.taken
+                connect_errors.extend(pool.connect_errors + pool.disconnect_errors)
+                leftovers = list(pool.leftovers)
+                if leftovers and (remaining[id(profile)] is None or remaining[id(profile)] > 0):
+                    active.remove(profile)
+                items.extend(leftovers)
+            items.sort(key=lambda item: item.index)
+
+        if self.cancel_event.is_set() or not items:
+            return self.summary
+
+        # 1通も送らないうちに全アカウントに接続できなくなった場合は接続エラーとして扱う
+        if not active and self._done == 0 and connect_errors:
+            raise connect_errors[0]
+
+        # 全アカウントが上限に達したか接続できなかったため送れなかった受信者
+        if active:
+            error = RuntimeError("Daily quota of all sender profiles exhausted")
+        else:
+            error = connect_errors[-1] if connect_errors else smtplib.SMTPServerDisconnected("Not sent")
+        for item in items:
+            self._report(SendResult(item.index, item.recipient, item.error or error, attempt=item.attempt))
+        return self.summary
+
+    def _report_from_pool(self, result: SendResult, done: int, total: int):
+        """各プールの送信結果を全体の件数に換算して通知"""
+        with self._lock:
+            if self.summary.add(result):
+                self._done += 1
+            if self.on_result:
+                self.on_result(result, self._done, self._total)
+
+    def _report(self, result: SendResult):
+        """どのアカウントでも送れなかった受信者を報告"""
+        if self.journal:
+            self.journal.record_result(result)
+        self._report_from_pool(result, 0, 0)
+
+
+# ==================== 出力先（送信の代わりにファイルへ書き出す） ====================
+
+class OutputSink:
+    """
+    送信の代わりにメッセージをファイルに書き出す出力先の基底クラス
+
+    SMTPサーバーに接続せず、レート制限・再送も行わないため、ディスクの速度で
+    キャンペーン全体のメッセージを作成できる（送信前の確認や作成処理のベンチマーク用）。
+    MIMEの境界文字列を固定するため、同じ入力からは同じバイト列が書き出される。
+    """
+
+    KIND = ''
+    # 全パートがBase64のため、固定の境界文字列でも本文と衝突しない
+    BOUNDARY = '=' * 15 + '0' * 19 + '=='
+
+    def __init__(self, path):
+        """
+        Args:
+            path: 書き出し先のディレクトリまたはファイル（最初の書き出し時に作成する）
+        """
+        self.path = Path(path)
+        self.completed = False
+
+    @staticmethod
+    def from_spec(spec: str) -> 'OutputSink':
+        """
+        "種類:パス" 形式の指定（eml:DIR, maildir:DIR, mbox:FILE）から出力先を作成
+
+        Raises:
+            ValueError: 種類が不明、またはパスが空の場合
+        """
+        kind, sep, path = spec.partition(':')
+        sink_class = OUTPUT_SINKS.get(kind.strip().lower())
+        if not sep or sink_class is None or not path.strip():
+            raise ValueError(f"Unknown output sink: '{spec}' (expected {', '.join(k + ':PATH' for k in OUTPUT_SINKS)})")
+        return sink_class(os.path.expanduser(path.strip()))
+
+    def __str__(self) -> str:
+        return f"{self.KIND}:{self.path}"
+
+    def open(self):
+        """書き出しの準備（ディレクトリの作成など）"""
+
+    def write(self, index: int, from_addr: str, to_addrs: list, data):
+        """
+        1通書き出す
+
+        Args:
+            index: 受信者の番号（1始まり）
+            from_addr: エンベロープの送信元
+            to_addrs: エンベロープの宛先
+            data: CRLF改行のメッセージ（bytes または StreamedMessage）
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """書き出しを終了する"""
+
+    @staticmethod
+    def _chunks(data) -> Iterable[bytes]:
+        """メッセージ本体を先頭から順に返す（StreamedMessage は添付ファイルを少しずつ読み込む）"""
+        return data.chunks() if isinstance(data, StreamedMessage) else (data,)
+
+    def run(self, recipients, render: Callable, on_result: Optional[Callable] = None,
+            controller: Optional['SendController'] = None, total: Optional[int] = None) -> 'SendSummary':
+        """
+        全受信者のメッセージを作成して書き出す
+
+        Args:
+            recipients: 受信者の辞書リスト（または受信者を順に返す反復可能オブジェクト）
+            render: 受信者から (from_addr, to_addrs, data) を作成する関数
+            on_result: 1件書き出すごとに呼ばれるコールバック on_result(result, done, total)
+            controller: 一時停止・中止を受け付ける SendController
+            total: 受信者数（省略時は len(recipients)）
+
+        Returns:
+            SendSummary（メッセージを作成できなかった受信者は失敗）
+
+        Raises:
+            OSError: 書き出しに失敗した場合（ディスクの空き不足など）
+        """
+        if total is None:
+            total = len(recipients)
+        summary = SendSummary()
+        done = 0
+        self.completed = False
+        self.open()
+        try:
+            for index, recipient in enumerate(recipients, 1):
+                if controller is not None and not controller.checkpoint():
+                    break
+                try:
+                    payload = render(recipient)
+                except Exception as e:
+                    result = SendResult(index, recipient, e)
+                else:
+                    self.write(index, *payload)
+                    result = SendResult(index, recipient)
+                if summary.add(result):
+                    done += 1
+                if on_result:
+                    on_result(result, done, total)
+            else:
+                # 中止されずに最後の受信者まで書き出した
+                self.completed = True
+        finally:
+            self.close()
+        return summary
+
+
+class EmlDirectorySink(OutputSink):
+    """1通ずつ 000001.eml のような連番の .eml ファイルに書き出す（バージョン間の比較向け）"""
+
+    KIND = 'eml'
+
+    def open(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def write(self, index, from_addr, to_addrs, data):
+        with open(self.path / f"{index:06d}.eml", 'wb') as f:
+            f.writelines(self._chunks(data))
+
+
+class MaildirSink(OutputSink):
+    """Maildir 形式で書き出す（tmp に書いてから new に移すため、途中のファイルは見えない）"""
+
+    KIND = 'maildir'
+
+    def open(self):
+        for sub in ('tmp', 'new', 'cur'):
+            (self.path / sub).mkdir(parents=True, exist_ok=True)
+        # 一意なファイル名 "時刻.P<pid>Q<番号>.<ホスト名>"（ホスト名の / と : はエスケープする）
+        host = socket.gethostname().replace('/', r'\057').replace(':', r'\072')
+        self._name_format = f"{int(time.time())}.P{os.getpid()}Q{{0}}.{host}"
+
+    def write(self, index, from_addr, to_addrs, data):
+        name = self._name_format.format(index)
+        tmp_path = self.path / 'tmp' / name
+        with open(tmp_path, 'wb') as f:
+            f.writelines(self._chunks(data))
+        os.replace(tmp_path, self.path / 'new' / name)
+
+
+class MboxSink(OutputSink):
+    """1つの mbox ファイル（mboxrd 形式、LF改行）に追記する"""
+
+    KIND = 'mbox'
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._date = time.strftime('%a %b %d %H:%M:%S %Y', time.gmtime()).encode('ascii')
+
+    def write(self, index, from_addr, to_addrs, data):
+        f = self._file
+        f.write(b'From %s %s\n' % ((from_addr or 'MAILER-DAEMON').encode('utf-8'), self._date))
+        for chunk in self._chunks(data):
+            # どのチャンクも行頭から始まるため、チャンクごとに改行の変換と From 行のエスケープができる
+            f.write(re.sub(br'(?m)^(>*From )', br'>\1', chunk.replace(b'\r\n', b'\n')))
+        f.write(b'\n')
+
+    def close(self):
+        if getattr(self, '_file', None) is not None:
+            self._file.close()
+            self._file = None
+
+
+OUTPUT_SINKS = {sink.KIND: sink for sink in (EmlDirectorySink, MaildirSink, MboxSink)}
+
+
+# ==================== 送信待ちスプール ====================
+
+class SpoolSink(OutputSink):
+    """
+    作成したメッセージを送信待ちのスプールディレクトリに書き出す（--spool-prepare）
+
+    1通ごとに tmp/ に書いてから new/ に移すため、new/ にあるファイルは常に完全な状態になる。
+    ファイルの1行目はエンベロープ（送信元・宛先・受信者）のJSONで、2行目以降がメッセージ本体。
+    既にスプールにある番号は書き直さないため、準備を途中からやり直しても送信済みの分は変わらない。
+    """
+
+    KIND = 'spool'
+
+    def open(self):
+        self.spool = Spool(self.path)
+        self.spool.create()
+        self.written = 0
+        self.spool.write_index(complete=False, prepared=0)
+
+    def write(self, index, from_addr, to_addrs, data, recipient=None):
+        spool = self.spool
+        name = spool.name_for(index)
+        if spool.exists(name):
+            return
+        envelope = {'from': from_addr, 'to': list(to_addrs), 'recipient': dict(recipient or {})}
+        tmp_path = spool.path / 'tmp' / name
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(envelope, ensure_ascii=False).encode('utf-8') + b'\n')
+            f.writelines(self._chunks(data))
+        os.replace(tmp_path, spool.path / 'new' / name)
+        self.written += 1
+
+    def run(self, recipients, render: Callable, on_result: Optional[Callable] = None,
+            controller: Optional['SendController'] = None, total: Optional[int] = None) -> 'SendSummary':
+        # 送信時のログに使う受信者の情報もエンベロープに保存する
+        def render_with_recipient(recipient):
+            from_addr, to_addrs, data = render(recipient)
+            return from_addr, to_addrs, data, recipient
+        return super().run(recipients, render_with_recipient, on_result, controller, total)
+
+    def close(self):
+        spool = getattr(self, 'spool', None)
+        if spool is not None:
+            spool.write_index(complete=self.completed, prepared=len(spool.pending()) + spool.done_count())
+
+
+class SpoolEntry(Mapping):
+    """スプール内の1通。受信者辞書として読むと、エンベロープに保存した受信者の情報を返す"""
+
+    __slots__ = ('spool', 'name', '_recipient')
+
+    def __init__(self, spool: 'Spool', name: str):
+        self.spool = spool
+        self.name = name
+        self._recipient = None
+
+    def _load(self) -> dict:
+        if self._recipient is None:
+            with open(self.spool.path / 'new' / self.name, 'rb') as f:
+                self._recipient = json.loads(f.readline().decode('utf-8')).get('recipient') or {}
+        return self._recipient
+
+    def __getitem__(self, key):
+        return self._load().get(key, '')
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
 
-        Args:
-            csv_file: CSVまたはExcelファイルのパス（所属,氏名,メールアドレスの形式）
-            i18n: 国際化インスタンス
 
-        Returns:
-            受信者の辞書リスト [{'affiliation': '株式会社ABC', 'name': '山田太郎', 'email': 'yamada@example.com'}, ...]
-        """
-        # ファイル拡張子で判定
-        file_ext = os.path.splitext(csv_file)[1].lower()
+class _SpooledBody:
+    """スプールファイルのメッセージ本体を行単位のチャンクで少しずつ読み込む（StreamedMessage の一部）"""
 
-        if file_ext == '.xlsx':
-            # Excelファイルの場合
-            if not EXCEL_SUPPORT:
-                error_msg = "Excel file support requires openpyxl. Install it with: pip install openpyxl" if i18n is None else i18n.t("error_excel_support")
-                raise ImportError(error_msg)
+    __slots__ = ('path', 'offset')
 
-            if i18n:
-                print(f"Reading Excel file: {csv_file}")
-            else:
-                print(f"Excelファイルを読み込み中: {csv_file}")
+    CHUNK_SIZE = 256 * 1024
 
-            return self._read_recipients_from_excel(csv_file, i18n)
-        else:
-            # CSVファイルの場合
-            return self._read_recipients_from_csv(csv_file, i18n)
+    def __init__(self, path: Path, offset: int):
+        self.path = path
+        self.offset = offset
 
-    def _read_recipients_from_csv(self, csv_file, i18n=None):
-        """
-        CSVファイルから受信者リストを読み込む（文字コード自動検出）
+    def chunks(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                # 各チャンクが行頭から始まるよう、行の終わりまで読む
+                if not chunk.endswith(b'\n'):
+                    chunk += f.readline()
+                yield chunk
 
-        Args:
-            csv_file: CSVファイルのパス
-            i18n: 国際化インスタンス
 
-        Returns:
-            受信者の辞書リスト
-        """
-        # ファイルの文字コードを自動検出
-        with open(csv_file, 'rb') as f:
-            raw_data = f.read()
-            detected = chardet.detect(raw_data)
-            encoding = detected['encoding']
-            confidence = detected['confidence']
-            # i18nがない場合はデフォルトメッセージ（後方互換性のため）
-            if i18n:
-                print(f"CSV encoding: {encoding} (confidence: {confidence:.2%})")
-            else:
-                print(f"CSVファイルの文字コード: {encoding} (信頼度: {confidence:.2%})")
-
-        # 検出された文字コードでファイルを読み込む（newline=''で改行コードを適切に処理）
-        recipients = []
-        with open(csv_file, 'r', encoding=encoding, newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # CSVのカラム名に応じて調整
-                affiliation_key = '所属' if '所属' in row else 'affiliation'
-                name_key = '氏名' if '氏名' in row else 'name'
-                email_key = 'メールアドレス' if 'メールアドレス' in row else 'email'
-
-                recipients.append({
-                    'affiliation': row[affiliation_key].strip(),
-                    'name': row[name_key].strip(),
-                    'email': row[email_key].strip()
-                })
-        return recipients
+class Spool:
+    """
+    送信待ちスプールディレクトリ
+
+    tmp/（書き出し中）→ new/（送信待ち）→ cur/（送信済み）または failed/（恒久的なエラー）と
+    ファイルを移して状態を表す。送信中にプロセスが終了しても、送信済みのファイルは cur/ に
+    移っているため、再起動すると new/ に残っている分だけを送信する。
+    spool.json には準備の状況（完了したか、作成した通数）を保存する。
+    """
+
+    INDEX_FILE = 'spool.json'
+    STATES = ('tmp', 'new', 'cur', 'failed')
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def create(self):
+        """ディレクトリを作成"""
+        for state in self.STATES:
+            (self.path / state).mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def name_for(index: int) -> str:
+        return f"{index:08d}.msg"
+
+    def exists(self, name: str) -> bool:
+        """いずれかの状態（送信待ち・送信済み・失敗）にあるか"""
+        return any((self.path / state / name).exists() for state in ('new', 'cur', 'failed'))
 
-    def _read_recipients_from_excel(self, xlsx_file, i18n=None):
+    def pending(self) -> list:
+        """送信待ちのファイル名（受信者の順）"""
+        try:
+            return sorted(name for name in os.listdir(self.path / 'new') if name.endswith('.msg'))
+        except FileNotFoundError:
+            return []
+
+    def done_count(self) -> int:
+        """送信済みと失敗の通数"""
+        return sum(len(os.listdir(self.path / state)) for state in ('cur', 'failed')
+                   if (self.path / state).is_dir())
+
+    def read_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.path / self.INDEX_FILE, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def write_index(self, **values):
+        """spool.json を更新（一時ファイルに書いてから置き換える）"""
+        index = self.read_index()
+        index.update(values, version=1, updated=time.strftime('%Y-%m-%dT%H:%M:%S'))
+        tmp_path = self.path / 'tmp' / self.INDEX_FILE
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path / self.INDEX_FILE)
+
+    @property
+    def prepared(self) -> bool:
+        """準備（全メッセージの書き出し）が完了しているか"""
+        return bool(self.read_index().get('complete'))
+
+    def render(self, entry: SpoolEntry, stream_threshold: int = 0) -> tuple:
         """
-        Excelファイルから受信者リストを読み込む
+        送信待ちのファイルから (from_addr, to_addrs, data) を読み込む
 
         Args:
-            xlsx_file: Excelファイルのパス
-            i18n: 国際化インスタンス
-
-        Returns:
-            受信者の辞書リスト
+            entry: SpoolEntry
+            stream_threshold: このサイズ（バイト）以上のメッセージは送信時に少しずつ読み込む（0の場合は常に全体を読み込む）
         """
-        workbook = load_workbook(xlsx_file, read_only=True)
-        sheet = workbook.active
+        path = self.path / 'new' / entry.name
+        with open(path, 'rb') as f:
+            envelope = json.loads(f.readline().decode('utf-8'))
+            if stream_threshold and os.fstat(f.fileno()).st_size >= stream_threshold:
+                data = StreamedMessage([_SpooledBody(path, f.tell())])
+            else:
+                data = f.read()
+        entry._recipient = envelope.get('recipient') or {}
+        return envelope['from'], envelope['to'], data
 
-        recipients = []
-        rows = list(sheet.iter_rows(values_only=True))
+    def finish(self, entry: SpoolEntry, success: bool):
+        """送信済み（cur/）または失敗（failed/）に移す"""
+        os.replace(self.path / 'new' / entry.name,
+                   self.path / ('cur' if success else 'failed') / entry.name)
 
-        if len(rows) == 0:
-            return recipients
 
-        # ヘッダー行を取得
-        header = rows[0]
+# ==================== 共有キューによる分散送信 ====================
 
-        # カラムインデックスを特定
-        affiliation_key = '所属' if '所属' in header else 'affiliation'
-        name_key = '氏名' if '氏名' in header else 'name'
-        email_key = 'メールアドレス' if 'メールアドレス' in header else 'email'
+class LeaseQueue:
+    """
+    複数のプロセス・ホストで受信者を分け合って送信するための共有キュー（SQLite）
 
-        try:
-            affiliation_idx = header.index(affiliation_key)
-            name_idx = header.index(name_key)
-            email_idx = header.index(email_key)
-        except ValueError as e:
-            error_msg = f"Required columns not found in Excel file. Expected: {affiliation_key}, {name_key}, {email_key}" if i18n is None else i18n.t("error_excel_columns")
-            raise ValueError(error_msg) from e
+    ワーカーは送信待ち（pending）の受信者をまとめて期限付きで借り受け（leased）、送信の直前に
+    1件ずつ送信中（sending）として記録してから送信し、結果を sent / failed として記録する。
+    一時的なエラーの受信者は再送予定時刻（not_before）を付けて送信待ちに戻し、どのワーカーでも再送できる。
+    ワーカーが停止してリースの期限が切れると、まだ送信を始めていない受信者は送信待ちに戻り、
+    他のワーカーが借り受け直す。送信中のまま期限が切れた受信者や、本文を送った後に切断された
+    受信者は届いたかどうか分からないため unknown とし、送り直さない（どの受信者にも2通以上は送らない）。
+    ファイル共有上に置く場合は、ファイルロックが正しく動くもの（NFSv4、SMBなど）を使うこと
+    （WALモードはネットワーク越しに使えないため、既定のロールバックジャーナルで動かす）。
+    """
 
-        # データ行を読み込む
-        for row in rows[1:]:
-            if row[email_idx]:  # メールアドレスがある行のみ
-                recipients.append({
-                    'affiliation': str(row[affiliation_idx]).strip() if row[affiliation_idx] else '',
-                    'name': str(row[name_idx]).strip() if row[name_idx] else '',
-                    'email': str(row[email_idx]).strip()
-                })
+    STATES = ('pending', 'leased', 'sending', 'sent', 'failed', 'unknown')
 
-        workbook.close()
-        return recipients
-    
-    def read_email_template(self, template_file, i18n=None):
+    def __init__(self, path, timeout: float = 60.0, flush_interval: float = 1.0):
         """
-        メールテンプレートを読み込む（件名と本文を分離、文字コード自動検出）
+        Args:
+            path: キューファイル（SQLite）のパス
+            timeout: 他のワーカーがロックしている間に待つ秒数
+            flush_interval: 送信結果をまとめて記録する間隔（秒）
+        """
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._results = []  # 記録待ちの送信結果 (state, detail, 時刻, id, owner)
+        self._last_flush = time.monotonic()
+        self._db = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+
+    @classmethod
+    def create(cls, path, recipients, campaign: Dict[str, Any]) -> 'LeaseQueue':
+        """
+        キューを作成して受信者を登録する（一時ファイルに作成してから置き換える）
 
         Args:
-            template_file: テンプレートファイルのパス
-            i18n: 国際化インスタンス
+            path: キューファイルのパス
+            recipients: 受信者の辞書（またはMapping）を順に返す反復可能オブジェクト
+            campaign: ワーカーがメッセージを作成するための情報（件名・本文テンプレート、CC など）
 
-        Returns:
-            (subject, body) のタプル
+        Raises:
+            FileExistsError: キューが既に存在する場合
         """
-        # ファイルの文字コードを自動検出
-        with open(template_file, 'rb') as f:
-            raw_data = f.read()
-            detected = chardet.detect(raw_data)
-            encoding = detected['encoding']
-            confidence = detected['confidence']
-            # i18nがない場合はデフォルトメッセージ（後方互換性のため）
-            if i18n:
-                print(f"Template encoding: {encoding} (confidence: {confidence:.2%})")
-            else:
-                print(f"テンプレートファイルの文字コード: {encoding} (信頼度: {confidence:.2%})")
+        path = Path(path)
+        if path.exists():
+            raise FileExistsError(str(path))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        if tmp_path.exists():
+            tmp_path.unlink()
 
-        # 検出された文字コードでファイルを読み込む
-        with open(template_file, 'r', encoding=encoding) as f:
-            content = f.read()
+        db = sqlite3.connect(str(tmp_path))
+        try:
+            with db:
+                db.execute("CREATE TABLE campaign (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+                db.execute(
+                    "CREATE TABLE recipients ("
+                    "id INTEGER PRIMARY KEY, recipient TEXT NOT NULL, state TEXT NOT NULL DEFAULT 'pending', "
+                    "owner TEXT, lease_until REAL, detail TEXT, updated REAL, "
+                    "attempt INTEGER NOT NULL DEFAULT 0, not_before REAL, envelope TEXT)"
+                )
+                db.execute("CREATE INDEX recipients_state ON recipients (state, id)")
+                db.execute("CREATE INDEX recipients_owner ON recipients (owner, state)")
+                db.executemany("INSERT INTO campaign (key, value) VALUES (?, ?)",
+                               [(key, json.dumps(value, ensure_ascii=False)) for key, value in campaign.items()])
+                db.executemany("INSERT INTO recipients (recipient) VALUES (?)",
+                               ((json.dumps(dict(recipient), ensure_ascii=False),) for recipient in recipients))
+        finally:
+            db.close()
+        os.replace(str(tmp_path), str(path))
+        return cls(path)
 
-        # 件名と本文を分離（最初の行が件名、2行目は空行、3行目以降が本文）
-        lines = content.split('\n')
+    @contextlib.contextmanager
+    def _transaction(self):
+        """書き込みロックを取ってからトランザクションを実行（他のワーカーとはSQLiteのロックで排他）"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
 
-        if len(lines) < 3:
-            # i18nがない場合はデフォルトメッセージ（後方互換性のため）
-            if i18n:
-                raise ValueError("Invalid template format. Line 1: Subject, Line 2: Empty, Line 3+: Body")
-            else:
-                raise ValueError("テンプレートファイルの形式が正しくありません。1行目: 件名、2行目: 空行、3行目以降: 本文")
+    def campaign(self) -> Dict[str, Any]:
+        """キュー作成時に保存したキャンペーンの情報"""
+        with self._lock:
+            rows = self._db.execute("SELECT key, value FROM campaign").fetchall()
+        return {key: json.loads(value) for key, value in rows}
 
-        subject = lines[0].strip()
-        # 2行目をスキップして3行目以降を本文とする
-        body = '\n'.join(lines[2:])
+    def counts(self) -> Dict[str, int]:
+        """状態ごとの受信者数"""
+        self.flush()
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM recipients GROUP BY state").fetchall()
+        counts = dict.fromkeys(self.STATES, 0)
+        counts.update(rows)
+        return counts
 
-        return subject, body
-    
-    def create_message(self, to_email, to_name, to_affiliation, subject_template, body_template,
-                      cc=None, bcc=None, reply_to=None, attachments=None):
+    def claim(self, owner: str, count: int, lease_seconds: float) -> list:
         """
-        メールメッセージを作成
+        送信待ちの受信者を最大 count 件借り受ける（期限切れのリースは先に回収する）
 
         Args:
-            to_email: 宛先メールアドレス
-            to_name: 宛先氏名
-            to_affiliation: 宛先所属名
-            subject_template: 件名テンプレート
-            body_template: 本文テンプレート
-            cc: CCアドレス（カンマ区切りまたはリスト）
-            bcc: BCCアドレス（カンマ区切りまたはリスト）
-            reply_to: 返信先アドレス
-            attachments: 添付ファイルパスのリスト
+            owner: ワーカーID
+            count: 借り受ける最大件数
+            lease_seconds: リースの期限（秒）。期限までに renew しないと他のワーカーに回収される
 
         Returns:
-            MIMEMultipartメッセージオブジェクト
+            SendItem のリスト（index はキュー内の受信者番号。再送の場合は再送回数と送る宛先を持つ）
         """
-        msg = MIMEMultipart()
+        now = time.time()
+        with self._transaction() as db:
+            self._flush_locked(db)
+            db.execute("UPDATE recipients SET state = 'pending', owner = NULL, lease_until = NULL, updated = ? "
+                       "WHERE state = 'leased' AND lease_until < ?", (now, now))
+            db.execute("UPDATE recipients SET state = 'unknown', detail = 'lease expired while sending', updated = ? "
+                       "WHERE state = 'sending' AND lease_until < ?", (now, now))
+            rows = db.execute("SELECT id, recipient, attempt, envelope FROM recipients "
+                              "WHERE state = 'pending' AND (not_before IS NULL OR not_before <= ?) ORDER BY id LIMIT ?",
+                              (now, max(1, int(count)))).fetchall()
+            db.executemany("UPDATE recipients SET state = 'leased', owner = ?, lease_until = ?, updated = ? WHERE id = ?",
+                           [(owner, now + lease_seconds, now, row[0]) for row in rows])
+        return [SendItem(row[0], json.loads(row[1]), row[2], envelope=json.loads(row[3]) if row[3] else None)
+                for row in rows]
 
-        # 送信元の設定（表示名がある場合は formataddr を使用）
-        if self.sender_display_name:
-            msg['From'] = formataddr((str(Header(self.sender_display_name, 'utf-8')), self.email_address))
-        else:
-            msg['From'] = self.email_address
+    def begin(self, owner: str, index: int) -> bool:
+        """
+        送信の直前に送信中として記録する（記録してから送信するため、同じ受信者に2回送ることはない）
 
-        msg['To'] = to_email
+        Returns:
+            記録できたか（リースの期限が切れて他のワーカーに回収された場合は False。送信しないこと）
+        """
+        now = time.time()
+        with self._transaction() as db:
+            # たまっている送信結果も同じトランザクションで記録する
+            self._flush_locked(db)
+            cursor = db.execute(
+                "UPDATE recipients SET state = 'sending', updated = ? "
+                "WHERE id = ? AND owner = ? AND state IN ('leased', 'sending') AND lease_until >= ?",
+                (now, index, owner, now)
+            )
+            return cursor.rowcount == 1
 
-        # 件名に所属名と氏名を展開
-        subject = subject_template.replace('{所属}', to_affiliation).replace('{氏名}', to_name)
-        msg['Subject'] = Header(subject, 'utf-8')
+    def defer(self, owner: str, item: SendItem, delay: float):
+        """
+        一時的なエラーの受信者を delay 秒後に再送できる送信待ちに戻す（どのワーカーでも再送できる）
 
-        # CC設定
-        if cc:
-            if isinstance(cc, str):
-                msg['Cc'] = cc
-            else:
-                msg['Cc'] = ', '.join(cc)
+        Args:
+            owner: ワーカーID
+            item: 再送する SendItem（再送回数と、一部の宛先に届いた場合は残りの宛先を持つ）
+            delay: 再送までの秒数
+        """
+        now = time.time()
+        envelope = json.dumps(item.envelope) if item.envelope is not None else None
+        with self._transaction() as db:
+            self._flush_locked(db)
+            db.execute("UPDATE recipients SET state = 'pending', owner = NULL, lease_until = NULL, attempt = ?, "
+                       "not_before = ?, envelope = ?, detail = ?, updated = ? "
+                       "WHERE id = ? AND owner = ? AND state = 'sending'",
+                       (item.attempt, now + delay, envelope, str(item.error or ''), now, item.index, owner))
 
-        # BCC設定
-        if bcc:
-            if isinstance(bcc, str):
-                msg['Bcc'] = bcc
-            else:
-                msg['Bcc'] = ', '.join(bcc)
+    def finish(self, owner: str, index: int, state: str, detail: str = ''):
+        """
+        送信結果を記録（flush_interval 秒ごとにまとめてコミットする）
 
-        # Reply-To設定
-        if reply_to:
-            msg['Reply-To'] = reply_to
+        Args:
+            owner: ワーカーID
+            index: キュー内の受信者番号
+            state: sent / failed / unknown（届いたかどうか分からない）
+            detail: エラーの内容
+        """
+        with self._lock:
+            self._results.append((state, detail, time.time(), index, owner))
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
 
-        # 本文に所属名と氏名を展開
-        body = body_template.replace('{所属}', to_affiliation).replace('{氏名}', to_name)
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
+    def flush(self):
+        """記録待ちの送信結果をコミット"""
+        with self._lock:
+            if not self._results:
+                return
+        with self._transaction() as db:
+            self._flush_locked(db)
 
-        # 添付ファイルを追加
-        if attachments:
-            for file_path in attachments:
-                if os.path.exists(file_path):
-                    with open(file_path, 'rb') as f:
-                        # ファイルのMIMEタイプを推測
-                        filename = os.path.basename(file_path)
-                        mime_type, _ = mimetypes.guess_type(file_path)
-                        if mime_type is None:
-                            mime_type = 'application/octet-stream'
-
-                        # MIMEタイプを分割（例: 'image/png' -> 'image', 'png'）
-                        maintype, subtype = mime_type.split('/', 1)
-
-                        part = MIMEBase(maintype, subtype)
-                        part.set_payload(f.read())
-                        encoders.encode_base64(part)
-
-                        # Content-Typeヘッダーにnameパラメータを追加（日本語ファイル名対応）
-                        encoded_filename = str(Header(filename, 'utf-8'))
-                        part.set_param('name', encoded_filename)
-                        # Content-Dispositionヘッダーを設定
-                        part.add_header('Content-Disposition', 'attachment', filename=encoded_filename)
-                        msg.attach(part)
+    def _flush_locked(self, db):
+        if self._results:
+            db.executemany("UPDATE recipients SET state = ?, detail = ?, updated = ? WHERE id = ? AND owner = ?",
+                           self._results)
+            self._results = []
+        self._last_flush = time.monotonic()
 
-        return msg
-    
-    def send_bulk_emails(self, csv_file, template_file,
-                        cc=None, bcc=None, reply_to=None, attachments=None, delay=1, i18n=None):
+    def renew(self, owner: str, lease_seconds: float) -> int:
+        """借り受けている受信者のリースを延長し、延長した件数を返す"""
+        now = time.time()
+        with self._transaction() as db:
+            self._flush_locked(db)
+            cursor = db.execute("UPDATE recipients SET lease_until = ? "
+                                "WHERE owner = ? AND state IN ('leased', 'sending') AND lease_until >= ?",
+                                (now + lease_seconds, owner, now))
+            return cursor.rowcount
+
+    def release(self, owner: str):
         """
-        一斉送信を実行
+        借り受けている受信者を返す
 
-        Args:
-            csv_file: 受信者リストCSVファイル
-            template_file: メールテンプレートファイル（件名と本文）
-            cc: CCアドレス
-            bcc: BCCアドレス
-            reply_to: 返信先アドレス
-            attachments: 添付ファイルパスのリスト
-            delay: メール送信間隔（秒）
-            i18n: 国際化インスタンス
+        まだ送信していない受信者は送信待ちに戻す。送信中のまま結果の分からない受信者は
+        unknown として送り直さない。
         """
-        # 受信者リストとテンプレートを読み込み
-        recipients = self.read_recipients(csv_file, i18n)
-        subject_template, body_template = self.read_email_template(template_file, i18n)
+        now = time.time()
+        with self._transaction() as db:
+            self._flush_locked(db)
+            db.execute("UPDATE recipients SET state = 'pending', owner = NULL, lease_until = NULL, updated = ? "
+                       "WHERE owner = ? AND state = 'leased'", (now, owner))
+            db.execute("UPDATE recipients SET state = 'unknown', detail = 'interrupted while sending', updated = ? "
+                       "WHERE owner = ? AND state = 'sending'", (now, owner))
 
-        # 確認メッセージ（i18nがある場合は多言語対応、ない場合は日本語デフォルト）
-        if i18n:
-            print(i18n.get('cli_confirm_header'))
-            print(i18n.get('preview_subject', subject_template))
-            print(i18n.get('preview_recipients', len(recipients)))
-            if self.sender_display_name:
-                print(i18n.get('preview_sender', f"{self.sender_display_name} <{self.email_address}>"))
-            else:
-                print(i18n.get('preview_sender', self.email_address))
-            if cc:
-                print(i18n.get('preview_cc', cc))
-            if bcc:
-                print(i18n.get('preview_bcc', bcc))
-            if reply_to:
-                print(i18n.get('preview_reply_to', reply_to))
-            if attachments:
-                print(i18n.get('preview_attachments', ', '.join(attachments)))
-        else:
-            print(f"\n=== 送信内容確認 ===")
-            print(f"件名: {subject_template}")
-            print(f"送信先: {len(recipients)}件")
-            if self.sender_display_name:
-                print(f"送信元: {self.sender_display_name} <{self.email_address}>")
-            else:
-                print(f"送信元: {self.email_address}")
-            if cc:
-                print(f"CC: {cc}")
-            if bcc:
-                print(f"BCC: {bcc}")
-            if reply_to:
-                print(f"Reply-To: {reply_to}")
-            if attachments:
-                print(f"添付ファイル: {', '.join(attachments)}")
+    def close(self):
+        """記録待ちの送信結果をコミットして閉じる"""
+        self.flush()
+        with self._lock:
+            self._db.close()
 
-        # 確認
-        if i18n:
-            confirm = input(i18n.get('cli_confirm_send') + ": ")
-        else:
-            confirm = input("\n送信を開始しますか？ (yes/no): ")
 
-        if confirm.lower() != 'yes':
-            if i18n:
-                print(i18n.get('cli_cancelled'))
-            else:
-                print("送信をキャンセルしました。")
-            return
-        
-        # SMTP接続
-        try:
-            # ポート465はSSL、それ以外はTLSを使用
-            local_hostname = self._get_safe_local_hostname()
-            if self.smtp_port == 465:
-                server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, local_hostname=local_hostname)
-            else:
-                server = smtplib.SMTP(self.smtp_server, self.smtp_port, local_hostname=local_hostname)
-                server.starttls()
-
-            server.login(self.email_address, self.email_password)
-            
-            # 各受信者にメール送信
-            success_count = 0
-            fail_count = 0
-            
-            for i, recipient in enumerate(recipients, 1):
-                try:
-                    msg = self.create_message(
-                        to_email=recipient['email'],
-                        to_name=recipient['name'],
-                        to_affiliation=recipient['affiliation'],
-                        subject_template=subject_template,
-                        body_template=body_template,
-                        cc=cc,
-                        bcc=bcc,
-                        reply_to=reply_to,
-                        attachments=attachments
-                    )
-
-                    # 送信
-                    server.send_message(msg)
-                    success_count += 1
-                    if i18n:
-                        print(i18n.get('send_success', i, len(recipients), recipient['affiliation'],
-                                      recipient['name'], recipient['email']))
-                    else:
-                        print(f"[{i}/{len(recipients)}] 送信成功: {recipient['affiliation']} {recipient['name']} ({recipient['email']})")
-
-                    # 送信間隔を設定（レート制限対策）
-                    if i < len(recipients):
-                        time.sleep(delay)
+def _row_range(text: str) -> tuple:
+    """
+    --rows の値（例: 2-50001, 1000-, -5000）を (最初, 最後) の行番号に変換
 
-                except Exception as e:
-                    fail_count += 1
-                    if i18n:
-                        print(i18n.get('send_failed', i, len(recipients), recipient['affiliation'],
-                                      recipient['name'], recipient['email'], str(e)))
-                    else:
-                        print(f"[{i}/{len(recipients)}] 送信失敗: {recipient['affiliation']} {recipient['name']} ({recipient['email']}) - エラー: {e}")
+    Raises:
+        argparse.ArgumentTypeError: 形式が正しくない場合
+    """
+    first, sep, last = text.partition('-')
+    try:
+        if not sep:
+            raise ValueError(text)
+        row_range = (int(first) if first.strip() else None, int(last) if last.strip() else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid row range: '{text}' (expected START-END, e.g. 2-50001)")
+    if row_range[0] is not None and row_range[1] is not None and row_range[0] > row_range[1]:
+        raise argparse.ArgumentTypeError(f"invalid row range: '{text}' (START is after END)")
+    return row_range
 
-            server.quit()
 
-            if i18n:
-                print(f"\n{i18n.get('send_complete', success_count, fail_count)}")
-            else:
-                print(f"\n送信完了: 成功 {success_count}件, 失敗 {fail_count}件")
+def _output_sink(text: str) -> OutputSink:
+    """
+    --output-sink の値（例: eml:out, maildir:~/Maildir, mbox:campaign.mbox）を OutputSink に変換
 
-        except Exception as e:
-            if i18n:
-                print(f"SMTP connection error: {e}")
-            else:
-                print(f"SMTP接続エラー: {e}")
+    Raises:
+        argparse.ArgumentTypeError: 形式が正しくない場合
+    """
+    try:
+        return OutputSink.from_spec(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
 
 def main():
@@ -628,7 +5003,41 @@ def main():
     parser.add_argument('--lang', choices=['ja', 'en'], help='Language / 言語 (ja/en)')
     parser.add_argument('--load-config', action='store_true', help='Load settings from config file / 設定ファイルから読み込む')
     parser.add_argument('--save-config', action='store_true', help='Save settings to config file / 設定ファイルに保存する')
+    parser.add_argument('--connections', type=int, help='Number of concurrent SMTP connections / 同時SMTP接続数')
+    parser.add_argument('--engine', choices=['thread', 'async'], help='Sending engine: async uses one thread for all connections, but each connection still sends one message at a time / 送信エンジン（async は全接続を1スレッドで扱うが、1接続で同時に送るのは1通ずつ）')
+    parser.add_argument('--resume', action='store_true', help='Skip recipients already delivered in a previous run / 前回送信済みの受信者をスキップして再開する')
+    parser.add_argument('--sheet', help='Excel sheet name to read recipients from / 受信者を読み込むExcelのシート名')
+    parser.add_argument('--rows', type=_row_range, metavar='START-END',
+                        help='Only send to this range of spreadsheet rows (header is row 1) / 送信する行番号の範囲（ヘッダーが1行目）')
+    # 送信以外の動作モード（同時には指定できない）
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--benchmark-render', type=int, nargs='?', const=200, metavar='N',
+                      help='Measure per-message render cost instead of sending / 送信せずに1通あたりのメッセージ作成時間を計測する')
+    mode.add_argument('--spool-prepare', metavar='DIR',
+                      help='Render all messages into a spool directory without sending / '
+                           '送信せずに全メッセージを作成してスプールディレクトリに書き出す')
+    mode.add_argument('--spool-drain', metavar='DIR',
+                      help='Send the messages queued in a spool directory / スプールディレクトリの送信待ちメッセージを送信する')
+    mode.add_argument('--output-sink', type=_output_sink, metavar='KIND:PATH',
+                      help='Write messages to eml:DIR, maildir:DIR or mbox:FILE instead of sending / '
+                           '送信せずにメッセージをファイルに書き出す（eml:DIR, maildir:DIR, mbox:FILE）')
+    mode.add_argument('--queue-init', metavar='QUEUE',
+                      help='Create a shared queue file of recipients for --worker instead of sending / '
+                           '送信せずに --worker で送信する受信者の共有キューファイルを作成する')
+    mode.add_argument('--worker', metavar='QUEUE',
+                      help='Send to recipients claimed from a shared queue (run on several hosts at once) / '
+                           '共有キューから受信者を借り受けて送信する（複数のホストで同時に実行できる）')
+    parser.add_argument('--worker-id', help='Worker name recorded in the queue (default: host:pid) / '
+                                            'キューに記録するワーカー名（省略時は ホスト名:プロセスID）')
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help='Recipients claimed per lease (default: 100) / 一度に借り受ける受信者数（既定: 100）')
+    parser.add_argument('--lease-seconds', type=float, default=300,
+                        help='Lease duration before a stopped worker\'s recipients are reclaimed (default: 300) / '
+                             '停止したワーカーの受信者を回収するまでのリース期限（秒、既定: 300）')
     args = parser.parse_args()
+    if args.spool_prepare:
+        # スプールの準備はスプールへの書き出しとして実行する
+        args.output_sink = SpoolSink(args.spool_prepare)
 
     # i18nインスタンスを作成
     i18n = get_i18n(args.lang)
@@ -724,14 +5133,25 @@ def main():
 
     # パスワードの取得（セキュリティのため設定ファイルには保存しない）
     # DEFAULT_EMAIL_PASSWORDがある場合のみ使用（後方互換性のため）
-    if DEFAULT_EMAIL_PASSWORD:
+    # GUI版でkeyringに保存したパスワードがあれば入力を求めない（ワーカーなど無人での実行用）
+    # ファイルに書き出す・キューを作成する・メッセージ作成を計測するだけの場合はSMTPサーバーにログインしないため不要
+    if args.output_sink is not None or args.queue_init or args.benchmark_render is not None:
+        email_password = ""
+    elif DEFAULT_EMAIL_PASSWORD:
         email_password = DEFAULT_EMAIL_PASSWORD
         if i18n.get_language() == 'ja':
             print("メールパスワード: ******** (設定済み)")
         else:
             print("Email Password: ******** (configured)")
     else:
-        email_password = getpass(i18n.get('cli_email_password') + ": ")
+        email_password = load_saved_password(email_address)
+        if email_password:
+            if i18n.get_language() == 'ja':
+                print("メールパスワード: ******** (keyringから読み込み)")
+            else:
+                print("Email Password: ******** (loaded from keyring)")
+        else:
+            email_password = getpass(i18n.get('cli_email_password') + ": ")
 
     # 送信元表示名の取得（設定ファイルまたはデフォルト値から）
     display_name_from_config = config.get('sender', {}).get('display_name', '')
@@ -900,6 +5320,132 @@ def main():
         else:
             send_delay = 5
 
+    # 送信レート制限の取得（設定ファイル > DEFAULT値、なければ送信間隔から算出）
+    rate_limits = config.get('email_options', {}).get('rate_limits') or DEFAULT_RATE_LIMITS
+    if rate_limits:
+        rate_description = RateLimiter.from_config(rate_limits).describe()
+        if i18n.get_language() == 'ja':
+            print(f"送信レート制限: {rate_description} (設定済み、送信間隔より優先)")
+        else:
+            print(f"Rate limits: {rate_description} (configured, overrides send delay)")
+
+    # 受信者ドメインごとの上限（設定ファイル > DEFAULT値）
+    domain_limits = config.get('email_options', {}).get('domain_limits') or DEFAULT_DOMAIN_LIMITS
+    if domain_limits:
+        try:
+            domain_description = DomainScheduler(domain_limits).describe()
+            if i18n.get_language() == 'ja':
+                print(f"ドメインごとの上限: {domain_description} (設定済み)")
+            else:
+                print(f"Domain limits: {domain_description} (configured)")
+        except (ValueError, TypeError, AttributeError):
+            if i18n.get_language() == 'ja':
+                print("警告: 設定されたドメインごとの上限が無効です。")
+            else:
+                print("Warning: Configured domain limits are invalid.")
+            domain_limits = None
+
+    # 自動スロットリングの設定（設定ファイル > DEFAULT値）
+    adaptive_throttle = config.get('email_options', {}).get('adaptive_throttle') or DEFAULT_ADAPTIVE_THROTTLE
+
+    # 再送設定（設定ファイル > DEFAULT値）
+    retry = config.get('email_options', {}).get('retry') or DEFAULT_RETRY
+
+    # 1日の送信上限と追加の送信元アカウント（設定ファイル > DEFAULT値）
+    try:
+        daily_quota = int(config.get('email_options', {}).get('daily_quota') or DEFAULT_DAILY_QUOTA)
+    except (ValueError, TypeError):
+        if i18n.get_language() == 'ja':
+            print("警告: 設定された1日の送信上限が無効です。")
+        else:
+            print("Warning: Configured daily quota is invalid.")
+        daily_quota = DEFAULT_DAILY_QUOTA
+    profiles_config = config.get('profiles') or []
+    profiles = None
+    if ((profiles_config or daily_quota) and args.output_sink is None
+            and not (args.spool_drain or args.queue_init or args.worker or args.benchmark_render is not None)):
+        # 入力された送信元を先頭に、設定ファイルのアカウントを追加
+        # （パスワードはGUI版でkeyringに保存したものを使い、なければ入力を求める）
+        profiles = [SenderProfile(email_address, email_password, smtp_server, smtp_port,
+                                  sender_display_name, daily_quota=daily_quota)]
+        for entry in profiles_config:
+            label = entry.get('name') or entry.get('email_address', '')
+            password = read_password(entry.get('email_address', ''), i18n.get('cli_profile_password', label))
+            try:
+                profiles.append(SenderProfile.from_config(entry, password))
+            except (ValueError, TypeError) as e:
+                if i18n.get_language() == 'ja':
+                    print(f"警告: 送信元アカウント '{label}' の設定が無効です: {e}")
+                else:
+                    print(f"Warning: Sender profile '{label}' is invalid: {e}")
+
+    # メッセージの先読み数（設定ファイル > DEFAULT値）
+    try:
+        render_ahead = config.get('email_options', {}).get('render_ahead', DEFAULT_RENDER_AHEAD)
+        render_ahead = max(0, int(render_ahead if render_ahead is not None else DEFAULT_RENDER_AHEAD))
+    except (ValueError, TypeError):
+        if i18n.get_language() == 'ja':
+            print("警告: 設定されたメッセージの先読み数が無効です。")
+        else:
+            print("Warning: Configured render-ahead count is invalid.")
+        render_ahead = DEFAULT_RENDER_AHEAD
+
+    # 添付ファイルをストリーミングするサイズ（設定ファイル > DEFAULT値）
+    try:
+        stream_attachments_mb = config.get('email_options', {}).get('stream_attachments_mb', DEFAULT_STREAM_ATTACHMENTS_MB)
+        stream_attachments_mb = max(0.0, float(stream_attachments_mb if stream_attachments_mb is not None
+                                               else DEFAULT_STREAM_ATTACHMENTS_MB))
+    except (ValueError, TypeError):
+        if i18n.get_language() == 'ja':
+            print("警告: 設定された添付ファイルのストリーミングサイズが無効です。")
+        else:
+            print("Warning: Configured attachment streaming size is invalid.")
+        stream_attachments_mb = DEFAULT_STREAM_ATTACHMENTS_MB
+
+    # 接続の張り替え設定（設定ファイル > DEFAULT値）
+    try:
+        recycle_messages = int(config.get('email_options', {}).get('recycle_messages') or DEFAULT_RECYCLE_MESSAGES)
+        recycle_minutes = float(config.get('email_options', {}).get('recycle_minutes') or DEFAULT_RECYCLE_MINUTES)
+    except (ValueError, TypeError):
+        if i18n.get_language() == 'ja':
+            print("警告: 設定された接続の張り替え設定が無効です。")
+        else:
+            print("Warning: Configured connection recycling settings are invalid.")
+        recycle_messages, recycle_minutes = DEFAULT_RECYCLE_MESSAGES, DEFAULT_RECYCLE_MINUTES
+
+    # 同時接続数の取得（コマンドライン引数 > 設定ファイル > DEFAULT値）
+    connections = args.connections
+    if connections is None:
+        connections_from_config = config.get('email_options', {}).get('connections', None)
+        try:
+            connections = int(connections_from_config) if connections_from_config is not None else DEFAULT_CONNECTIONS
+        except (ValueError, TypeError):
+            if i18n.get_language() == 'ja':
+                print(f"警告: 設定された同時接続数 '{connections_from_config}' が無効です。")
+            else:
+                print(f"Warning: Configured connections '{connections_from_config}' is invalid.")
+            connections = DEFAULT_CONNECTIONS
+    connections = max(1, connections)
+    if connections > 1:
+        if i18n.get_language() == 'ja':
+            print(f"同時接続数: {connections}")
+        else:
+            print(f"Connections: {connections}")
+
+    # 送信エンジンの取得（コマンドライン引数 > 設定ファイル > DEFAULT値）
+    engine = args.engine or config.get('email_options', {}).get('engine', '') or DEFAULT_ENGINE
+    if engine not in ('thread', 'async'):
+        if i18n.get_language() == 'ja':
+            print(f"警告: 設定された送信エンジン '{engine}' が無効です。")
+        else:
+            print(f"Warning: Configured engine '{engine}' is invalid.")
+        engine = DEFAULT_ENGINE
+    if engine != DEFAULT_ENGINE:
+        if i18n.get_language() == 'ja':
+            print(f"送信エンジン: {engine}")
+        else:
+            print(f"Engine: {engine}")
+
     # 設定を保存（--save-configフラグが指定されている場合）
     if args.save_config:
         # 設定ファイルに保存する内容を構築（パスワードは含めない）
@@ -922,8 +5468,20 @@ def main():
                 "cc": cc if cc else "",
                 "bcc": bcc if bcc else "",
                 "reply_to": reply_to if reply_to else "",
-                "send_delay": send_delay
+                "send_delay": send_delay,
+                "rate_limits": rate_limits if rate_limits else {},
+                "domain_limits": domain_limits if domain_limits else {},
+                "adaptive_throttle": adaptive_throttle if adaptive_throttle else {},
+                "retry": retry if retry else {},
+                "recycle_messages": recycle_messages,
+                "recycle_minutes": recycle_minutes,
+                "connections": connections,
+                "engine": engine,
+                "daily_quota": daily_quota,
+                "render_ahead": render_ahead,
+                "stream_attachments_mb": stream_attachments_mb
             },
+            "profiles": profiles_config,
             "ui": {
                 "language": i18n.get_language()
             }
@@ -940,8 +5498,60 @@ def main():
             else:
                 print("\nWarning: Failed to save configuration file.")
 
-    # 送信実行
     sender = EmailBulkSender(email_address, email_password, smtp_server, smtp_port, sender_display_name)
+
+    # メッセージ作成のベンチマーク（--benchmark-render が指定された場合は送信しない）
+    if args.benchmark_render is not None:
+        sender.benchmark_render(csv_file, template_file, cc=cc, bcc=bcc, reply_to=reply_to,
+                                attachments=attachments, count=args.benchmark_render, i18n=i18n)
+        return
+
+    # スプールの送信（--spool-drain が指定された場合は受信者リストを読み込まない）
+    if args.spool_drain:
+        sender.drain_spool(
+            args.spool_drain,
+            delay=send_delay,
+            i18n=i18n,
+            connections=connections,
+            engine=engine,
+            rate_limits=rate_limits,
+            adaptive_throttle=adaptive_throttle,
+            recycle_messages=recycle_messages,
+            recycle_minutes=recycle_minutes,
+            retry=retry,
+            render_ahead=render_ahead,
+            stream_attachments_mb=stream_attachments_mb
+        )
+        return
+
+    # 共有キューの作成（--queue-init が指定された場合は送信しない）
+    if args.queue_init:
+        sender.init_queue(args.queue_init, csv_file, template_file, cc=cc, bcc=bcc, reply_to=reply_to,
+                          attachments=attachments, i18n=i18n, sheet=args.sheet, rows=args.rows)
+        return
+
+    # 共有キューからの送信（--worker が指定された場合は受信者リストを読み込まない）
+    if args.worker:
+        sender.run_worker(
+            args.worker,
+            worker_id=args.worker_id,
+            batch_size=max(1, args.batch_size),
+            lease_seconds=max(10.0, args.lease_seconds),
+            delay=send_delay,
+            i18n=i18n,
+            connections=connections,
+            engine=engine,
+            rate_limits=rate_limits,
+            adaptive_throttle=adaptive_throttle,
+            recycle_messages=recycle_messages,
+            recycle_minutes=recycle_minutes,
+            retry=retry,
+            render_ahead=render_ahead,
+            stream_attachments_mb=stream_attachments_mb
+        )
+        return
+
+    # 送信実行
     sender.send_bulk_emails(
         csv_file=csv_file,
         template_file=template_file,
@@ -950,7 +5560,23 @@ def main():
         reply_to=reply_to,
         attachments=attachments,
         delay=send_delay,
-        i18n=i18n
+        i18n=i18n,
+        connections=connections,
+        engine=engine,
+        rate_limits=rate_limits,
+        adaptive_throttle=adaptive_throttle,
+        recycle_messages=recycle_messages,
+        recycle_minutes=recycle_minutes,
+        journal_dir=config_manager.config_dir,
+        resume=args.resume,
+        retry=retry,
+        profiles=profiles,
+        render_ahead=render_ahead,
+        stream_attachments_mb=stream_attachments_mb,
+        sheet=args.sheet,
+        rows=args.rows,
+        sink=args.output_sink,
+        domain_limits=domain_limits
     )
 
 
@@ -6,16 +6,19 @@ Email Bulk Sender - GUI Application
 
 import customtkinter as ctk
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, simpledialog
 import tkinter.ttk as ttk
 import threading
 import time
 import os
-import smtplib
-from typing import Dict, Any, Optional, List
+import queue
+from typing import Dict, Any, Optional, Callable, List, Sequence
 
 # CLI版からビジネスロジックを再利用
-from email_bulk_sender import EmailBulkSender, I18n, InternalConfigManager
+from email_bulk_sender import (
+    KEYRING_SERVICE, EmailBulkSender, I18n, InternalConfigManager, ParsedFileCache, RecipientStore, SendController, SendJournal,
+    SenderProfile, compile_template
+)
 
 # keyring サポート（パスワード保存用）
 try:
@@ -24,8 +27,6 @@ try:
 except ImportError:
     KEYRING_AVAILABLE = False
 
-KEYRING_SERVICE = "email_bulk_sender"
-
 
 # ==================== I18n 拡張 ====================
 
@@ -73,6 +74,8 @@ class GuiI18n(I18n):
             'label_bcc': 'BCC',
             'label_reply_to': 'Reply-To',
             'label_delay': '送信間隔（秒）',
+            'label_connections': '同時接続数',
+            'label_engine': '送信エンジン',
             'placeholder_cc': 'カンマ区切りで複数指定可',
             'placeholder_bcc': 'カンマ区切りで複数指定可',
             'placeholder_reply_to': '返信先アドレス',
@@ -82,6 +85,9 @@ class GuiI18n(I18n):
             'button_preview': 'プレビュー',
             'button_test_send': 'テスト送信',
             'button_send': '送信開始',
+            'button_resume': '続きから送信',
+            'button_pause': '一時停止',
+            'button_unpause': '再開',
             'button_cancel': 'キャンセル',
             'button_close': '閉じる',
 
@@ -91,8 +97,12 @@ class GuiI18n(I18n):
             # ステータス
             'status_ready': '準備完了',
             'status_sending': '送信中... ({0}/{1})',
+            'status_rate': '送信レート: {0}',
             'status_complete': '送信完了: 成功 {0}件, 失敗 {1}件',
             'status_cancelled': '送信がキャンセルされました',
+            'status_paused': '一時停止中（送信中のメールは送り切ります）',
+            'status_unpaused': '送信を再開しました',
+            'status_cancelling': '送信を中止しています（送信中のメールは送り切ります）...',
             'status_config_saved': '設定を保存しました',
             'status_config_loaded': '設定を読み込みました',
             'status_config_not_found': '設定ファイルが見つかりません',
@@ -104,6 +114,9 @@ class GuiI18n(I18n):
             'dialog_recipient_col_affiliation': '所属',
             'dialog_recipient_col_name': '氏名',
             'dialog_recipient_col_email': 'メールアドレス',
+            'dialog_recipient_matches': '検索結果: {0}件 / {1}件',
+            'dialog_recipient_searching': '検索中... {0}件 / {1}件',
+            'placeholder_recipient_search': '所属・氏名・メールアドレスで検索',
 
             # プレビューダイアログ
             'dialog_preview_title': '送信前プレビュー',
@@ -139,6 +152,10 @@ class GuiI18n(I18n):
             # 確認
             'confirm_send_title': '送信確認',
             'confirm_send_message': '{0}件の宛先にメールを送信します。よろしいですか？',
+            'confirm_resume_message': '送信済みの{0}件をスキップし、残り{1}件の宛先にメールを送信します。よろしいですか？',
+            'info_nothing_to_resume': '全ての宛先に送信済みです',
+            'prompt_profile_password_title': '送信元アカウントのパスワード',
+            'prompt_profile_password': '送信元アカウント {0} <{1}> のパスワードを入力してください',
 
             # ファイルダイアログ
             'filedialog_recipient': '受信者リストを選択',
@@ -174,6 +191,8 @@ class GuiI18n(I18n):
             'label_bcc': 'BCC',
             'label_reply_to': 'Reply-To',
             'label_delay': 'Send Delay (sec)',
+            'label_connections': 'Connections',
+            'label_engine': 'Engine',
             'placeholder_cc': 'Comma-separated for multiple',
             'placeholder_bcc': 'Comma-separated for multiple',
             'placeholder_reply_to': 'Reply-to address',
@@ -181,13 +200,20 @@ class GuiI18n(I18n):
             'button_preview': 'Preview',
             'button_test_send': 'Test Send',
             'button_send': 'Start Sending',
+            'button_resume': 'Resume',
+            'button_pause': 'Pause',
+            'button_unpause': 'Continue',
             'button_cancel': 'Cancel',
             'button_close': 'Close',
             'section_log': 'Send Log',
             'status_ready': 'Ready',
             'status_sending': 'Sending... ({0}/{1})',
+            'status_rate': 'Rate: {0}',
             'status_complete': 'Complete: {0} succeeded, {1} failed',
             'status_cancelled': 'Sending cancelled',
+            'status_paused': 'Paused (messages in flight will finish)',
+            'status_unpaused': 'Sending resumed',
+            'status_cancelling': 'Cancelling (messages in flight will finish)...',
             'status_config_saved': 'Settings saved',
             'status_config_loaded': 'Settings loaded',
             'status_config_not_found': 'Config file not found',
@@ -197,6 +223,9 @@ class GuiI18n(I18n):
             'dialog_recipient_col_affiliation': 'Affiliation',
             'dialog_recipient_col_name': 'Name',
             'dialog_recipient_col_email': 'Email',
+            'dialog_recipient_matches': 'Matches: {0} of {1}',
+            'dialog_recipient_searching': 'Searching... {0} of {1}',
+            'placeholder_recipient_search': 'Search by affiliation, name or email',
             'dialog_preview_title': 'Send Preview',
             'dialog_preview_subject': 'Subject',
             'dialog_preview_from': 'From',
@@ -224,6 +253,10 @@ class GuiI18n(I18n):
             'error_no_test_address': 'Please enter test recipient address',
             'confirm_send_title': 'Confirm Send',
             'confirm_send_message': 'Send email to {0} recipients. Proceed?',
+            'confirm_resume_message': 'Skip {0} already delivered and send email to the remaining {1} recipients. Proceed?',
+            'info_nothing_to_resume': 'All recipients have already been delivered',
+            'prompt_profile_password_title': 'Sender Profile Password',
+            'prompt_profile_password': 'Enter the password for sender profile {0} <{1}>',
             'filedialog_recipient': 'Select Recipient List',
             'filedialog_template': 'Select Template File',
             'filedialog_attachment': 'Select Attachments',
@@ -268,14 +301,117 @@ class GuiConfigManager(InternalConfigManager):
             return None
 
 
+# ==================== UI更新チャネル ====================
+
+class UiUpdateChannel:
+    """
+    送信スレッドからのログと進捗をまとめて画面に反映するチャネル
+
+    送信スレッドは log / progress / call を呼ぶだけで、画面の更新はメインループの
+    タイマー（REFRESH_MS ごと）でまとめて行う。ログはタイマー1回分をまとめて追加し、
+    進捗は最新の値だけを反映する。
+    """
+
+    REFRESH_MS = 16    # 画面のリフレッシュレート（約60Hz）に合わせた反映間隔
+
+    def __init__(self, widget: tk.Misc, on_log: Callable[[List[str]], None],
+                 on_progress: Callable[[float, str], None], max_lines: int = 5000):
+        """
+        Args:
+            widget: タイマーを登録するウィジェット
+            on_log: ログの行をまとめて追加する関数（メインスレッドで呼ばれる）
+            on_progress: 進捗を反映する関数（メインスレッドで呼ばれる）
+            max_lines: 1回に反映するログの最大行数（古い行から捨てる）
+        """
+        self.widget = widget
+        self.on_log = on_log
+        self.on_progress = on_progress
+        self.max_lines = max_lines
+        self._queue = queue.Queue()
+        self._progress = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._job = None
+
+    def log(self, message: str):
+        """ログを追加（どのスレッドからでも呼べる）"""
+        self._queue.put((None, message))
+
+    def progress(self, value: float, status: str):
+        """進捗を更新（どのスレッドからでも呼べる。反映されるのは最新の値のみ）"""
+        with self._lock:
+            self._progress = (value, status)
+
+    def call(self, func: Callable, *args):
+        """それまでのログと進捗を反映した後に、メインスレッドで func を呼ぶ"""
+        self._queue.put((func, args))
+
+    def start(self):
+        """反映用のタイマーを開始（メインスレッドから呼ぶ）"""
+        self._running = True
+        if self._job is None:
+            self._job = self.widget.after(self.REFRESH_MS, self._drain)
+
+    def stop(self):
+        """残りを反映したらタイマーを止める（どのスレッドからでも呼べる）"""
+        self._running = False
+
+    def _flush_progress(self):
+        with self._lock:
+            progress, self._progress = self._progress, None
+        if progress is not None:
+            self.on_progress(*progress)
+
+    def _flush_lines(self, lines: List[str]):
+        if lines:
+            self.on_log(lines[-self.max_lines:])
+            del lines[:]
+
+    def _drain(self):
+        self._job = None
+        lines = []
+        while True:
+            try:
+                func, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if func is None:
+                lines.append(payload)
+            else:
+                self._flush_lines(lines)
+                self._flush_progress()
+                func(*payload)
+        self._flush_lines(lines)
+        self._flush_progress()
+        if self._running or not self._queue.empty():
+            self._job = self.widget.after(self.REFRESH_MS, self._drain)
+
+
 # ==================== ダイアログ ====================
 
 class RecipientListDialog(ctk.CTkToplevel):
-    """受信者リスト一覧ダイアログ"""
+    """
+    受信者リスト一覧ダイアログ
 
-    def __init__(self, parent, recipients: List[Dict], i18n: GuiI18n):
+    Treeview には画面に収まる行数の項目だけを作り、スクロールに合わせて値を差し替える。
+    検索は受信者リストを一定件数ずつ区切ってメインループの合間に進め、見つかった順に表示する。
+    """
+
+    ROW_HEIGHT = 28
+    SEARCH_DELAY_MS = 200      # 入力が止まってから検索を始めるまでの時間
+    SEARCH_CHUNK = 20000       # 1回の割り込みで検索する件数
+    SEARCH_COLUMNS = ('affiliation', 'name', 'email')
+
+    def __init__(self, parent, recipients: Sequence[Dict[str, str]], i18n: GuiI18n):
         super().__init__(parent)
         self.i18n = i18n
+        self.recipients = recipients
+
+        self._matches = range(len(recipients))  # 表示する受信者の位置
+        self._offset = 0                        # 先頭に表示している _matches の位置
+        self._item_ids: List[str] = []
+        self._search_job = None
+        self._search_text = ""
 
         self.title(i18n.get('dialog_recipient_title'))
         self.geometry("650x450")
@@ -284,18 +420,26 @@ class RecipientListDialog(ctk.CTkToplevel):
         self.grab_set()
 
         # 件数ラベル
-        ctk.CTkLabel(
+        self.count_label = ctk.CTkLabel(
             self,
             text=i18n.get('dialog_recipient_count', len(recipients)),
             font=ctk.CTkFont(size=14, weight="bold")
-        ).pack(padx=10, pady=(10, 5))
+        )
+        self.count_label.pack(padx=10, pady=(10, 5))
+
+        # 検索欄
+        self.search_entry = ctk.CTkEntry(
+            self, placeholder_text=i18n.get('placeholder_recipient_search')
+        )
+        self.search_entry.pack(fill="x", padx=10, pady=5)
+        self.search_entry.bind("<KeyRelease>", self._on_search_changed)
 
         # Treeview用フレーム
         tree_frame = tk.Frame(self)
         tree_frame.pack(fill="both", expand=True, padx=10, pady=5)
 
         style = ttk.Style()
-        style.configure("Recipient.Treeview", rowheight=28)
+        style.configure("Recipient.Treeview", rowheight=self.ROW_HEIGHT)
 
         columns = ('num', 'affiliation', 'name', 'email')
         self.tree = ttk.Treeview(
@@ -308,25 +452,145 @@ class RecipientListDialog(ctk.CTkToplevel):
         self.tree.heading('name', text=i18n.get('dialog_recipient_col_name'))
         self.tree.heading('email', text=i18n.get('dialog_recipient_col_email'))
 
-        self.tree.column('num', width=40, anchor='center')
-        self.tree.column('affiliation', width=180)
+        self.tree.column('num', width=60, anchor='center')
+        self.tree.column('affiliation', width=170)
         self.tree.column('name', width=120)
-        self.tree.column('email', width=260)
+        self.tree.column('email', width=250)
 
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # スクロールバーは Treeview ではなく _matches の表示位置に連動させる
+        self.scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self._on_scrollbar)
 
         self.tree.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        self.scrollbar.pack(side="right", fill="y")
 
-        for i, r in enumerate(recipients, 1):
-            self.tree.insert('', 'end', values=(i, r['affiliation'], r['name'], r['email']))
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.tree.bind("<Prior>", lambda e: self._scroll_by(-len(self._item_ids)))
+        self.tree.bind("<Next>", lambda e: self._scroll_by(len(self._item_ids)))
+        self.tree.bind("<Home>", lambda e: self._scroll_to(0))
+        self.tree.bind("<End>", lambda e: self._scroll_to(len(self._matches)))
 
         # 閉じるボタン
         ctk.CTkButton(
             self, text=i18n.get('button_close'), command=self.destroy
         ).pack(padx=10, pady=10)
 
+    def destroy(self):
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+        super().destroy()
+
+    # ---------- 表示 ----------
+
+    def _on_resize(self, event):
+        """表示できる行数に合わせて Treeview の項目を作り直す"""
+        header = self.tree.winfo_reqheight() - int(self.tree.cget('height')) * self.ROW_HEIGHT
+        visible = max(1, (event.height - max(header, 0)) // self.ROW_HEIGHT)
+        while len(self._item_ids) < visible:
+            self._item_ids.append(self.tree.insert('', 'end'))
+        while len(self._item_ids) > visible:
+            self.tree.delete(self._item_ids.pop())
+        self._scroll_to(self._offset)
+
+    def _render(self):
+        """表示位置の受信者を Treeview の項目に書き込む"""
+        recipients, matches = self.recipients, self._matches
+        for i, item_id in enumerate(self._item_ids):
+            pos = self._offset + i
+            if pos < len(matches):
+                index = matches[pos]
+                r = recipients[index]
+                self.tree.item(item_id, values=(index + 1, r['affiliation'], r['name'], r['email']))
+            else:
+                self.tree.item(item_id, values=())
+
+        total = len(matches)
+        if total:
+            self.scrollbar.set(self._offset / total, min(1.0, (self._offset + len(self._item_ids)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _scroll_to(self, offset: int):
+        offset = max(0, min(offset, len(self._matches) - len(self._item_ids)))
+        if offset != self._offset:
+            self.tree.selection_remove(self.tree.selection())
+        self._offset = offset
+        self._render()
+        return "break"
+
+    def _scroll_by(self, rows: int):
+        return self._scroll_to(self._offset + rows)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self._scroll_to(int(float(value) * len(self._matches)))
+        elif unit == 'pages':
+            self._scroll_by(int(value) * len(self._item_ids))
+        else:
+            self._scroll_by(int(value))
+
+    def _on_mousewheel(self, event):
+        # Windows は 120 単位、macOS は 1 単位で delta が届く
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-3 * step)
+
+    # ---------- 検索 ----------
+
+    def _on_search_changed(self, event=None):
+        """入力が止まるのを待ってから検索を始める"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(self.SEARCH_DELAY_MS, self._start_search)
+
+    def _start_search(self):
+        text = self.search_entry.get().strip()
+        self._search_job = None
+        if text == self._search_text:
+            return
+        self._search_text = text
+        if not text:
+            self._matches = range(len(self.recipients))
+            self._update_count(finished=True)
+            self._scroll_to(0)
+            return
+        self._matches = []
+        self._scroll_to(0)
+        self._search_chunk(text, 0)
+
+    def _search_chunk(self, text: str, start: int):
+        """受信者リストの start から SEARCH_CHUNK 件を検索し、続きはメインループの合間に行う"""
+        if text != self._search_text:
+            return
+        stop = start + self.SEARCH_CHUNK
+        self._matches.extend(self._search(text, start, stop))
+        finished = stop >= len(self.recipients)
+        if not finished:
+            self._search_job = self.after(1, self._search_chunk, text, stop)
+        self._update_count(finished)
+        self._render()
+
+    def _search(self, text: str, start: int, stop: int):
+        """検索語を含む受信者の位置を返す（RecipientStore 以外のリストは1件ずつ調べる）"""
+        if isinstance(self.recipients, RecipientStore):
+            return self.recipients.search(text, self.SEARCH_COLUMNS, start, stop)
+        text = text.lower()
+        return [
+            index for index in range(start, min(stop, len(self.recipients)))
+            if any(text in (self.recipients[index].get(key) or '').lower() for key in self.SEARCH_COLUMNS)
+        ]
+
+    def _update_count(self, finished: bool):
+        total = len(self.recipients)
+        if not self._search_text:
+            text = self.i18n.get('dialog_recipient_count', total)
+        else:
+            key = 'dialog_recipient_matches' if finished else 'dialog_recipient_searching'
+            text = self.i18n.get(key, len(self._matches), total)
+        self.count_label.configure(text=text)
+
 
 class PreviewDialog(ctk.CTkToplevel):
     """送信前プレビューダイアログ"""
@@ -477,17 +741,12 @@ class TestSendDialog(ctk.CTkToplevel):
                 subject_template=subject_template,
                 body_template=body_template,
                 cc=cc, bcc=bcc, reply_to=reply_to,
-                attachments=attachments
+                attachments=attachments,
+                fields=dict(recipient, email=address)
             )
 
             # SMTP送信
-            local_hostname = sender._get_safe_local_hostname()
-            if sender.smtp_port == 465:
-                server = smtplib.SMTP_SSL(sender.smtp_server, sender.smtp_port, local_hostname=local_hostname)
-            else:
-                server = smtplib.SMTP(sender.smtp_server, sender.smtp_port, local_hostname=local_hostname)
-                server.starttls()
-            server.login(sender.email_address, sender.email_password)
+            server = sender.connect_smtp()
             server.send_message(msg)
             server.quit()
 
@@ -513,15 +772,28 @@ class TestSendDialog(ctk.CTkToplevel):
 class EmailBulkSenderApp(ctk.CTk):
     """メール一括送信ツール GUI メインウィンドウ"""
 
+    MAX_LOG_LINES = 5000    # ログエリアに残す最大行数
+
     def __init__(self):
         super().__init__()
 
         self.i18n = GuiI18n()
         self.config_manager = GuiConfigManager("email")
 
+        # 読み込んだ受信者リスト・テンプレートのキャッシュ（ファイルが変更されるまで再利用）
+        # 受信者リストのディスクへの保存は設定ファイルの ui.cache_recipients を有効にした場合のみ
+        self._file_cache = ParsedFileCache()
+
         # 送信制御用フラグ
         self._sending = False
-        self._cancel_requested = False
+        self._controller = SendController()
+        # 送信スレッドからのログと進捗をまとめて反映するチャネル
+        self._ui = UiUpdateChannel(self, self._append_log, self._update_progress, self.MAX_LOG_LINES)
+
+        # GUIに入力欄のない詳細設定（設定ファイルの email_options から読み込み）
+        self._advanced_options: Dict[str, Any] = {}
+        # 設定ファイルの追加の送信元アカウント（GUIに入力欄はなく、読み込んだ値をそのまま保存する）
+        self._profiles_config: List[Dict[str, Any]] = []
 
         # ウィンドウ設定
         self.title(self.i18n.get('app_title'))
@@ -745,6 +1017,22 @@ class EmailBulkSenderApp(ctk.CTk):
         self.delay_entry.grid(row=3, column=1, sticky="w", pady=2)
         self.delay_entry.insert(0, "5")
 
+        ctk.CTkLabel(grid, text=self.i18n.get('label_connections')).grid(
+            row=4, column=0, sticky="e", padx=(0, 8), pady=2
+        )
+        self.connections_entry = ctk.CTkEntry(grid, width=100)
+        self.connections_entry.grid(row=4, column=1, sticky="w", pady=2)
+        self.connections_entry.insert(0, "1")
+
+        ctk.CTkLabel(grid, text=self.i18n.get('label_engine')).grid(
+            row=5, column=0, sticky="e", padx=(0, 8), pady=2
+        )
+        self.engine_var = ctk.StringVar(value="thread")
+        self.engine_menu = ctk.CTkOptionMenu(
+            grid, values=["thread", "async"], variable=self.engine_var, width=100
+        )
+        self.engine_menu.grid(row=5, column=1, sticky="w", pady=2)
+
     def _create_buttons_section(self):
         """操作ボタンセクション"""
         button_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
@@ -772,6 +1060,12 @@ class EmailBulkSenderApp(ctk.CTk):
         )
         self.send_btn.pack(side="right", padx=3)
 
+        self.resume_btn = ctk.CTkButton(
+            button_frame, text=self.i18n.get('button_resume'),
+            command=lambda: self._start_sending(resume=True)
+        )
+        self.resume_btn.pack(side="right", padx=3)
+
         self.cancel_btn = ctk.CTkButton(
             button_frame, text=self.i18n.get('button_cancel'),
             fg_color="#dc3545", hover_color="#c82333",
@@ -779,6 +1073,12 @@ class EmailBulkSenderApp(ctk.CTk):
         )
         self.cancel_btn.pack(side="right", padx=3)
 
+        self.pause_btn = ctk.CTkButton(
+            button_frame, text=self.i18n.get('button_pause'),
+            command=self._toggle_pause, state="disabled"
+        )
+        self.pause_btn.pack(side="right", padx=3)
+
     def _create_log_section(self):
         """ログ表示セクション"""
         # 進捗バー
@@ -840,8 +1140,15 @@ class EmailBulkSenderApp(ctk.CTk):
 
     def _log(self, message: str):
         """ログエリアにメッセージを追加"""
+        self._append_log([message])
+
+    def _append_log(self, messages: List[str]):
+        """ログエリアにメッセージをまとめて追加（MAX_LOG_LINES 行を超えたら古い行から削除）"""
         self.log_text.configure(state="normal")
-        self.log_text.insert("end", message + "\n")
+        self.log_text.insert("end", "\n".join(messages) + "\n")
+        excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - self.MAX_LOG_LINES
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
         self.log_text.see("end")
         self.log_text.configure(state="disabled")
 
@@ -860,6 +1167,8 @@ class EmailBulkSenderApp(ctk.CTk):
             'bcc': self.bcc_entry.get(),
             'reply_to': self.reply_to_entry.get(),
             'delay': self.delay_entry.get(),
+            'connections': self.connections_entry.get(),
+            'engine': self.engine_var.get(),
         }
 
     def _set_form_state(self, state: Dict[str, str]):
@@ -876,6 +1185,8 @@ class EmailBulkSenderApp(ctk.CTk):
         self._set_entry(self.bcc_entry, state.get('bcc', ''))
         self._set_entry(self.reply_to_entry, state.get('reply_to', ''))
         self._set_entry(self.delay_entry, state.get('delay', '5'))
+        self._set_entry(self.connections_entry, state.get('connections', '1'))
+        self.engine_var.set(state.get('engine', 'thread'))
 
     def _validate_inputs(self) -> bool:
         """入力値のバリデーション"""
@@ -925,15 +1236,53 @@ class EmailBulkSenderApp(ctk.CTk):
             sender_display_name=self.display_name_entry.get().strip(),
         )
 
-    def _read_recipients(self) -> List[Dict]:
-        """受信者リストを読み込み"""
+    def _create_profiles(self) -> Optional[List[SenderProfile]]:
+        """
+        送信元アカウントのリストを作成（入力欄のアカウントを先頭に、設定ファイルのアカウントを追加）
+
+        追加のアカウントのパスワードはkeyringから読み込み、なければ入力を求めてkeyringに保存する。
+        追加のアカウントも1日の送信上限もない場合は None
+        """
+        daily_quota = self._advanced_options.get('daily_quota') or 0
+        if not self._profiles_config and not daily_quota:
+            return None
+
+        profiles = [SenderProfile(
+            self.email_entry.get().strip(), self.password_entry.get(),
+            self.smtp_server_entry.get().strip(), int(self.port_entry.get().strip() or "587"),
+            self.display_name_entry.get().strip(), daily_quota=daily_quota
+        )]
+        for entry in self._profiles_config:
+            email = entry.get('email_address', '')
+            password = self.config_manager.load_password(email) if email else None
+            if not password:
+                password = simpledialog.askstring(
+                    self.i18n.get('prompt_profile_password_title'),
+                    self.i18n.get('prompt_profile_password', entry.get('name') or email, email),
+                    show='*', parent=self
+                )
+                if not password:
+                    continue
+                self.config_manager.save_password(email, password)
+            profiles.append(SenderProfile.from_config(entry, password))
+        return profiles
+
+    def _read_recipients(self) -> RecipientStore:
+        """受信者リストを読み込み（ファイルが変更されていなければキャッシュから）"""
         sender = self._create_sender()
-        return sender.read_recipients(self.recipient_entry.get().strip())
+        return self._file_cache.recipients(self.recipient_entry.get().strip(), sender.read_recipients)
 
     def _read_template(self):
-        """テンプレートを読み込み"""
+        """テンプレートを読み込み（ファイルが変更されていなければキャッシュから）"""
         sender = self._create_sender()
-        return sender.read_email_template(self.template_entry.get().strip())
+        return self._file_cache.template(self.template_entry.get().strip(), sender.read_email_template)
+
+    def _get_connections(self) -> int:
+        """同時接続数を取得"""
+        try:
+            return max(1, int(self.connections_entry.get().strip() or "1"))
+        except ValueError:
+            return 1
 
     def _get_attachments(self) -> Optional[List[str]]:
         """添付ファイルのリストを取得"""
@@ -975,8 +1324,8 @@ class EmailBulkSenderApp(ctk.CTk):
                 return
 
             r = recipients[0]
-            subject = subject_template.replace('{所属}', r['affiliation']).replace('{氏名}', r['name'])
-            body = body_template.replace('{所属}', r['affiliation']).replace('{氏名}', r['name'])
+            subject = compile_template(subject_template).render(r)
+            body = compile_template(body_template).render(r)
 
             display_name = self.display_name_entry.get().strip()
             email = self.email_entry.get().strip()
@@ -1005,8 +1354,21 @@ class EmailBulkSenderApp(ctk.CTk):
 
     # ==================== 送信処理 ====================
 
-    def _start_sending(self):
-        """一括送信を開始"""
+    def _open_journal(self) -> SendJournal:
+        """現在の受信者リストとテンプレートの送信ジャーナルを開く"""
+        return SendJournal.for_campaign(
+            self.config_manager.config_dir,
+            self.recipient_entry.get().strip(),
+            self.template_entry.get().strip()
+        )
+
+    def _start_sending(self, resume: bool = False):
+        """
+        一括送信を開始
+
+        Args:
+            resume: 送信ジャーナルで送信済みの受信者をスキップして再開する
+        """
         if not self._validate_inputs():
             return
 
@@ -1020,32 +1382,53 @@ class EmailBulkSenderApp(ctk.CTk):
             messagebox.showerror("Error", self.i18n.get('error_read_failed', "No recipients"))
             return
 
+        # 送信ジャーナル（再開時は送信済みの受信者を除く）と送信元アカウント
+        try:
+            profiles = self._create_profiles()
+            journal = self._open_journal()
+        except Exception as e:
+            messagebox.showerror("Error", self.i18n.get('error_send_failed', str(e)))
+            return
+
+        if resume:
+            remaining = journal.pending(recipients)
+            if not remaining:
+                journal.close()
+                messagebox.showinfo(self.i18n.get('confirm_send_title'), self.i18n.get('info_nothing_to_resume'))
+                return
+            confirm_msg = self.i18n.get('confirm_resume_message', len(recipients) - len(remaining), len(remaining))
+            recipients = remaining
+        else:
+            confirm_msg = self.i18n.get('confirm_send_message', len(recipients))
+
         # 確認ダイアログ
-        if not messagebox.askyesno(
-            self.i18n.get('confirm_send_title'),
-            self.i18n.get('confirm_send_message', len(recipients))
-        ):
+        if not messagebox.askyesno(self.i18n.get('confirm_send_title'), confirm_msg):
+            journal.close()
             return
 
         # UI状態を送信中に変更
         self._sending = True
-        self._cancel_requested = False
+        self._controller = SendController()
         self.send_btn.configure(state="disabled")
+        self.resume_btn.configure(state="disabled")
         self.cancel_btn.configure(state="normal")
+        self.pause_btn.configure(state="normal", text=self.i18n.get('button_pause'))
         self.progress_bar.set(0)
 
         # ログをクリア
         self.log_text.configure(state="normal")
         self.log_text.delete("1.0", "end")
         self.log_text.configure(state="disabled")
+        self._ui.start()
 
         # バックグラウンドスレッドで送信
         thread = threading.Thread(
-            target=self._do_send, args=(recipients,), daemon=True
+            target=self._do_send, args=(recipients, journal, profiles), daemon=True
         )
         thread.start()
 
-    def _do_send(self, recipients: List[Dict]):
+    def _do_send(self, recipients: Sequence[Dict], journal: SendJournal,
+                 profiles: Optional[List[SenderProfile]] = None):
         """送信処理（バックグラウンドスレッド）"""
         try:
             sender = self._create_sender()
@@ -1061,70 +1444,94 @@ class EmailBulkSenderApp(ctk.CTk):
             except ValueError:
                 delay = 5.0
 
-            # SMTP接続
-            local_hostname = sender._get_safe_local_hostname()
-            if sender.smtp_port == 465:
-                server = smtplib.SMTP_SSL(sender.smtp_server, sender.smtp_port, local_hostname=local_hostname)
-            else:
-                server = smtplib.SMTP(sender.smtp_server, sender.smtp_port, local_hostname=local_hostname)
-                server.starttls()
-            server.login(sender.email_address, sender.email_password)
-
-            success_count = 0
-            fail_count = 0
-            total = len(recipients)
-
-            for i, recipient in enumerate(recipients, 1):
-                if self._cancel_requested:
-                    self.after(0, lambda: self._log(self.i18n.get('status_cancelled')))
-                    break
-
-                try:
-                    msg = sender.create_message(
-                        to_email=recipient['email'],
-                        to_name=recipient['name'],
-                        to_affiliation=recipient['affiliation'],
-                        subject_template=subject_template,
-                        body_template=body_template,
-                        cc=cc, bcc=bcc, reply_to=reply_to,
-                        attachments=attachments,
-                    )
-                    server.send_message(msg)
-                    success_count += 1
+            # 自動スロットリングによる現在の送信レート（調整されるまでは表示しない）
+            self._rate_text = ""
 
+            def on_result(result, done, total):
+                recipient = result.recipient
+                if result.success:
                     log_msg = self.i18n.get(
-                        'send_success', i, total,
+                        'send_success', result.index, total,
                         recipient['affiliation'], recipient['name'], recipient['email']
                     )
-                    self.after(0, lambda m=log_msg: self._log(m))
-
-                except Exception as e:
-                    fail_count += 1
+                elif result.status == 'deferred':
+                    log_msg = self.i18n.get(
+                        'send_deferred', result.index, total,
+                        recipient['affiliation'], recipient['name'], recipient['email'],
+                        str(result.error), result.retry_in, result.attempt + 1, result.max_retries
+                    )
+                elif result.status == 'gave_up':
+                    log_msg = self.i18n.get(
+                        'send_gave_up', result.index, total,
+                        recipient['affiliation'], recipient['name'], recipient['email'],
+                        str(result.error), result.attempt
+                    )
+                else:
                     log_msg = self.i18n.get(
-                        'send_failed', i, total,
+                        'send_failed', result.index, total,
                         recipient['affiliation'], recipient['name'],
-                        recipient['email'], str(e)
+                        recipient['email'], str(result.error)
                     )
-                    self.after(0, lambda m=log_msg: self._log(m))
-
-                # 進捗更新
-                progress = i / total
-                status = self.i18n.get('status_sending', i, total)
-                self.after(0, lambda p=progress, s=status: self._update_progress(p, s))
-
-                # 送信間隔
-                if i < total and not self._cancel_requested:
-                    time.sleep(delay)
+                # CC/BCCなど、To以外で拒否された宛先を個別に表示
+                for addr, code, message in result.refused_others():
+                    log_msg += "\n" + self.i18n.get('send_refused', addr, code, message)
+                self._ui.log(log_msg)
+
+                # 進捗更新（自動スロットリング中は現在の送信レートも表示）
+                progress = done / total
+                status = self.i18n.get('status_sending', done, total)
+                if self._rate_text:
+                    status += "  " + self.i18n.get('status_rate', self._rate_text)
+                # 一時停止後に送り切ったメールの結果でも一時停止中の表示を消さない
+                if self._controller.paused:
+                    status += "  " + self.i18n.get('status_paused')
+                self._ui.progress(progress, status)
+
+            def on_rate_change(rate, pause_seconds):
+                text = self.i18n.get('rate_per_minute', rate * 60) if rate else self.i18n.get('rate_unlimited')
+                self._rate_text = text
+                log_msg = self.i18n.get('rate_adjusted', text)
+                if pause_seconds:
+                    log_msg += "\n" + self.i18n.get('rate_paused', pause_seconds)
+                self._ui.log(log_msg)
+
+            # SMTP接続プールで送信
+            summary = sender.send_recipients(
+                recipients, subject_template, body_template,
+                cc=cc, bcc=bcc, reply_to=reply_to, attachments=attachments,
+                delay=delay, connections=self._get_connections(),
+                on_result=on_result, controller=self._controller,
+                engine=self.engine_var.get(),
+                rate_limits=self._advanced_options.get('rate_limits'),
+                adaptive_throttle=self._advanced_options.get('adaptive_throttle'),
+                on_rate_change=on_rate_change,
+                recycle_messages=self._advanced_options.get('recycle_messages') or 0,
+                recycle_minutes=self._advanced_options.get('recycle_minutes') or 0,
+                journal=journal,
+                retry=self._advanced_options.get('retry'),
+                profiles=profiles,
+                render_ahead=self._advanced_options.get('render_ahead', 16),
+                stream_attachments_mb=self._advanced_options.get('stream_attachments_mb', 10),
+                domain_limits=self._advanced_options.get('domain_limits')
+            )
 
-            server.quit()
+            if self._controller.cancelled:
+                self._ui.log(self.i18n.get('status_cancelled'))
 
             # 完了メッセージ
-            complete_msg = self.i18n.get('status_complete', success_count, fail_count)
-            self.after(0, lambda m=complete_msg: self._on_send_complete(m))
+            complete_msg = self.i18n.get('status_complete', summary.delivered, summary.failed_total)
+            if summary.retried or summary.failed_total:
+                detail = self.i18n.get('send_summary', summary.retried, summary.failed, summary.gave_up)
+                self._ui.log(detail)
+            self._ui.call(self._on_send_complete, complete_msg)
 
         except Exception as e:
             error_msg = self.i18n.get('error_send_failed', str(e))
-            self.after(0, lambda m=error_msg: self._on_send_error(m))
+            self._ui.call(self._on_send_error, error_msg)
+
+        finally:
+            journal.close()
+            self._ui.stop()
 
     def _update_progress(self, value: float, status: str):
         """進捗を更新"""
@@ -1135,7 +1542,9 @@ class EmailBulkSenderApp(ctk.CTk):
         """送信完了時の処理"""
         self._sending = False
         self.send_btn.configure(state="normal")
+        self.resume_btn.configure(state="normal")
         self.cancel_btn.configure(state="disabled")
+        self.pause_btn.configure(state="disabled", text=self.i18n.get('button_pause'))
         self.progress_bar.set(1)
         self.status_label.configure(text=message)
         self._log(message)
@@ -1144,15 +1553,32 @@ class EmailBulkSenderApp(ctk.CTk):
         """送信エラー時の処理"""
         self._sending = False
         self.send_btn.configure(state="normal")
+        self.resume_btn.configure(state="normal")
         self.cancel_btn.configure(state="disabled")
+        self.pause_btn.configure(state="disabled", text=self.i18n.get('button_pause'))
         self.status_label.configure(text=message)
         self._log(message)
         messagebox.showerror("Error", message)
 
+    def _toggle_pause(self):
+        """送信を一時停止・再開（送信中のメールは送り切る）"""
+        if self._controller.paused:
+            self._controller.resume()
+            self.pause_btn.configure(text=self.i18n.get('button_pause'))
+            self._log(self.i18n.get('status_unpaused'))
+        else:
+            self._controller.pause()
+            self.pause_btn.configure(text=self.i18n.get('button_unpause'))
+            self.status_label.configure(text=self.i18n.get('status_paused'))
+            self._log(self.i18n.get('status_paused'))
+
     def _cancel_sending(self):
-        """送信をキャンセル"""
-        self._cancel_requested = True
+        """送信をキャンセル（一時停止中でもすぐに中止し、送信中のメールは送り切る）"""
+        self._controller.cancel()
         self.cancel_btn.configure(state="disabled")
+        self.pause_btn.configure(state="disabled")
+        self.status_label.configure(text=self.i18n.get('status_cancelling'))
+        self._log(self.i18n.get('status_cancelling'))
 
     # ==================== 設定の保存/読み込み ====================
 
@@ -1168,6 +1594,17 @@ class EmailBulkSenderApp(ctk.CTk):
         except ValueError:
             delay = 5.0
 
+        # GUIに入力欄のない詳細設定は読み込んだ値をそのまま保存する
+        email_options = dict(self._advanced_options)
+        email_options.update({
+            "cc": self.cc_entry.get().strip(),
+            "bcc": self.bcc_entry.get().strip(),
+            "reply_to": self.reply_to_entry.get().strip(),
+            "send_delay": delay,
+            "connections": self._get_connections(),
+            "engine": self.engine_var.get(),
+        })
+
         config = {
             "version": self.config_manager.CONFIG_VERSION,
             "smtp": {
@@ -1183,14 +1620,11 @@ class EmailBulkSenderApp(ctk.CTk):
                 "template_file": self.template_entry.get().strip(),
                 "attachments": self._get_attachments() or [],
             },
-            "email_options": {
-                "cc": self.cc_entry.get().strip(),
-                "bcc": self.bcc_entry.get().strip(),
-                "reply_to": self.reply_to_entry.get().strip(),
-                "send_delay": delay,
-            },
+            "email_options": email_options,
+            "profiles": self._profiles_config,
             "ui": {
                 "language": self.i18n.get_language(),
+                "cache_recipients": self._file_cache.sidecar_dir is not None,
             },
         }
 
@@ -1239,16 +1673,29 @@ class EmailBulkSenderApp(ctk.CTk):
         if isinstance(attachments, list) and attachments:
             self._set_entry(self.attachments_entry, ', '.join(attachments))
 
+        self._profiles_config = config.get('profiles') or []
+
         # オプション設定
         options = config.get('email_options', {})
+        self._advanced_options = {
+            key: value for key, value in options.items()
+            if key not in ('cc', 'bcc', 'reply_to', 'send_delay', 'connections', 'engine')
+        }
         self._set_entry(self.cc_entry, options.get('cc', ''))
         self._set_entry(self.bcc_entry, options.get('bcc', ''))
         self._set_entry(self.reply_to_entry, options.get('reply_to', ''))
         delay = options.get('send_delay', 5)
         self._set_entry(self.delay_entry, str(delay) if delay else '5')
+        connections = options.get('connections', 1)
+        self._set_entry(self.connections_entry, str(connections) if connections else '1')
+        engine = options.get('engine', 'thread')
+        self.engine_var.set(engine if engine in ('thread', 'async') else 'thread')
 
-        # 言語設定（次回の _change_language で反映）
         ui = config.get('ui', {})
+        # 読み込んだ受信者リストを次回の起動用にディスクにも保存する（既定はメモリ上のみ）
+        self._file_cache.sidecar_dir = self.config_manager.config_dir / "cache" if ui.get('cache_recipients') else None
+
+        # 言語設定（次回の _change_language で反映）
         lang = ui.get('language', '')
         if lang in ['ja', 'en']:
             current_lang = self.i18n.get_language()
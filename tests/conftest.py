@@ -0,0 +1,216 @@
+"""テスト共通のフィクスチャ（ローカルで動く偽のSMTPサーバーと、TLSを使わない送信クラス）"""
+import os
+import socketserver
+import sys
+import threading
+import smtplib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_bulk_sender import AsyncSmtpClient, EmailBulkSender  # noqa: E402
+
+
+class FakeSmtpServer:
+    """
+    テスト用の最小限のSMTPサーバー（別スレッドで動作）
+
+    宛先アドレスに次の文字列を含む場合は RCPT に対して決まった応答を返す:
+        perm: 550（恒久的なエラー）
+        tempfail: 451（一時的なエラー）
+        once: 最初の1回だけ 451
+        throttle: 450
+        closing: 最初の1回だけ 421 を返して接続を閉じる
+    受け取ったメッセージは messages に (MAIL FROM, 宛先のリスト, 本体) として記録する。
+    """
+
+    def __init__(self, pipelining: bool = True):
+        self.pipelining = pipelining
+        self.messages = []
+        self.sessions = 0
+        self.commands = []
+        # 本体を受け取った後、応答を返さずに切断する回数（届いたかどうか分からない状況の再現）
+        self.drop_after_data = 0
+        self._tempfailed = set()
+        self._lock = threading.Lock()
+
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                fake._handle(self.rfile, self.wfile)
+
+        class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        self.host, self.port = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def recipients(self) -> list:
+        """受け取ったメッセージの宛先を全て返す"""
+        return [addr for _, rcpts, _ in self.messages for addr in rcpts]
+
+    def _rcpt_reply(self, addr: str) -> str:
+        if 'perm' in addr:
+            return '550 no such user'
+        if 'tempfail' in addr:
+            return '451 try later'
+        if 'once' in addr:
+            with self._lock:
+                if addr not in self._tempfailed:
+                    self._tempfailed.add(addr)
+                    return '451 try later once'
+        if 'closing' in addr:
+            with self._lock:
+                if addr not in self._tempfailed:
+                    self._tempfailed.add(addr)
+                    return '421 too many messages, closing connection'
+        if 'throttle' in addr:
+            return '450 too many messages'
+        return '250 ok'
+
+    def _handle(self, rfile, wfile):
+        def send(line):
+            wfile.write((line + '\r\n').encode('ascii'))
+            wfile.flush()
+
+        with self._lock:
+            self.sessions += 1
+        send('220 fake ESMTP')
+        mail_from = None
+        rcpts = []
+        while True:
+            raw = rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            command = line[:4].upper()
+            with self._lock:
+                self.commands.append(command)
+            if command in ('EHLO', 'HELO'):
+                features = ['fake', '8BITMIME', 'AUTH PLAIN LOGIN']
+                if self.pipelining:
+                    features.append('PIPELINING')
+                for feature in features[:-1]:
+                    wfile.write(('250-' + feature + '\r\n').encode('ascii'))
+                send('250 ' + features[-1])
+            elif command == 'AUTH':
+                send('235 ok')
+            elif command == 'MAIL':
+                mail_from = line.split(':', 1)[1].strip().strip('<>')
+                rcpts = []
+                send('250 ok')
+            elif command == 'RCPT':
+                addr = line.split(':', 1)[1].strip().strip('<>')
+                reply = self._rcpt_reply(addr)
+                if reply.startswith('250'):
+                    rcpts.append(addr)
+                send(reply)
+                if reply.startswith('421'):
+                    return
+            elif command == 'DATA':
+                if not rcpts:
+                    send('554 no valid recipients')
+                    continue
+                send('354 go ahead')
+                data = []
+                while True:
+                    chunk = rfile.readline()
+                    if chunk in (b'.\r\n', b''):
+                        break
+                    if chunk.startswith(b'..'):
+                        chunk = chunk[1:]
+                    data.append(chunk)
+                with self._lock:
+                    if self.drop_after_data:
+                        self.drop_after_data -= 1
+                        drop = True
+                    else:
+                        drop = False
+                    self.messages.append((mail_from, rcpts, b''.join(data)))
+                if drop:
+                    return
+                send('250 queued')
+            elif command == 'RSET':
+                rcpts = []
+                send('250 ok')
+            elif command == 'QUIT':
+                send('221 bye')
+                return
+            else:
+                send('500 unknown command')
+
+
+class PlainAsyncSmtpClient(AsyncSmtpClient):
+    """STARTTLSを行わない AsyncSmtpClient（テスト用サーバーはTLSに対応しない）"""
+
+    async def starttls(self):
+        pass
+
+
+class PlainSender(EmailBulkSender):
+    """STARTTLSを行わずに偽のSMTPサーバーへ接続する EmailBulkSender"""
+
+    def connect_smtp(self):
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, local_hostname='localhost')
+        server.login(self.email_address, self.email_password)
+        return server
+
+    async def connect_smtp_async(self):
+        client = PlainAsyncSmtpClient(self.smtp_server, self.smtp_port)
+        try:
+            await client.connect()
+            await client.login(self.email_address, self.email_password)
+        except Exception:
+            client.close()
+            raise
+        return client
+
+
+@pytest.fixture
+def smtp_server():
+    """PIPELINING に対応した偽のSMTPサーバー"""
+    server = FakeSmtpServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def plain_smtp_server():
+    """PIPELINING に対応しない偽のSMTPサーバー"""
+    server = FakeSmtpServer(pipelining=False).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_sender():
+    """偽のSMTPサーバーに接続する送信クラスを作成する関数"""
+    def make(server, email_address='sender@example.com', display_name=''):
+        return PlainSender(email_address, 'password', server.host, server.port, display_name)
+    return make
+
+
+def make_recipients(count: int, domain: str = 'example.com') -> list:
+    """テスト用の受信者リスト"""
+    return [{'affiliation': f'Company {i}', 'name': f'Name {i}', 'email': f'user{i}@{domain}'}
+            for i in range(1, count + 1)]
+
+
+def render_simple(sender_address: str = 'sender@example.com'):
+    """受信者ごとに短いメッセージを作成する render 関数"""
+    def render(recipient):
+        data = f"Subject: test\r\nTo: {recipient['email']}\r\n\r\nHello {recipient['name']}\r\n".encode('utf-8')
+        return sender_address, [recipient['email']], data
+    return render
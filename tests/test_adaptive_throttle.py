@@ -0,0 +1,96 @@
+"""AdaptiveThrottle（制限応答によるAIMD制御）のテスト"""
+import smtplib
+
+import pytest
+
+import email_bulk_sender
+from email_bulk_sender import AdaptiveThrottle, RateLimiter, SendResult
+
+RECIPIENT = {'affiliation': '', 'name': '', 'email': 'to@example.com'}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(email_bulk_sender.time, 'monotonic', clock)
+    return clock
+
+
+def refused(code):
+    return SendResult(1, RECIPIENT, smtplib.SMTPRecipientsRefused({'to@example.com': (code, b'slow down')}))
+
+
+def test_throttle_reply_halves_the_rate(clock):
+    changes = []
+    limiter = RateLimiter.from_config({'per_second': 10})
+    throttle = AdaptiveThrottle(limiter, on_change=lambda rate, pause: changes.append((rate, pause)))
+
+    throttle.record(refused(450))
+
+    assert limiter.effective_rate() == pytest.approx(5.0)
+    assert changes == [(pytest.approx(5.0), 0)]
+    assert limiter.paused_until == 0
+
+
+def test_421_also_pauses_sending(clock):
+    limiter = RateLimiter.from_config({'per_second': 10})
+    throttle = AdaptiveThrottle(limiter, pause=30)
+
+    throttle.record(SendResult(1, RECIPIENT, smtplib.SMTPResponseException(421, b'closing')))
+
+    assert limiter.paused_until == pytest.approx(clock.now + 30)
+
+
+def test_replies_in_quick_succession_decrease_once(clock):
+    limiter = RateLimiter.from_config({'per_second': 8})
+    throttle = AdaptiveThrottle(limiter)
+
+    throttle.record(refused(451))
+    throttle.record(refused(451))
+    assert limiter.effective_rate() == pytest.approx(4.0)
+
+    clock.now += 3
+    throttle.record(refused(451))
+    assert limiter.effective_rate() == pytest.approx(2.0)
+
+
+def test_successes_restore_the_configured_rate(clock):
+    limiter = RateLimiter.from_config({'per_second': 10})
+    throttle = AdaptiveThrottle(limiter, increase=0.1)
+    throttle.record(refused(450))
+
+    for _ in range(4):
+        throttle.record(SendResult(1, RECIPIENT))
+    assert limiter.effective_rate() == pytest.approx(9.0)
+
+    throttle.record(SendResult(1, RECIPIENT))
+    assert limiter.adaptive is None
+    assert limiter.effective_rate() == pytest.approx(10.0)
+
+
+def test_permanent_errors_do_not_throttle(clock):
+    limiter = RateLimiter.from_config({'per_second': 10})
+    AdaptiveThrottle(limiter).record(refused(550))
+    assert limiter.adaptive is None
+
+
+def test_refused_cc_with_throttle_code_counts(clock):
+    limiter = RateLimiter.from_config({'per_second': 10})
+    result = SendResult(1, RECIPIENT, refused={'cc@example.com': (450, b'slow down')})
+    AdaptiveThrottle(limiter).record(result)
+    assert limiter.effective_rate() == pytest.approx(5.0)
+
+
+def test_from_config_can_disable_throttling():
+    limiter = RateLimiter()
+    assert AdaptiveThrottle.from_config({'enabled': False}, limiter) is None
+    throttle = AdaptiveThrottle.from_config({'decrease': 0.25}, limiter)
+    assert throttle.decrease == 0.25
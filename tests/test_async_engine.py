@@ -0,0 +1,92 @@
+"""AsyncSendEngine と AsyncSmtpClient（asyncio送信エンジン）のテスト"""
+import asyncio
+import smtplib
+import threading
+
+import pytest
+
+from conftest import PlainAsyncSmtpClient, make_recipients, render_simple
+from email_bulk_sender import AsyncSendEngine, RetryPolicy
+
+
+@pytest.mark.parametrize('server_fixture', ['smtp_server', 'plain_smtp_server'])
+def test_async_engine_delivers_every_recipient_once(request, server_fixture, make_sender):
+    server = request.getfixturevalue(server_fixture)
+    recipients = make_recipients(25)
+    engine = AsyncSendEngine(make_sender(server), connections=4)
+
+    summary = engine.run(recipients, render_simple())
+
+    assert summary.delivered == 25
+    assert sorted(server.recipients()) == sorted(r['email'] for r in recipients)
+    assert server.sessions == 4
+
+
+def test_async_engine_runs_blocking_work_off_the_event_loop(smtp_server, make_sender):
+    loop_threads = set()
+    work_threads = set()
+
+    def render(recipient):
+        work_threads.add(threading.get_ident())
+        return render_simple()(recipient)
+
+    def before_send(item):
+        work_threads.add(threading.get_ident())
+        return True
+
+    engine = AsyncSendEngine(make_sender(smtp_server), connections=2)
+    engine.before_send = before_send
+    engine.on_result = lambda result, done, total: loop_threads.add(threading.get_ident())
+    engine.run(make_recipients(5), render)
+
+    assert work_threads
+    assert not work_threads & loop_threads
+
+
+def test_async_engine_retries_transient_refusal(smtp_server, make_sender):
+    recipients = make_recipients(2) + [{'affiliation': '', 'name': 'x', 'email': 'once@example.com'}]
+    engine = AsyncSendEngine(make_sender(smtp_server), connections=1,
+                             retry_policy=RetryPolicy(max_retries=2, base_delay=0.01, jitter=0))
+
+    summary = engine.run(recipients, render_simple())
+
+    assert summary.delivered == 3
+    assert summary.retried == 1
+    assert smtp_server.recipients().count('once@example.com') == 1
+
+
+@pytest.mark.parametrize('server_fixture', ['smtp_server', 'plain_smtp_server'])
+def test_async_client_reports_refused_cc(request, server_fixture):
+    server = request.getfixturevalue(server_fixture)
+
+    async def send():
+        client = PlainAsyncSmtpClient(server.host, server.port)
+        await client.connect()
+        await client.login('sender@example.com', 'password')
+        try:
+            return await client.sendmail('sender@example.com', ['to@example.com', 'perm@example.com'],
+                                         b'Subject: x\r\n\r\n.leading dot\r\n')
+        finally:
+            await client.quit()
+
+    refused = asyncio.run(send())
+
+    assert list(refused) == ['perm@example.com']
+    assert refused['perm@example.com'][0] == 550
+    (_, rcpts, data), = server.messages
+    assert rcpts == ['to@example.com']
+    assert data.endswith(b'.leading dot\r\n')
+
+
+def test_async_client_raises_when_every_recipient_is_refused(smtp_server):
+    async def send():
+        client = PlainAsyncSmtpClient(smtp_server.host, smtp_server.port)
+        await client.connect()
+        try:
+            await client.sendmail('sender@example.com', ['perm@example.com'], b'Subject: x\r\n\r\nbody\r\n')
+        finally:
+            await client.quit()
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        asyncio.run(send())
+    assert smtp_server.messages == []
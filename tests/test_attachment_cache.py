@@ -0,0 +1,79 @@
+"""AttachmentCache（添付ファイルのエンコード結果の再利用）のテスト"""
+import base64
+import email
+import os
+
+from email_bulk_sender import AttachmentCache, CachedAttachment, EmailBulkSender, _flatten_message
+
+
+def make_sender():
+    return EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+
+
+def test_same_file_returns_the_same_part(tmp_path):
+    path = tmp_path / 'report.pdf'
+    path.write_bytes(b'%PDF-1.4 ' * 100)
+    cache = AttachmentCache()
+
+    part = cache.get(str(path))
+
+    assert isinstance(part, CachedAttachment)
+    assert part.get_content_type() == 'application/pdf'
+    assert part.get_payload(decode=True) == path.read_bytes()
+    assert cache.get(str(path)) is part
+
+
+def test_modified_file_is_encoded_again(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes(b'first')
+    cache = AttachmentCache()
+    first = cache.get(str(path))
+
+    path.write_bytes(b'second version')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    second = cache.get(str(path))
+    assert second is not first
+    assert second.get_payload(decode=True) == b'second version'
+
+
+def test_missing_file_returns_none(tmp_path):
+    assert AttachmentCache().get(str(tmp_path / 'missing.pdf')) is None
+
+
+def test_serialized_attachment_is_shared_between_messages(tmp_path):
+    path = tmp_path / '資料.bin'
+    content = os.urandom(5000)
+    path.write_bytes(content)
+    sender = make_sender()
+
+    messages = [
+        _flatten_message(sender.create_message(f'user{i}@example.com', f'Name {i}', '', 'Subject', 'Body',
+                                               attachments=[str(path)]))[2]
+        for i in range(2)
+    ]
+
+    part = sender.attachment_cache.get(str(path))
+    assert list(part.serialized) == ['\r\n']
+    assert all(part.serialized['\r\n'] in data for data in messages)
+
+    attachment = [p for p in email.message_from_bytes(messages[1]).walk() if p.get_filename()][0]
+    assert str(email.header.make_header(email.header.decode_header(attachment.get_filename()))) == '資料.bin'
+    assert attachment.get_payload(decode=True) == content
+    assert base64.b64decode(attachment.get_payload()) == content
+
+
+def test_prepare_encodes_attachments_up_front(tmp_path, monkeypatch):
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'hello')
+    built = []
+    build = AttachmentCache._build
+    monkeypatch.setattr(AttachmentCache, '_build', staticmethod(lambda *args: built.append(args) or build(*args)))
+    cache = AttachmentCache()
+
+    cache.prepare([str(path), str(tmp_path / 'missing.txt')])
+    assert len(built) == 1
+    for _ in range(3):
+        cache.get(str(path))
+    assert len(built) == 1
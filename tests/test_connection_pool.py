@@ -0,0 +1,61 @@
+"""SmtpConnectionPool（並列送信）のテスト"""
+import socket
+
+import pytest
+
+from conftest import make_recipients, render_simple
+from email_bulk_sender import SmtpConnectionPool
+
+
+def test_pool_delivers_every_recipient_once(smtp_server, make_sender):
+    recipients = make_recipients(30)
+    results = []
+    pool = SmtpConnectionPool(make_sender(smtp_server), connections=4,
+                              on_result=lambda result, done, total: results.append((result.index, done, total)))
+
+    summary = pool.run(recipients, render_simple())
+
+    assert summary.delivered == 30
+    assert summary.failed_total == 0
+    assert sorted(smtp_server.recipients()) == sorted(r['email'] for r in recipients)
+    assert sorted(index for index, _, _ in results) == list(range(1, 31))
+    assert [done for _, done, _ in results] == list(range(1, 31))
+    assert {total for _, _, total in results} == {30}
+
+
+def test_pool_opens_at_most_one_session_per_connection(smtp_server, make_sender):
+    pool = SmtpConnectionPool(make_sender(smtp_server), connections=3)
+    pool.run(make_recipients(12), render_simple())
+    assert smtp_server.sessions == 3
+
+
+def test_pool_does_not_open_more_connections_than_recipients(smtp_server, make_sender):
+    pool = SmtpConnectionPool(make_sender(smtp_server), connections=8)
+    pool.run(make_recipients(2), render_simple())
+    assert smtp_server.sessions == 2
+
+
+def test_pool_reports_permanent_refusal_as_failure(smtp_server, make_sender):
+    recipients = make_recipients(3) + [{'affiliation': '', 'name': 'x', 'email': 'perm@example.com'}]
+    failed = []
+    pool = SmtpConnectionPool(make_sender(smtp_server), connections=2,
+                              on_result=lambda result, done, total: failed.append(result) if not result.success else None)
+
+    summary = pool.run(recipients, render_simple())
+
+    assert summary.delivered == 3
+    assert summary.failed == 1
+    assert [result.recipient['email'] for result in failed] == ['perm@example.com']
+
+
+def test_pool_raises_connect_error_when_no_connection_can_be_opened(make_sender, smtp_server):
+    # 使われていないポートを探して接続できないサーバーとする
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    smtp_server.port = port
+    pool = SmtpConnectionPool(make_sender(smtp_server), connections=2)
+
+    with pytest.raises(OSError):
+        pool.run(make_recipients(3), render_simple())
+    assert len(pool.connect_errors) == 2
@@ -0,0 +1,90 @@
+"""CsvRecipients（CSVの逐次読み込みと文字コードの検出）のテスト"""
+import pytest
+
+from email_bulk_sender import CsvRecipients
+
+HEADER = '所属,氏名,メールアドレス,会員番号\n'
+ROWS = [
+    '株式会社ABC,山田太郎,yamada@example.com,A-001\n',
+    '株式会社DEF,佐藤花子,sato@example.com,A-002\n',
+    '有限会社GHI,鈴木一郎,suzuki@example.com,A-003\n',
+]
+
+
+def write_csv(tmp_path, text, encoding='utf-8', name='list.csv'):
+    path = tmp_path / name
+    path.write_bytes(text.encode(encoding))
+    return str(path)
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'utf-8-sig', 'shift_jis'])
+def test_encoding_is_detected(tmp_path, encoding):
+    path = write_csv(tmp_path, HEADER + ''.join(ROWS) * 5, encoding)
+
+    recipients = list(CsvRecipients(path))
+
+    assert len(recipients) == 15
+    assert recipients[0] == {'affiliation': '株式会社ABC', 'name': '山田太郎', 'email': 'yamada@example.com',
+                             '会員番号': 'A-001'}
+
+
+def test_only_the_head_of_the_file_is_sampled(tmp_path, monkeypatch):
+    monkeypatch.setattr(CsvRecipients, 'SAMPLE_SIZE', 1)
+    monkeypatch.setattr(CsvRecipients, '_BLOCK_SIZE', 1024)
+    ascii_rows = ''.join(f'Company {i},Name {i},user{i}@example.com,B-{i}\n' for i in range(200))
+    path = write_csv(tmp_path, HEADER.replace('所属,氏名,メールアドレス,会員番号', 'affiliation,name,email,code')
+                     + ascii_rows + ROWS[0])
+
+    recipients = CsvRecipients(path)
+
+    # 先頭がASCIIだけでも後半の日本語を読めるよう UTF-8 として扱う
+    assert recipients.encoding == 'utf-8'
+    assert list(recipients)[-1]['name'] == '山田太郎'
+
+
+def test_explicit_encoding_skips_detection(tmp_path, monkeypatch):
+    path = write_csv(tmp_path, HEADER + ROWS[0], 'cp932')
+    monkeypatch.setattr(CsvRecipients, 'detect_encoding', classmethod(lambda cls, path: pytest.fail('detected')))
+    assert list(CsvRecipients(path, encoding='cp932'))[0]['name'] == '山田太郎'
+
+
+def test_blank_lines_are_skipped_and_short_rows_padded(tmp_path):
+    path = write_csv(tmp_path, HEADER + ROWS[0] + '株式会社XYZ,空欄,,A-009\n' + ',,  \n' + '\n'
+                     + ' 株式会社JKL , 高橋 ,takahashi@example.com\n')
+
+    recipients = list(CsvRecipients(path))
+
+    # メールアドレスが空の行も受信者として返す（送信時に失敗として報告される）
+    assert [r['email'] for r in recipients] == ['yamada@example.com', '', '', 'takahashi@example.com']
+    assert recipients[3] == {'affiliation': '株式会社JKL', 'name': '高橋', 'email': 'takahashi@example.com',
+                             '会員番号': ''}
+
+
+def test_row_range_uses_sheet_row_numbers(tmp_path):
+    path = write_csv(tmp_path, HEADER + ''.join(ROWS))
+
+    assert [r['name'] for r in CsvRecipients(path, first_row=3)] == ['佐藤花子', '鈴木一郎']
+    assert [r['name'] for r in CsvRecipients(path, last_row=3)] == ['山田太郎', '佐藤花子']
+    assert [r['name'] for r in CsvRecipients(path, first_row=1, last_row=2)] == ['山田太郎']
+    assert list(CsvRecipients(path, first_row=4, last_row=3)) == []
+
+
+def test_iterating_again_reads_from_the_start(tmp_path):
+    recipients = CsvRecipients(write_csv(tmp_path, HEADER + ''.join(ROWS)))
+    assert list(recipients) == list(recipients)
+    assert len(list(recipients)) == 3
+
+
+def test_english_header_and_quoted_fields(tmp_path):
+    path = write_csv(tmp_path, 'email,name,affiliation\n"a@example.com","Smith, John","ACME, Inc."\n')
+    assert list(CsvRecipients(path)) == [{'email': 'a@example.com', 'name': 'Smith, John',
+                                          'affiliation': 'ACME, Inc.'}]
+
+
+def test_missing_required_column_raises_key_error(tmp_path):
+    with pytest.raises(KeyError):
+        CsvRecipients(write_csv(tmp_path, '所属,氏名\n株式会社ABC,山田太郎\n'))
+
+
+def test_empty_file_has_no_recipients(tmp_path):
+    assert list(CsvRecipients(write_csv(tmp_path, ''), encoding='utf-8')) == []
@@ -0,0 +1,130 @@
+"""DomainScheduler（受信者ドメインごとの並べ替えと送信上限）のテスト"""
+import pytest
+
+import email_bulk_sender
+from conftest import PlainSender, render_simple
+from email_bulk_sender import DomainScheduler, SendItem, SendQueue, SmtpConnectionPool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(email_bulk_sender.time, 'monotonic', clock)
+    return clock
+
+
+def recipient(email):
+    return {'affiliation': '', 'name': email.partition('@')[0], 'email': email}
+
+
+def grouped_recipients():
+    """会社ごとにまとまった受信者リスト"""
+    return ([recipient(f'a{i}@alpha.test') for i in range(3)] + [recipient(f'b{i}@beta.test') for i in range(2)]
+            + [recipient('c0@gamma.test')])
+
+
+def emails(recipients):
+    return [r['email'] for r in recipients]
+
+
+def test_group_of_matches_configured_parent_domains():
+    scheduler = DomainScheduler({'Example.com': {'concurrency': 1}, '*': {'concurrency': 2}})
+
+    assert scheduler.group_of('a@example.com') == 'example.com'
+    assert scheduler.group_of('b@mail.EXAMPLE.com.') == 'example.com'
+    assert scheduler.group_of('c@badexample.com') == 'badexample.com'
+    assert scheduler.group_of('d@other.test') == 'other.test'
+
+
+def test_interleave_takes_one_recipient_per_domain_in_turn():
+    scheduler = DomainScheduler()
+    assert emails(scheduler.interleave(grouped_recipients())) == [
+        'a0@alpha.test', 'b0@beta.test', 'c0@gamma.test', 'a1@alpha.test', 'b1@beta.test', 'a2@alpha.test']
+
+
+def test_interleave_only_reorders_within_the_window():
+    scheduler = DomainScheduler(window=2)
+    assert emails(scheduler.interleave(grouped_recipients())) == [
+        'a0@alpha.test', 'a1@alpha.test', 'a2@alpha.test', 'b0@beta.test', 'b1@beta.test', 'c0@gamma.test']
+
+
+def test_concurrency_limit_is_per_domain(clock):
+    scheduler = DomainScheduler({'alpha.test': {'concurrency': 1}})
+    first, second = recipient('a0@alpha.test'), recipient('a1@alpha.test')
+
+    assert scheduler.acquire(first) == 0
+    assert scheduler.acquire(second) == DomainScheduler.BUSY_WAIT
+    # 上限のないドメインは影響を受けない
+    assert scheduler.acquire(recipient('b0@beta.test')) == 0
+
+    scheduler.release(first)
+    assert scheduler.acquire(second) == 0
+
+
+def test_default_rate_applies_to_each_domain_separately(clock):
+    scheduler = DomainScheduler({'*': {'per_minute': 2}})
+
+    assert scheduler.acquire(recipient('a0@alpha.test')) == 0
+    assert scheduler.acquire(recipient('a1@alpha.test')) == pytest.approx(30)
+    assert scheduler.acquire(recipient('b0@beta.test')) == 0
+
+    clock.now += 30
+    assert scheduler.acquire(recipient('a1@alpha.test')) == 0
+
+
+def test_send_queue_holds_limited_domain_and_sends_others(clock):
+    scheduler = DomainScheduler({'alpha.test': {'per_minute': 1}})
+    recipients = [recipient('a0@alpha.test'), recipient('a1@alpha.test'), recipient('b0@beta.test')]
+    send_queue = SendQueue((SendItem(i, r) for i, r in enumerate(recipients, 1)), scheduler=scheduler)
+
+    taken = [send_queue.next_item()[0].index for _ in range(2)]
+    assert taken == [1, 3]
+    assert send_queue.next_item() == (None, pytest.approx(60))
+
+    clock.now += 60
+    item, wait = send_queue.next_item()
+    assert (item.index, wait) == (2, 0)
+
+
+def test_describe_and_from_config():
+    assert DomainScheduler.from_config({}) is None
+    scheduler = DomainScheduler.from_config({'gmail.com': {'concurrency': 2, 'per_minute': 60}, '*': {}})
+    assert scheduler.describe() == 'gmail.com: concurrency 2, 60/per_minute; *: interleave only'
+
+
+@pytest.mark.parametrize('limits', [{'gmail.com': 5}, {'gmail.com': {'concurrency': 'many'}},
+                                    {'gmail.com': {'per_minute': 'fast'}}])
+def test_invalid_config_is_rejected(limits):
+    with pytest.raises(ValueError):
+        DomainScheduler(limits)
+
+
+def test_pool_delivers_every_recipient_in_interleaved_order(smtp_server, make_sender):
+    scheduler = DomainScheduler({'alpha.test': {'concurrency': 1}})
+    pool = SmtpConnectionPool(make_sender(smtp_server), scheduler=scheduler)
+
+    summary = pool.run(scheduler.interleave(grouped_recipients()), render_simple(), total=6)
+
+    assert summary.delivered == 6
+    assert smtp_server.recipients() == emails(DomainScheduler().interleave(grouped_recipients()))
+
+
+def test_send_recipients_needs_total_for_unsized_recipients(smtp_server):
+    sender = PlainSender('sender@example.com', 'password', smtp_server.host, smtp_server.port)
+    limits = {'*': {'concurrency': 1}}
+
+    with pytest.raises(TypeError):
+        sender.send_recipients(iter(grouped_recipients()), '{氏名}様', '本文\n', delay=0, domain_limits=limits)
+
+    summary = sender.send_recipients(iter(grouped_recipients()), '{氏名}様', '本文\n', delay=0, connections=2,
+                                     domain_limits=limits, total=6)
+    assert summary.delivered == 6
+    assert sorted(smtp_server.recipients()) == sorted(emails(grouped_recipients()))
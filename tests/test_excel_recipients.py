@@ -0,0 +1,89 @@
+"""ExcelRecipients（Excelの受信者の逐次読み込み）のテスト"""
+import os
+
+import pytest
+
+import email_bulk_sender
+from email_bulk_sender import EmailBulkSender, ExcelRecipients, I18n
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / 'list.xlsx'
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = '名簿'
+    sheet.append(['所属', '氏名', 'メールアドレス', '会員番号'])
+    sheet.append(['株式会社ABC', '山田太郎', 'yamada@example.com', 1001])
+    sheet.append(['株式会社DEF', None, 'sato@example.com', None])
+    sheet.append(['株式会社XYZ', '空欄', None, 1003])
+    sheet.append([' 有限会社GHI ', '鈴木一郎', 'suzuki@example.com'])
+    other = book.create_sheet('English')
+    other.append(['email', 'name', 'affiliation'])
+    other.append(['a@example.com', 'John', 'ACME'])
+    broken = book.create_sheet('Broken')
+    broken.append(['氏名', 'メールアドレス'])
+    book.save(path)
+    return str(path)
+
+
+def names(recipients):
+    return [r['name'] for r in recipients]
+
+
+def test_rows_are_read_with_every_column(workbook):
+    recipients = ExcelRecipients(workbook)
+    try:
+        assert list(recipients) == [
+            {'affiliation': '株式会社ABC', 'name': '山田太郎', 'email': 'yamada@example.com', '会員番号': '1001'},
+            {'affiliation': '株式会社DEF', 'name': '', 'email': 'sato@example.com', '会員番号': ''},
+            {'affiliation': '有限会社GHI', 'name': '鈴木一郎', 'email': 'suzuki@example.com', '会員番号': ''},
+        ]
+        # 繰り返し反復するとシートを先頭から読み直す
+        assert len(list(recipients)) == 3
+    finally:
+        recipients.close()
+
+
+def test_sheet_can_be_selected(workbook):
+    recipients = ExcelRecipients(workbook, sheet='English')
+    try:
+        assert list(recipients) == [{'email': 'a@example.com', 'name': 'John', 'affiliation': 'ACME'}]
+    finally:
+        recipients.close()
+    with pytest.raises(KeyError):
+        ExcelRecipients(workbook, sheet='Missing')
+
+
+def test_row_range_uses_sheet_row_numbers(workbook):
+    for first_row, last_row, expected in [(3, None, ['', '鈴木一郎']), (None, 2, ['山田太郎']),
+                                          (4, 5, ['鈴木一郎']), (5, 4, [])]:
+        recipients = ExcelRecipients(workbook, first_row=first_row, last_row=last_row)
+        try:
+            assert names(recipients) == expected
+        finally:
+            recipients.close()
+
+
+@pytest.mark.parametrize('lang, message', [('ja', 'Excelファイルに必要な列がありません'),
+                                           ('en', 'Required columns not found in Excel file')])
+def test_missing_columns_error_is_translated(workbook, lang, message):
+    with pytest.raises(ValueError, match=message):
+        ExcelRecipients(workbook, sheet='Broken', i18n=I18n(lang))
+
+
+def test_missing_openpyxl_is_reported(workbook, monkeypatch):
+    monkeypatch.setattr(email_bulk_sender, 'EXCEL_SUPPORT', False)
+    sender = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+    with pytest.raises(ImportError, match='openpyxl が必要です'):
+        sender.iter_recipients(workbook, I18n('ja'))
+
+
+def test_read_recipients_from_sample_workbook():
+    sample = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples', 'list_sample.xlsx')
+    sender = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+    recipients = sender.read_recipients(sample)
+    assert len(recipients) > 0
+    assert all(r['email'] for r in recipients)
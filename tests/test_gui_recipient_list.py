@@ -0,0 +1,138 @@
+"""RecipientListDialog（表示行だけを作る受信者一覧と分割検索）のテスト（画面は作らない）"""
+import pytest
+
+pytest.importorskip('customtkinter')
+
+from conftest import make_recipients  # noqa: E402
+from email_bulk_sender import RecipientStore  # noqa: E402
+from email_bulk_sender_gui import GuiI18n, RecipientListDialog  # noqa: E402
+
+
+class FakeTree:
+    def __init__(self):
+        self.values = {}
+
+    def item(self, item_id, values=()):
+        self.values[item_id] = values
+
+    def selection(self):
+        return ()
+
+    def selection_remove(self, items):
+        pass
+
+
+class FakeScrollbar:
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+class FakeLabel:
+    def configure(self, text):
+        self.text = text
+
+
+class FakeEntry:
+    def __init__(self, text=''):
+        self.text = text
+
+    def get(self):
+        return self.text
+
+
+def make_dialog(recipients, visible_rows=5):
+    """ウィンドウを作らずに、表示と検索の処理だけを動かす RecipientListDialog"""
+    dialog = RecipientListDialog.__new__(RecipientListDialog)
+    dialog.i18n = GuiI18n('en')
+    dialog.recipients = recipients
+    dialog._matches = range(len(recipients))
+    dialog._offset = 0
+    dialog._item_ids = [f'I{i}' for i in range(visible_rows)]
+    dialog._search_job = None
+    dialog._search_text = ''
+    dialog.tree = FakeTree()
+    dialog.scrollbar = FakeScrollbar()
+    dialog.count_label = FakeLabel()
+    dialog.search_entry = FakeEntry()
+    dialog.scheduled = []
+    dialog.after = lambda ms, func, *args: dialog.scheduled.append((func, args)) or 'job'
+    dialog.after_cancel = lambda job: None
+    return dialog
+
+
+def run_scheduled(dialog):
+    while dialog.scheduled:
+        func, args = dialog.scheduled.pop(0)
+        func(*args)
+
+
+@pytest.fixture(params=['store', 'list'])
+def recipients(request):
+    recipients = make_recipients(100)
+    return RecipientStore.from_recipients(recipients) if request.param == 'store' else recipients
+
+
+def test_only_visible_rows_are_written(recipients):
+    dialog = make_dialog(recipients)
+
+    dialog._scroll_to(40)
+
+    assert dialog.tree.values['I0'] == (41, 'Company 41', 'Name 41', 'user41@example.com')
+    assert dialog.tree.values['I4'][0] == 45
+    assert len(dialog.tree.values) == 5
+    assert dialog.scrollbar.position == (0.4, 0.45)
+
+
+def test_scrolling_is_clamped(recipients):
+    dialog = make_dialog(recipients)
+    dialog._scroll_to(1000)
+    assert dialog._offset == 95
+    dialog._scroll_by(-1000)
+    assert dialog._offset == 0
+    dialog._on_scrollbar('moveto', '0.5')
+    assert dialog._offset == 50
+    dialog._on_scrollbar('scroll', '1', 'pages')
+    assert dialog._offset == 55
+
+
+def test_search_runs_in_chunks(recipients, monkeypatch):
+    monkeypatch.setattr(RecipientListDialog, 'SEARCH_CHUNK', 30)
+    dialog = make_dialog(recipients)
+    dialog.search_entry.text = 'user1'
+
+    dialog._start_search()
+    # 最初の区切りだけを検索し、続きはメインループの合間に行う
+    assert list(dialog._matches) == [0] + list(range(9, 19))
+    assert dialog.count_label.text == 'Searching... 11 of 100'
+
+    run_scheduled(dialog)
+    assert list(dialog._matches) == [0] + list(range(9, 19)) + [99]
+    assert dialog.count_label.text == 'Matches: 12 of 100'
+    assert dialog.tree.values['I0'][3] == 'user1@example.com'
+
+
+def test_new_search_text_cancels_the_running_search(recipients, monkeypatch):
+    monkeypatch.setattr(RecipientListDialog, 'SEARCH_CHUNK', 30)
+    dialog = make_dialog(recipients)
+    dialog.search_entry.text = 'user1'
+    dialog._start_search()
+
+    dialog.search_entry.text = 'user5'
+    dialog._start_search()
+    run_scheduled(dialog)
+
+    assert [recipients[i]['email'] for i in dialog._matches] == \
+        ['user5@example.com'] + [f'user{i}@example.com' for i in range(50, 60)]
+
+
+def test_clearing_the_search_shows_every_recipient(recipients):
+    dialog = make_dialog(recipients)
+    dialog.search_entry.text = 'name 7'
+    dialog._start_search()
+    run_scheduled(dialog)
+    assert len(dialog._matches) == 11
+
+    dialog.search_entry.text = ''
+    dialog._start_search()
+    assert dialog._matches == range(100)
+    assert dialog.count_label.text == 'Recipients: 100'
@@ -0,0 +1,101 @@
+"""UiUpdateChannel（ログと進捗のまとめた反映）のテスト（画面は作らない）"""
+import threading
+
+import pytest
+
+pytest.importorskip('customtkinter')
+
+from email_bulk_sender_gui import UiUpdateChannel  # noqa: E402
+
+
+class FakeWidget:
+    """after で登録されたタイマーを記録し、tick で1回分だけ実行する"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def after(self, ms, func, *args):
+        self.jobs.append((func, args))
+        return len(self.jobs)
+
+    def tick(self):
+        jobs, self.jobs = self.jobs, []
+        for func, args in jobs:
+            func(*args)
+
+
+@pytest.fixture
+def channel():
+    widget = FakeWidget()
+    events = []
+    channel = UiUpdateChannel(widget, on_log=lambda lines: events.append(('log', list(lines))),
+                              on_progress=lambda value, status: events.append(('progress', value, status)),
+                              max_lines=3)
+    channel.events = events
+    return channel
+
+
+def test_updates_are_applied_once_per_tick(channel):
+    channel.start()
+    for i in range(5):
+        channel.progress(i / 5, f'{i}/5')
+    channel.log('a')
+    channel.log('b')
+    assert channel.events == []
+
+    channel.widget.tick()
+
+    assert channel.events == [('log', ['a', 'b']), ('progress', 0.8, '4/5')]
+
+
+def test_log_burst_keeps_the_latest_lines(channel):
+    channel.start()
+    for i in range(10):
+        channel.log(str(i))
+    channel.widget.tick()
+    assert channel.events == [('log', ['7', '8', '9'])]
+
+
+def test_call_runs_after_earlier_updates(channel):
+    channel.start()
+    channel.log('sending')
+    channel.progress(1.0, 'done')
+    channel.call(lambda result: channel.events.append(('call', result)), 'finished')
+    channel.log('after')
+
+    channel.widget.tick()
+
+    assert channel.events == [('log', ['sending']), ('progress', 1.0, 'done'), ('call', 'finished'),
+                              ('log', ['after'])]
+
+
+def test_timer_stops_after_remaining_updates(channel):
+    channel.start()
+    channel.widget.tick()
+    assert len(channel.widget.jobs) == 1
+
+    channel.log('last')
+    channel.stop()
+    channel.widget.tick()
+
+    assert channel.events == [('log', ['last'])]
+    assert channel.widget.jobs == []
+
+
+def test_updates_from_worker_threads(channel):
+    channel.start()
+
+    def worker(n):
+        for i in range(100):
+            channel.log(f'{n}-{i}')
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    channel.max_lines = 1000
+    channel.widget.tick()
+
+    (kind, lines), = channel.events
+    assert len(lines) == 400
@@ -0,0 +1,164 @@
+"""LeaseQueue（複数ワーカーで分け合う期限付きの共有キュー）のテスト"""
+import sqlite3
+import threading
+
+import pytest
+
+import email_bulk_sender
+from conftest import PlainSender, make_recipients
+from email_bulk_sender import LeaseQueue, SendItem
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(email_bulk_sender.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def lease_queue(tmp_path):
+    lease_queue = LeaseQueue.create(tmp_path / 'queue.sqlite3', make_recipients(5), {'subject': '件名', 'cc': None})
+    yield lease_queue
+    lease_queue.close()
+
+
+def indexes(items):
+    return [item.index for item in items]
+
+
+def test_create_registers_recipients_and_campaign(tmp_path, lease_queue):
+    assert lease_queue.campaign() == {'subject': '件名', 'cc': None}
+    assert lease_queue.counts()['pending'] == 5
+    with pytest.raises(FileExistsError):
+        LeaseQueue.create(tmp_path / 'queue.sqlite3', make_recipients(1), {})
+
+
+def test_workers_claim_disjoint_batches(clock, lease_queue):
+    first = lease_queue.claim('a', 2, 60)
+    second = lease_queue.claim('b', 2, 60)
+
+    assert indexes(first) == [1, 2]
+    assert indexes(second) == [3, 4]
+    assert first[0].recipient == make_recipients(1)[0]
+    assert lease_queue.counts()['leased'] == 4
+
+
+def test_expired_lease_returns_unsent_recipients(clock, lease_queue):
+    lease_queue.claim('a', 2, 60)
+    assert lease_queue.begin('a', 1)
+
+    clock.now += 61
+    # 送信前の受信者は他のワーカーが借り受け直し、送信中だった受信者は送り直さない
+    assert indexes(lease_queue.claim('b', 10, 60)) == [2, 3, 4, 5]
+    counts = lease_queue.counts()
+    assert (counts['unknown'], counts['leased']) == (1, 4)
+    assert not lease_queue.begin('a', 2)
+
+
+def test_renew_keeps_the_lease(clock, lease_queue):
+    lease_queue.claim('a', 2, 60)
+    clock.now += 50
+    assert lease_queue.renew('a', 60) == 2
+    clock.now += 50
+    assert lease_queue.claim('b', 10, 60) and lease_queue.begin('a', 1)
+
+
+def test_finish_records_results(clock, lease_queue):
+    lease_queue.claim('a', 3, 60)
+    for index in (1, 2, 3):
+        lease_queue.begin('a', index)
+    lease_queue.finish('a', 1, 'sent')
+    lease_queue.finish('a', 2, 'failed', '550 no such user')
+    lease_queue.finish('b', 3, 'sent')  # 他のワーカーの受信者は変えない
+
+    counts = lease_queue.counts()
+    assert (counts['sent'], counts['failed'], counts['sending']) == (1, 1, 1)
+
+
+def test_deferred_recipient_is_retried_later_by_any_worker(clock, lease_queue):
+    item, = lease_queue.claim('a', 1, 60)
+    lease_queue.begin('a', item.index)
+    lease_queue.defer('a', SendItem(item.index, item.recipient, 1, envelope=['cc@example.com']), 30)
+
+    assert indexes(lease_queue.claim('b', 1, 60)) == [2]
+    clock.now += 31
+    retry, = lease_queue.claim('b', 1, 60)
+    assert (retry.index, retry.attempt, retry.envelope) == (1, 1, ['cc@example.com'])
+
+
+def test_release_returns_unsent_and_marks_sending_unknown(clock, lease_queue):
+    lease_queue.claim('a', 3, 60)
+    lease_queue.begin('a', 1)
+
+    lease_queue.release('a')
+
+    counts = lease_queue.counts()
+    assert (counts['pending'], counts['unknown'], counts['leased']) == (4, 1, 0)
+
+
+def test_init_queue_from_csv(tmp_path):
+    csv_file = tmp_path / 'list.csv'
+    csv_file.write_text('所属,氏名,メールアドレス\nA,山田,a@example.com\nB,佐藤,b@example.com\n', encoding='utf-8')
+    template = tmp_path / 'body.txt'
+    template.write_text('{氏名}様\n\n本文\n', encoding='utf-8')
+    sender = PlainSender('sender@example.com', 'password', '127.0.0.1', 25)
+    queue_path = tmp_path / 'queue.sqlite3'
+
+    assert sender.init_queue(str(queue_path), str(csv_file), str(template), cc='cc@example.com') == 2
+    assert sender.init_queue(str(queue_path), str(csv_file), str(template)) is None
+
+    lease_queue = LeaseQueue(queue_path)
+    assert lease_queue.campaign()['subject'] == '{氏名}様'
+    assert lease_queue.campaign()['cc'] == 'cc@example.com'
+    lease_queue.close()
+
+
+def test_workers_share_a_queue_without_duplicates(tmp_path, smtp_server):
+    recipients = make_recipients(30) + [{'affiliation': '', 'name': 'x', 'email': 'once@example.com'},
+                                        {'affiliation': '', 'name': 'y', 'email': 'perm@example.com'}]
+    queue_path = str(tmp_path / 'queue.sqlite3')
+    LeaseQueue.create(queue_path, recipients, {'subject': '{氏名}様', 'body': '本文\n'}).close()
+    summaries = {}
+
+    def worker(name):
+        sender = PlainSender('sender@example.com', 'password', smtp_server.host, smtp_server.port)
+        summaries[name] = sender.run_worker(queue_path, worker_id=name, batch_size=4, delay=0, connections=2,
+                                            retry={'base_delay': 0.05, 'jitter': 0}, poll_interval=0.05)
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ('a', 'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert sorted(smtp_server.recipients()) == sorted(r['email'] for r in recipients[:31])
+    assert sum(s.delivered for s in summaries.values()) == 31
+    assert sum(s.failed for s in summaries.values()) == 1
+    with sqlite3.connect(queue_path) as db:
+        states = dict(db.execute("SELECT state, COUNT(*) FROM recipients GROUP BY state").fetchall())
+    assert states == {'sent': 31, 'failed': 1}
+
+
+def test_worker_does_not_resend_uncertain_delivery(tmp_path, smtp_server):
+    queue_path = str(tmp_path / 'queue.sqlite3')
+    LeaseQueue.create(queue_path, make_recipients(2), {'subject': '{氏名}様', 'body': '本文\n'}).close()
+    smtp_server.drop_after_data = 1
+    sender = PlainSender('sender@example.com', 'password', smtp_server.host, smtp_server.port)
+
+    summary = sender.run_worker(queue_path, worker_id='a', delay=0, poll_interval=0.05)
+
+    assert summary.delivered == 1
+    assert smtp_server.recipients() == ['user1@example.com', 'user2@example.com']
+    lease_queue = LeaseQueue(queue_path)
+    counts = lease_queue.counts()
+    lease_queue.close()
+    assert (counts['sent'], counts['unknown']) == (1, 1)
@@ -0,0 +1,84 @@
+"""MessageSkeleton（シリアライズ済みのひな形による作成）のテスト"""
+import os
+
+import pytest
+
+from email_bulk_sender import EmailBulkSender, MessageSkeleton, _flatten_message
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+BOUNDARY = '===============0000000000000000042=='
+
+RECIPIENTS = [
+    {'affiliation': 'Example Inc.', 'name': 'John Smith', 'email': 'john@example.com'},
+    {'affiliation': '株式会社ABC', 'name': '山田太郎', 'email': 'yamada@example.co.jp', 'プラン': 'ゴールド'},
+    {'affiliation': '', 'name': '', 'email': 'empty@example.com'},
+]
+
+SUBJECTS = [
+    'Invitation',
+    '{氏名}様 {プラン}プランのご案内',
+    '{所属} {氏名}様 ' + 'とても長い件名が続きます' * 8,
+]
+
+BODY = '{所属}\n{氏名} 様\n\nいつもお世話になっております。\n.行頭のピリオド\n' + 'x' * 200 + '\n'
+
+
+@pytest.fixture
+def attachment(tmp_path):
+    path = tmp_path / '添付資料.pdf'
+    path.write_bytes(os.urandom(3000))
+    return str(path)
+
+
+def create_and_flatten(sender, recipient, subject, body, **options):
+    return _flatten_message(sender.create_message(
+        recipient['email'], recipient['name'], recipient['affiliation'], subject, body,
+        fields=recipient, boundary=BOUNDARY, **options
+    ))
+
+
+@pytest.mark.parametrize('subject', SUBJECTS)
+@pytest.mark.parametrize('display_name', ['', '配信担当', 'Newsletter Team'])
+def test_skeleton_matches_create_message(subject, display_name):
+    sender = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587, display_name)
+    skeleton = MessageSkeleton(sender, subject, BODY, boundary=BOUNDARY)
+
+    for recipient in RECIPIENTS:
+        assert skeleton.render(recipient) == create_and_flatten(sender, recipient, subject, BODY)
+
+
+def test_skeleton_matches_create_message_with_every_option(attachment):
+    sender = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587, '配信担当')
+    options = {'cc': ['cc1@example.com', 'cc2@example.com'], 'bcc': 'bcc@example.com',
+               'reply_to': 'reply@example.com', 'attachments': [attachment]}
+    skeleton = MessageSkeleton(sender, SUBJECTS[1], BODY, boundary=BOUNDARY, **options)
+
+    for recipient in RECIPIENTS:
+        from_addr, to_addrs, data = skeleton.render(recipient)
+        assert (from_addr, to_addrs, data) == create_and_flatten(sender, recipient, SUBJECTS[1], BODY, **options)
+        assert to_addrs == [recipient['email'], 'bcc@example.com', 'cc1@example.com', 'cc2@example.com']
+        assert b'bcc@example.com' not in data
+
+
+def test_renderer_falls_back_when_skeleton_cannot_be_built(monkeypatch):
+    sender = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+
+    def broken(*args, **kwargs):
+        raise ValueError("Cannot locate placeholder in message skeleton")
+
+    monkeypatch.setattr(MessageSkeleton, '__init__', broken)
+    render = EmailBulkSender._message_renderer(sender, SUBJECTS[0], BODY, boundary=BOUNDARY)
+
+    assert render(RECIPIENTS[1]) == create_and_flatten(sender, RECIPIENTS[1], SUBJECTS[0], BODY)
+
+
+def test_benchmark_render_compares_both_methods(capsys):
+    sender = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+
+    results = sender.benchmark_render(os.path.join(EXAMPLES, 'list_sample.csv'),
+                                      os.path.join(EXAMPLES, 'body_sample.txt'), count=100)
+
+    assert set(results) == {'generator', 'skeleton'}
+    assert results['generator'] > 0 and results['skeleton'] > 0
+    # スケルトンはメッセージごとに email.generator を通さないため速い
+    assert results['skeleton'] < results['generator']
@@ -0,0 +1,132 @@
+"""OutputSink（送信の代わりに eml / Maildir / mbox へ書き出す）のテスト"""
+import email
+import mailbox
+import os
+
+import pytest
+
+from conftest import make_recipients
+from email_bulk_sender import (EmailBulkSender, EmlDirectorySink, MaildirSink, MboxSink, OutputSink,
+                               SendController)
+
+SUBJECT = '{氏名}様へのご案内'
+BODY = '{所属}\n{氏名} 様\n\nFrom here on, the body follows.\n'
+
+
+def make_sender():
+    return EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587, '配信担当')
+
+
+def write(sink, recipients, **options):
+    return make_sender().send_recipients(recipients, SUBJECT, BODY, sink=sink, **options)
+
+
+def decoded_body(msg) -> str:
+    return msg.get_payload()[0].get_payload(decode=True).decode('utf-8')
+
+
+@pytest.mark.parametrize('spec, sink_class', [('eml:out', EmlDirectorySink), ('Maildir: out', MaildirSink),
+                                              ('mbox:out/all.mbox', MboxSink)])
+def test_from_spec(spec, sink_class):
+    sink = OutputSink.from_spec(spec)
+    assert isinstance(sink, sink_class)
+    assert str(sink).endswith(spec.partition(':')[2].strip())
+
+
+@pytest.mark.parametrize('spec', ['smtp:out', 'eml:', 'out'])
+def test_from_spec_rejects_unknown_kinds(spec):
+    with pytest.raises(ValueError):
+        OutputSink.from_spec(spec)
+
+
+def test_eml_output_is_reproducible(tmp_path):
+    recipients = make_recipients(3)
+    summary = write(EmlDirectorySink(tmp_path / 'first'), recipients)
+    write(EmlDirectorySink(tmp_path / 'second'), recipients)
+
+    assert summary.delivered == 3
+    names = sorted(os.listdir(tmp_path / 'first'))
+    assert names == ['000001.eml', '000002.eml', '000003.eml']
+    for name in names:
+        assert (tmp_path / 'first' / name).read_bytes() == (tmp_path / 'second' / name).read_bytes()
+
+    msg = email.message_from_bytes((tmp_path / 'first' / '000002.eml').read_bytes())
+    assert msg['To'] == 'user2@example.com'
+    assert decoded_body(msg).startswith('Company 2\nName 2 様')
+
+
+def test_maildir_output_is_readable(tmp_path):
+    write(MaildirSink(tmp_path / 'Maildir'), make_recipients(4))
+
+    box = mailbox.Maildir(str(tmp_path / 'Maildir'), create=False)
+    assert sorted(msg['To'] for msg in box) == [f'user{i}@example.com' for i in range(1, 5)]
+    assert os.listdir(tmp_path / 'Maildir' / 'tmp') == []
+
+
+def test_mbox_output_is_appended_and_readable(tmp_path):
+    path = tmp_path / 'out' / 'all.mbox'
+    write(MboxSink(path), make_recipients(2))
+    write(MboxSink(path), make_recipients(1))
+
+    messages = list(mailbox.mbox(str(path)))
+    assert [msg['To'] for msg in messages] == ['user1@example.com', 'user2@example.com', 'user1@example.com']
+    assert messages[0].get_from().startswith('sender@example.com ')
+    assert decoded_body(messages[0]).endswith('From here on, the body follows.\n')
+    assert b'\r\n' not in path.read_bytes()
+
+
+def test_mbox_output_escapes_from_lines(tmp_path):
+    path = tmp_path / 'all.mbox'
+
+    def render(recipient):
+        return 'sender@example.com', [recipient['email']], b'Subject: x\r\n\r\nFrom me\r\n>From you\r\n'
+
+    MboxSink(path).run(make_recipients(1), render)
+
+    # mboxrd 形式: 行頭の From と >From の前に > を1つ足す
+    assert path.read_bytes().endswith(b'\n\n>From me\n>>From you\n\n')
+    assert len(mailbox.mbox(str(path))) == 1
+
+
+def test_render_failure_is_reported_and_writing_continues(tmp_path):
+    results = []
+
+    def render(recipient):
+        if recipient['email'] == 'user2@example.com':
+            raise FileNotFoundError('attachment.pdf')
+        return 'sender@example.com', [recipient['email']], b'Subject: x\r\n\r\nbody\r\n'
+
+    sink = EmlDirectorySink(tmp_path)
+    summary = sink.run(make_recipients(3), render, lambda result, done, total: results.append((result.status, done)))
+
+    assert (summary.delivered, summary.failed) == (2, 1)
+    assert results == [('sent', 1), ('failed', 2), ('sent', 3)]
+    assert sorted(os.listdir(tmp_path)) == ['000001.eml', '000003.eml']
+    assert sink.completed
+
+
+def test_cancel_stops_writing(tmp_path):
+    controller = SendController()
+
+    def on_result(result, done, total):
+        if done == 2:
+            controller.cancel()
+
+    sink = EmlDirectorySink(tmp_path)
+    summary = write(sink, make_recipients(5), on_result=on_result, controller=controller)
+
+    assert summary.delivered == 2
+    assert len(os.listdir(tmp_path)) == 2
+    assert not sink.completed
+
+
+def test_streamed_attachment_is_written_intact(tmp_path):
+    attachment = tmp_path / 'large.bin'
+    attachment.write_bytes(os.urandom(300000))
+
+    write(EmlDirectorySink(tmp_path / 'out'), make_recipients(1), attachments=[str(attachment)],
+          stream_attachments_mb=0.1)
+
+    msg = email.message_from_bytes((tmp_path / 'out' / '000001.eml').read_bytes())
+    part = [p for p in msg.walk() if p.get_filename()][0]
+    assert part.get_payload(decode=True) == attachment.read_bytes()
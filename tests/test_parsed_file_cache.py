@@ -0,0 +1,119 @@
+"""ParsedFileCache（受信者リストとテンプレートの読み込み結果のキャッシュ）のテスト"""
+import os
+import stat
+import sys
+
+import pytest
+
+from email_bulk_sender import CsvRecipients, ParsedFileCache, RecipientStore
+
+CSV = '所属,氏名,メールアドレス\n株式会社ABC,山田太郎,yamada@example.com\n株式会社DEF,佐藤花子,sato@example.com\n'
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return RecipientStore.from_recipients(CsvRecipients(path))
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / 'list.csv'
+    path.write_text(CSV, encoding='utf-8')
+    return str(path)
+
+
+def touch(path, content):
+    """内容を書き換え、更新日時も確実に変える"""
+    before = os.stat(path).st_mtime_ns
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.utime(path, ns=(before + 10 ** 9, before + 10 ** 9))
+
+
+def test_recipients_are_loaded_once_until_the_file_changes(csv_file):
+    cache = ParsedFileCache()
+    load = Loader()
+
+    first = cache.recipients(csv_file, load)
+    assert cache.recipients(csv_file, load) is first
+    assert load.calls == 1
+
+    touch(csv_file, CSV + '有限会社GHI,鈴木一郎,suzuki@example.com\n')
+    assert len(cache.recipients(csv_file, load)) == 3
+    assert load.calls == 2
+
+
+def test_template_is_cached(tmp_path):
+    path = tmp_path / 'body.txt'
+    path.write_text('{氏名}様\n\n本文', encoding='utf-8')
+    calls = []
+
+    def load(p):
+        calls.append(p)
+        return '{氏名}様', '本文'
+
+    cache = ParsedFileCache()
+    assert cache.template(str(path), load) == ('{氏名}様', '本文')
+    assert cache.template(str(path), load) == ('{氏名}様', '本文')
+    assert len(calls) == 1
+
+
+def test_without_sidecar_dir_nothing_is_written(tmp_path, csv_file):
+    ParsedFileCache().recipients(csv_file, Loader())
+    assert sorted(os.listdir(tmp_path)) == ['list.csv']
+
+
+def test_sidecar_is_reused_by_a_new_cache(tmp_path, csv_file):
+    sidecar_dir = tmp_path / 'cache'
+    ParsedFileCache(sidecar_dir).recipients(csv_file, Loader())
+
+    load = Loader()
+    store = ParsedFileCache(sidecar_dir).recipients(csv_file, load)
+
+    assert load.calls == 0
+    assert [r['email'] for r in store] == ['yamada@example.com', 'sato@example.com']
+
+
+def test_stale_or_corrupt_sidecar_is_ignored(tmp_path, csv_file):
+    sidecar_dir = tmp_path / 'cache'
+    ParsedFileCache(sidecar_dir).recipients(csv_file, Loader())
+
+    touch(csv_file, CSV.replace('山田太郎', '山田次郎'))
+    load = Loader()
+    assert ParsedFileCache(sidecar_dir).recipients(csv_file, load)[0]['name'] == '山田次郎'
+    assert load.calls == 1
+
+    sidecar, = sidecar_dir.glob('*.recipients')
+    sidecar.write_bytes(b'not a cache\n')
+    load = Loader()
+    assert len(ParsedFileCache(sidecar_dir).recipients(csv_file, load)) == 2
+    assert load.calls == 1
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='POSIX permissions')
+def test_sidecar_is_private(tmp_path, csv_file):
+    sidecar_dir = tmp_path / 'cache'
+    ParsedFileCache(sidecar_dir).recipients(csv_file, Loader())
+
+    assert stat.S_IMODE(os.stat(sidecar_dir).st_mode) == 0o700
+    sidecar, = sidecar_dir.glob('*.recipients')
+    assert stat.S_IMODE(os.stat(sidecar).st_mode) == 0o600
+
+
+def test_only_recent_sidecars_are_kept(tmp_path):
+    sidecar_dir = tmp_path / 'cache'
+    cache = ParsedFileCache(sidecar_dir, max_sidecars=2)
+    for i in range(4):
+        path = tmp_path / f'list{i}.csv'
+        path.write_text(CSV, encoding='utf-8')
+        cache.recipients(str(path), Loader())
+
+    assert len(list(sidecar_dir.glob('*.recipients'))) == 2
+    # 最後に読み込んだリストは残っている
+    load = Loader()
+    ParsedFileCache(sidecar_dir).recipients(str(tmp_path / 'list3.csv'), load)
+    assert load.calls == 0
@@ -0,0 +1,104 @@
+"""PIPELINING（_sendmail_pipelined）のテスト"""
+import smtplib
+
+import pytest
+
+import email_bulk_sender
+from conftest import make_recipients, render_simple
+from email_bulk_sender import SmtpConnectionPool, _is_delivery_uncertain, _sendmail_pipelined
+
+
+class ScriptedSmtp(smtplib.SMTP):
+    """送信したデータを記録し、決められた応答を順に返す smtplib.SMTP（接続しない）"""
+
+    def __init__(self, replies, fail_on_send=None):
+        super().__init__()
+        self.replies = list(replies)
+        self.sent = []
+        self.rset_count = 0
+        self.fail_on_send = fail_on_send
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode('ascii')
+        if self.fail_on_send is not None and len(self.sent) == self.fail_on_send:
+            raise smtplib.SMTPServerDisconnected("connection lost")
+        self.sent.append(data)
+
+    def getreply(self):
+        return self.replies.pop(0)
+
+    def rset(self):
+        self.rset_count += 1
+        return 250, b'ok'
+
+
+def test_commands_are_sent_in_one_write():
+    server = ScriptedSmtp([(250, b'ok'), (250, b'ok'), (250, b'ok'), (354, b'go'), (250, b'queued')])
+
+    refused = _sendmail_pipelined(server, 'from@example.com', ['a@example.com', 'b@example.com'], b'body\r\n')
+
+    assert refused == {}
+    assert server.sent[0] == (b'MAIL FROM:<from@example.com>\r\nRCPT TO:<a@example.com>\r\n'
+                              b'RCPT TO:<b@example.com>\r\nDATA\r\n')
+    assert b''.join(server.sent[1:]) == b'body\r\n.\r\n'
+
+
+def test_replies_are_matched_to_recipients_in_order():
+    server = ScriptedSmtp([(250, b'ok'), (250, b'ok'), (451, b'later'), (550, b'unknown'), (354, b'go'),
+                           (250, b'queued')])
+
+    refused = _sendmail_pipelined(server, 'from@example.com',
+                                  ['a@example.com', 'b@example.com', 'c@example.com'], b'body\r\n')
+
+    assert refused == {'b@example.com': (451, b'later'), 'c@example.com': (550, b'unknown')}
+
+
+def test_data_accepted_after_all_recipients_refused_is_terminated_and_reset():
+    server = ScriptedSmtp([(250, b'ok'), (550, b'unknown'), (354, b'go'), (250, b'empty message')])
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        _sendmail_pipelined(server, 'from@example.com', ['a@example.com'], b'body\r\n')
+
+    assert server.sent[-1] == b'.\r\n'
+    assert server.rset_count == 1
+
+
+def test_sender_refused():
+    server = ScriptedSmtp([(553, b'bad sender'), (503, b'need MAIL'), (503, b'need RCPT')])
+
+    with pytest.raises(smtplib.SMTPSenderRefused):
+        _sendmail_pipelined(server, 'from@example.com', ['a@example.com'], b'body\r\n')
+    assert server.rset_count == 1
+
+
+def test_final_data_reply_error():
+    server = ScriptedSmtp([(250, b'ok'), (250, b'ok'), (354, b'go'), (554, b'rejected')])
+
+    with pytest.raises(smtplib.SMTPDataError) as excinfo:
+        _sendmail_pipelined(server, 'from@example.com', ['a@example.com'], b'body\r\n')
+    assert excinfo.value.smtp_code == 554
+
+
+def test_disconnect_while_sending_body_is_marked_uncertain():
+    server = ScriptedSmtp([(250, b'ok'), (250, b'ok'), (354, b'go')], fail_on_send=1)
+
+    with pytest.raises(smtplib.SMTPServerDisconnected) as excinfo:
+        _sendmail_pipelined(server, 'from@example.com', ['a@example.com'], b'body\r\n')
+    assert _is_delivery_uncertain(excinfo.value)
+
+
+@pytest.mark.parametrize('server_fixture, pipelined', [('smtp_server', True), ('plain_smtp_server', False)])
+def test_pool_uses_pipelining_only_when_advertised(request, monkeypatch, make_sender, server_fixture, pipelined):
+    server = request.getfixturevalue(server_fixture)
+    calls = []
+
+    def counting(*args):
+        calls.append(args[2])
+        return _sendmail_pipelined(*args)
+
+    monkeypatch.setattr(email_bulk_sender, '_sendmail_pipelined', counting)
+    SmtpConnectionPool(make_sender(server)).run(make_recipients(3), render_simple())
+
+    assert len(server.messages) == 3
+    assert len(calls) == (3 if pipelined else 0)
@@ -0,0 +1,128 @@
+"""SenderProfile と ProfileDispatcher（複数アカウントへの振り分け）のテスト"""
+import socket
+
+import pytest
+
+import email_bulk_sender
+from conftest import PlainSender, make_recipients, render_simple
+from email_bulk_sender import ProfileDispatcher, SendItem, SenderProfile, SendJournal, SmtpConnectionPool, read_password
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def profile_for(server, email_address, daily_quota=0, port=None):
+    return SenderProfile(email_address, 'password', '127.0.0.1', port or server.port, daily_quota=daily_quota)
+
+
+def create_pool(profile):
+    sender = PlainSender(profile.email_address, profile.email_password, profile.smtp_server, profile.smtp_port)
+    return SmtpConnectionPool(sender, connections=2)
+
+
+def render_for(sender):
+    return render_simple(sender.email_address)
+
+
+def split(count, *remaining):
+    profiles = [SenderProfile(f'p{i}@example.com', '', 'smtp.example.com', 587) for i in range(len(remaining))]
+    items = [SendItem(i, {'email': f'user{i}@example.com'}) for i in range(1, count + 1)]
+    shards, unassigned = ProfileDispatcher._split(items, profiles, {id(p): r for p, r in zip(profiles, remaining)})
+    return [[item.index for item in shard] for shard in shards], [item.index for item in unassigned]
+
+
+def test_from_config():
+    profile = SenderProfile.from_config({'server': 'smtp.example.com', 'email_address': 'a@example.com',
+                                         'daily_quota': 500, 'name': 'main'}, 'secret')
+    assert (profile.smtp_port, profile.daily_quota, profile.label, profile.email_password) == \
+        (587, 500, 'main', 'secret')
+    with pytest.raises(ValueError):
+        SenderProfile.from_config({'email_address': 'a@example.com'}, 'secret')
+
+
+def test_split_interleaves_unlimited_profiles():
+    assert split(4, None, None) == ([[1, 3], [2, 4]], [])
+
+
+def test_split_is_proportional_to_remaining_quota():
+    shards, unassigned = split(4, 3, 1)
+    assert shards == [[1, 2, 4], [3]]
+    assert unassigned == []
+
+
+def test_split_leaves_recipients_beyond_every_quota():
+    assert split(5, 2, 1) == ([[1, 3], [2]], [4, 5])
+
+
+def test_campaign_is_shared_between_accounts(smtp_server):
+    profiles = [profile_for(smtp_server, 'one@example.com'), profile_for(smtp_server, 'two@example.com')]
+    recipients = make_recipients(10)
+
+    summary = ProfileDispatcher(profiles, create_pool).run(recipients, render_for)
+
+    assert summary.delivered == 10
+    senders = [mail_from for mail_from, _, _ in smtp_server.messages]
+    assert senders.count('one@example.com') == 5
+    assert senders.count('two@example.com') == 5
+    assert sorted(smtp_server.recipients()) == sorted(r['email'] for r in recipients)
+
+
+def test_unreachable_account_fails_over(smtp_server):
+    profiles = [profile_for(smtp_server, 'down@example.com', port=unused_port()),
+                profile_for(smtp_server, 'up@example.com')]
+    dones = []
+
+    summary = ProfileDispatcher(profiles, create_pool, on_result=lambda result, done, total: dones.append(done)) \
+        .run(make_recipients(6), render_for)
+
+    assert summary.delivered == 6
+    assert {mail_from for mail_from, _, _ in smtp_server.messages} == {'up@example.com'}
+    assert sorted(dones) == [1, 2, 3, 4, 5, 6]
+
+
+def test_every_account_unreachable_raises_connect_error(smtp_server):
+    profiles = [profile_for(smtp_server, 'down@example.com', port=unused_port())]
+    with pytest.raises(ConnectionRefusedError):
+        ProfileDispatcher(profiles, create_pool).run(make_recipients(2), render_for)
+
+
+def test_daily_quota_counts_earlier_sends(tmp_path, smtp_server):
+    journal = SendJournal(tmp_path / 'journal.sqlite3', 'campaign')
+    journal.record('earlier@example.com', 'sent', sender='one@example.com')
+    profiles = [profile_for(smtp_server, 'one@example.com', daily_quota=3)]
+
+    summary = ProfileDispatcher(profiles, create_pool, journal=journal).run(make_recipients(4), render_for)
+    journal.close()
+
+    assert (summary.delivered, summary.failed) == (2, 2)
+    assert len(smtp_server.messages) == 2
+
+
+class FakeKeyring:
+    passwords = {('email_bulk_sender', 'sub1@example.com'): 'saved'}
+
+    @classmethod
+    def get_password(cls, service, username):
+        return cls.passwords.get((service, username))
+
+
+def test_profile_password_is_read_from_keyring(monkeypatch):
+    monkeypatch.setattr(email_bulk_sender, 'KEYRING_SUPPORT', True)
+    monkeypatch.setattr(email_bulk_sender, 'keyring', FakeKeyring, raising=False)
+    prompts = []
+    monkeypatch.setattr(email_bulk_sender, 'getpass', lambda prompt: prompts.append(prompt) or 'typed')
+
+    assert read_password('sub1@example.com', 'Password') == 'saved'
+    assert prompts == []
+    # 保存されていなければ入力を求める
+    assert read_password('sub2@example.com', 'Password') == 'typed'
+    assert prompts == ['Password: ']
+
+
+def test_profile_password_is_prompted_without_keyring(monkeypatch):
+    monkeypatch.setattr(email_bulk_sender, 'KEYRING_SUPPORT', False)
+    monkeypatch.setattr(email_bulk_sender, 'getpass', lambda prompt: 'typed')
+    assert read_password('sub1@example.com', 'Password') == 'typed'
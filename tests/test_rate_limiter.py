@@ -0,0 +1,78 @@
+"""RateLimiter（トークンバケットによる送信レート制限）のテスト"""
+import threading
+
+import pytest
+
+import email_bulk_sender
+from email_bulk_sender import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(email_bulk_sender.time, 'monotonic', clock)
+    return clock
+
+
+def test_from_config_builds_one_bucket_per_period():
+    limiter = RateLimiter.from_config({'per_minute': 120, 'per_day': {'limit': 2000, 'burst': 200},
+                                       'per_week': 5, 'per_hour': 0})
+    assert set(limiter.buckets) == {'per_minute', 'per_day'}
+    assert limiter.buckets['per_minute'].rate == pytest.approx(2.0)
+    assert limiter.buckets['per_day'].capacity == 200
+    assert limiter.describe() == '120/per_minute, 2000/per_day (burst 200)'
+
+
+def test_delay_is_used_only_without_rate_limits():
+    assert RateLimiter.from_config(None, delay=0.5).buckets['per_second'].rate == pytest.approx(2.0)
+    assert set(RateLimiter.from_config({'per_minute': 60}, delay=0.5).buckets) == {'per_minute'}
+    assert RateLimiter.from_config(None).buckets == {}
+
+
+def test_reserve_waits_for_the_slowest_bucket(clock):
+    limiter = RateLimiter.from_config({'per_second': 10, 'per_minute': {'limit': 60, 'burst': 2}})
+
+    assert limiter.reserve() == 0
+    # 秒間の枠は0.1秒で戻るが、分間の枠（バースト2）が残っているため次も0.1秒待ち
+    assert limiter.reserve() == pytest.approx(0.1)
+    clock.now += 0.1
+    assert limiter.reserve() == 0
+    # 分間の枠を使い切ったので1秒に1通になる
+    clock.now += 0.1
+    assert limiter.reserve() == pytest.approx(0.8)
+
+
+def test_burst_allows_consecutive_sends(clock):
+    limiter = RateLimiter.from_config({'per_minute': {'limit': 60, 'burst': 3}})
+    assert [limiter.reserve() for _ in range(3)] == [0, 0, 0]
+    assert limiter.reserve() == pytest.approx(1.0)
+
+
+def test_adaptive_rate_and_pause_tighten_the_limit(clock):
+    limiter = RateLimiter.from_config({'per_second': 10})
+    limiter.set_adaptive_rate(1.0)
+    assert limiter.effective_rate() == pytest.approx(1.0)
+    assert limiter.base_rate() == pytest.approx(10.0)
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == pytest.approx(1.0)
+
+    limiter.set_adaptive_rate(None)
+    clock.now += 1
+    limiter.pause(30)
+    assert limiter.reserve() == pytest.approx(30)
+
+
+def test_acquire_returns_false_when_cancelled():
+    limiter = RateLimiter.from_config({'per_minute': 1})
+    assert limiter.acquire()
+    cancel = threading.Event()
+    cancel.set()
+    assert limiter.acquire(cancel) is False
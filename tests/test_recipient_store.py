@@ -0,0 +1,106 @@
+"""RecipientStore（列ごとにまとめた受信者リスト）のテスト"""
+import io
+
+import pytest
+
+from conftest import make_recipients
+from email_bulk_sender import RecipientStore
+
+RECIPIENTS = [
+    {'affiliation': '株式会社ABC', 'name': '山田太郎', 'email': 'yamada@example.com', '会員番号': 'A-001'},
+    {'affiliation': 'ACME Inc.', 'name': 'John Smith', 'email': 'john@Example.ORG'},
+    {'affiliation': '株式会社DEF', 'name': '山本花子', 'email': 'yamamoto@example.com', '会員番号': ''},
+    {'affiliation': '', 'name': '', 'email': 'empty@example.net', '会員番号': 'B-9'},
+]
+
+
+@pytest.fixture
+def store():
+    return RecipientStore.from_recipients(RECIPIENTS)
+
+
+def test_rows_read_like_dicts(store):
+    assert len(store) == 4
+    assert store.keys == ['affiliation', 'name', 'email', '会員番号']
+    assert dict(store[0]) == RECIPIENTS[0]
+    # 1件目にある列だけを保持し、ない列は空文字列になる
+    assert dict(store[1]) == dict(RECIPIENTS[1], 会員番号='')
+    assert store[-1]['email'] == 'empty@example.net'
+    assert store[0].get('missing', 'x') == 'x'
+    assert 'name' in store[0] and 'missing' not in store[0]
+    assert [r['name'] for r in store] == [r['name'] for r in RECIPIENTS]
+
+
+def test_keys_from_reader_are_used():
+    class Reader(list):
+        keys = ['email', 'name', '備考']
+
+    store = RecipientStore.from_recipients(Reader([{'email': 'a@example.com', 'name': 'A', '備考': 'メモ'}]))
+    assert store.keys == ['email', 'name', '備考']
+    assert store[0]['備考'] == 'メモ'
+
+
+def test_search_is_case_insensitive_and_covers_every_column(store):
+    assert list(store.search('example.org')) == [1]
+    assert list(store.search('山')) == [0, 2]
+    assert list(store.search('b-9')) == [3]
+    assert list(store.search('山', keys=['affiliation'])) == []
+    assert list(store.search('')) == [0, 1, 2, 3]
+    assert list(store.search('not found')) == []
+
+
+def test_search_does_not_match_across_values():
+    store = RecipientStore.from_recipients([{'email': 'ab'}, {'email': 'cd'}, {'email': 'bc'}])
+    assert list(store.search('bc')) == [2]
+    assert list(store.search('b')) == [0, 2]
+
+
+def test_search_in_chunks(store):
+    assert list(store.search('example', start=1, stop=3)) == [1, 2]
+    assert list(store.search('example', start=3)) == [3]
+
+
+def test_slices_are_views(store):
+    view = store[1:3]
+    assert len(view) == 2
+    assert [r['name'] for r in view] == ['John Smith', '山本花子']
+    # ビュー内の位置で検索結果を返す
+    assert list(view.search('山本')) == [1]
+    assert list(store[::-1].search('山')) == [1, 3]
+    assert view[0]._columns is store[0]._columns
+    with pytest.raises(TypeError):
+        view.append({'email': 'x@example.com'})
+
+
+def test_dump_and_load_round_trip(store):
+    buffer = io.BytesIO()
+    store.dump(buffer, {'path': 'list.csv'})
+    buffer.seek(0)
+
+    loaded, meta = RecipientStore.load(buffer)
+
+    assert meta == {'path': 'list.csv'}
+    assert loaded.keys == store.keys
+    assert [dict(r) for r in loaded] == [dict(r) for r in store]
+    assert list(loaded.search('example.org')) == [1]
+
+
+def test_load_rejects_incompatible_or_truncated_data(store):
+    buffer = io.BytesIO()
+    store.dump(buffer)
+    data = buffer.getvalue()
+
+    with pytest.raises(ValueError):
+        RecipientStore.load(io.BytesIO(data[:-3]))
+    with pytest.raises(ValueError):
+        RecipientStore.load(io.BytesIO(data.replace(b'"version": 3', b'"version": 2', 1)))
+    with pytest.raises(TypeError):
+        store[1:].dump(io.BytesIO())
+
+
+def test_large_list_is_compact():
+    store = RecipientStore.from_recipients(make_recipients(20000))
+    size = sum(len(column.data) + column.ends.itemsize * len(column.ends) for column in store._columns.values())
+    # 1件あたり文字列の長さ + 列ごとに4バイト程度
+    assert size < 20000 * 60
+    assert list(store.search('user19999@')) == [19998]
@@ -0,0 +1,243 @@
+"""PooledConnection（切断時の再接続と接続の張り替え）のテスト"""
+import smtplib
+import socket
+
+import pytest
+
+import email_bulk_sender
+from conftest import PlainSender, make_recipients, render_simple
+from email_bulk_sender import (AdaptiveThrottle, AsyncSendEngine, PooledConnection, RateLimiter, RetryPolicy,
+                               SmtpConnectionPool, _is_closing_reply, _is_connection_error)
+
+
+class StubServer:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+
+class Connector:
+    def __init__(self):
+        self.servers = []
+
+    def __call__(self):
+        server = StubServer(len(self.servers) + 1)
+        self.servers.append(server)
+        return server
+
+
+class ReconnectRefusedSender(PlainSender):
+    """最初の接続の後は接続を拒否される送信クラス"""
+
+    connects = 0
+
+    def _refuse_reconnect(self):
+        self.connects += 1
+        if self.connects > 1:
+            raise ConnectionRefusedError('connection refused')
+
+    def connect_smtp(self):
+        self._refuse_reconnect()
+        return super().connect_smtp()
+
+    async def connect_smtp_async(self):
+        self._refuse_reconnect()
+        return await super().connect_smtp_async()
+
+
+@pytest.mark.parametrize('error, expected', [
+    (smtplib.SMTPServerDisconnected('gone'), True),
+    (smtplib.SMTPResponseException(421, b'closing'), False),
+    (smtplib.SMTPRecipientsRefused({'a@example.com': (421, b'closing')}), False),
+    (ConnectionResetError(), True),
+    (socket.timeout(), True),
+    (smtplib.SMTPResponseException(451, b'later'), False),
+    (FileNotFoundError('attachment.pdf'), False),
+    (PermissionError('attachment.pdf'), False),
+])
+def test_is_connection_error(error, expected):
+    assert _is_connection_error(error) is expected
+
+
+@pytest.mark.parametrize('error, expected', [
+    (smtplib.SMTPResponseException(421, b'closing'), True),
+    (smtplib.SMTPSenderRefused(421, b'closing', 'sender@example.com'), True),
+    (smtplib.SMTPRecipientsRefused({'a@example.com': (421, b'closing')}), True),
+    (smtplib.SMTPRecipientsRefused({'a@example.com': (450, b'busy')}), False),
+    (smtplib.SMTPServerDisconnected('gone'), False),
+])
+def test_is_closing_reply(error, expected):
+    assert _is_closing_reply(error) is expected
+
+
+def test_disconnect_reconnects_and_resends_once():
+    connector = Connector()
+    connection = PooledConnection(connector)
+    calls = []
+
+    def deliver(server):
+        calls.append(server.number)
+        if len(calls) == 1:
+            raise smtplib.SMTPServerDisconnected('gone')
+        return {}
+
+    assert connection.send(deliver) == {}
+    assert calls == [1, 2]
+    assert connector.servers[0].closed
+
+
+def test_second_disconnect_is_raised():
+    connection = PooledConnection(Connector())
+
+    def deliver(server):
+        raise smtplib.SMTPServerDisconnected('gone')
+
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        connection.send(deliver)
+
+
+def test_other_errors_are_not_retried():
+    connector = Connector()
+    connection = PooledConnection(connector)
+
+    def deliver(server):
+        raise FileNotFoundError('attachment.pdf')
+
+    with pytest.raises(FileNotFoundError):
+        connection.send(deliver)
+    assert len(connector.servers) == 1
+
+
+def test_421_closes_the_connection_without_resending():
+    connector = Connector()
+    connection = PooledConnection(connector)
+
+    def deliver(server):
+        raise smtplib.SMTPResponseException(421, b'too many messages')
+
+    with pytest.raises(smtplib.SMTPResponseException):
+        connection.send(deliver)
+    assert len(connector.servers) == 1 and connector.servers[0].closed
+    assert not connection.alive
+    # 次のメッセージの送信時に接続し直す
+    assert connection.send(lambda server: server.number) == 2
+
+
+def test_uncertain_delivery_is_not_resent_by_default():
+    connector = Connector()
+    connection = PooledConnection(connector)
+    calls = []
+
+    def deliver(server):
+        calls.append(server.number)
+        error = smtplib.SMTPServerDisconnected('gone')
+        error.after_data = True
+        raise error
+
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        connection.send(deliver)
+    assert calls == [1]
+    # 次の送信に備えて接続だけは張り直されている
+    assert connection.alive and connection.server.number == 2
+
+
+def test_connection_is_recycled_after_max_messages():
+    connector = Connector()
+    connection = PooledConnection(connector, max_messages=2)
+    used = [connection.send(lambda server: server.number) for _ in range(5)]
+    assert used == [1, 1, 2, 2, 3]
+
+
+def test_connection_is_recycled_after_max_age(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(email_bulk_sender.time, 'monotonic', lambda: now[0])
+    connection = PooledConnection(Connector(), max_age=60)
+
+    assert connection.send(lambda server: server.number) == 1
+    now[0] += 59
+    assert connection.send(lambda server: server.number) == 1
+    now[0] += 1
+    assert connection.send(lambda server: server.number) == 2
+
+
+def test_pool_recycles_sessions(smtp_server, make_sender):
+    summary = SmtpConnectionPool(make_sender(smtp_server), recycle_messages=2).run(make_recipients(5), render_simple())
+
+    assert summary.delivered == 5
+    assert smtp_server.sessions == 3
+
+
+def test_pool_reports_uncertain_delivery_as_failure(smtp_server, make_sender):
+    smtp_server.drop_after_data = 1
+    results = []
+    pool = SmtpConnectionPool(make_sender(smtp_server), on_result=lambda result, done, total: results.append(result))
+
+    summary = pool.run(make_recipients(3), render_simple())
+
+    assert summary.delivered == 2
+    assert summary.failed == 1
+    # サーバーが受け取っていた1通を送り直さない
+    assert smtp_server.recipients().count('user1@example.com') == 1
+    failed, = [r for r in results if not r.success]
+    assert failed.recipient['email'] == 'user1@example.com'
+    assert failed.status == 'failed'
+    # 接続は張り直して残りを送る
+    assert smtp_server.sessions == 2
+
+
+def test_pool_resends_uncertain_delivery_only_when_allowed(smtp_server, make_sender):
+    smtp_server.drop_after_data = 1
+    pool = SmtpConnectionPool(make_sender(smtp_server))
+    pool.at_most_once = False
+
+    summary = pool.run(make_recipients(3), render_simple())
+
+    assert summary.delivered == 3
+    assert smtp_server.recipients().count('user1@example.com') == 2
+
+
+@pytest.mark.parametrize('pool_class', [SmtpConnectionPool, AsyncSendEngine])
+@pytest.mark.parametrize('server_fixture', ['smtp_server', 'plain_smtp_server'])
+def test_pool_defers_421_to_the_retry_queue(request, make_sender, pool_class, server_fixture):
+    server = request.getfixturevalue(server_fixture)
+    rate_limiter = RateLimiter()
+    throttle = AdaptiveThrottle(rate_limiter, decrease=1.0, pause=0.2)
+    results = []
+    pool = pool_class(make_sender(server), rate_limiter=rate_limiter, throttle=throttle,
+                      retry_policy=RetryPolicy(base_delay=0.05, jitter=0),
+                      on_result=lambda result, done, total: results.append((result.status, result.index)))
+    recipients = make_recipients(3)
+    recipients[1] = {'affiliation': '', 'name': 'x', 'email': 'closing@example.com'}
+
+    summary = pool.run(recipients, render_simple())
+
+    assert summary.delivered == 3
+    # その場で送り直さず、再送待ちに入れてから送る
+    assert ('deferred', 2) in results
+    assert server.recipients().count('closing@example.com') == 1
+    assert rate_limiter.paused_until > 0
+    assert server.sessions == 2
+
+
+@pytest.mark.parametrize('pool_class', [SmtpConnectionPool, AsyncSendEngine])
+def test_connection_lost_mid_run_without_reconnect(smtp_server, pool_class):
+    sender = ReconnectRefusedSender('sender@example.com', 'password', smtp_server.host, smtp_server.port)
+    results = []
+
+    def on_result(result, done, total):
+        results.append((result.index, result.success))
+        if done == 2:
+            # 3通目の本文を受け取った後に切断し、以降の接続は拒否される
+            smtp_server.drop_after_data = 1
+
+    pool = pool_class(sender, on_result=on_result)
+    summary = pool.run(make_recipients(10), render_simple())
+
+    # 送信済みの結果を残したまま、送れなかった受信者を失敗として報告する
+    assert (summary.delivered, summary.failed) == (2, 8)
+    assert sorted(results) == [(1, True), (2, True)] + [(i, False) for i in range(3, 11)]
+    assert pool.connect_errors == []
+    assert len(pool.disconnect_errors) == 1
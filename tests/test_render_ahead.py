@@ -0,0 +1,129 @@
+"""RenderAhead（送信と並行したメッセージの先読み作成）のテスト"""
+import queue
+import threading
+import time
+
+import pytest
+
+from conftest import make_recipients, render_simple
+from email_bulk_sender import RenderAhead, SendItem, SendQueue, SmtpConnectionPool
+
+
+def items(count):
+    return [SendItem(i, recipient) for i, recipient in enumerate(make_recipients(count), 1)]
+
+
+def take(render_ahead, timeout=5.0):
+    """作成済みになるまで待って次の SendItem を取り出す"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return render_ahead.take()
+        except queue.Empty:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+
+
+def test_messages_are_rendered_in_order():
+    render_ahead = RenderAhead(items(5), render_simple(), depth=2)
+    taken = []
+    while True:
+        item = take(render_ahead)
+        if item is None:
+            break
+        taken.append(item)
+
+    assert [item.index for item in taken] == [1, 2, 3, 4, 5]
+    assert taken[0].payload == render_simple()(taken[0].recipient)
+
+
+def test_buffer_is_bounded_by_depth():
+    rendered = []
+
+    def render(recipient):
+        rendered.append(recipient['email'])
+        return render_simple()(recipient)
+
+    render_ahead = RenderAhead(items(20), render, depth=2)
+    time.sleep(0.3)
+    # バッファの2件と、空きを待っている1件だけが作成済み
+    assert len(rendered) == 3
+
+    assert take(render_ahead).index == 1
+    time.sleep(0.3)
+    assert len(rendered) == 4
+    render_ahead.close()
+
+
+def test_close_returns_unsent_items_without_reading_ahead():
+    pulled = []
+
+    def recipients():
+        for item in items(10):
+            pulled.append(item.index)
+            yield item
+
+    render_ahead = RenderAhead(recipients(), render_simple(), depth=2)
+    time.sleep(0.3)
+    assert take(render_ahead).index == 1
+
+    rest = render_ahead.close()
+    assert pulled == [1, 2, 3, 4]
+    assert [item.index for item in rest] == list(range(2, 11))
+
+
+def test_render_error_is_kept_on_the_item():
+    def render(recipient):
+        if recipient['email'] == 'user2@example.com':
+            raise FileNotFoundError('attachment.pdf')
+        return render_simple()(recipient)
+
+    render_ahead = RenderAhead(items(3), render, depth=3)
+    assert take(render_ahead).payload[1] == ['user1@example.com']
+    assert isinstance(take(render_ahead).payload, FileNotFoundError)
+    render_ahead.close()
+
+
+def test_pool_renders_off_the_sending_threads(smtp_server, make_sender):
+    render_threads = set()
+    send_threads = set()
+
+    def render(recipient):
+        render_threads.add(threading.current_thread().name)
+        return render_simple()(recipient)
+
+    def before_send(item):
+        send_threads.add(threading.current_thread().name)
+        return True
+
+    pool = SmtpConnectionPool(make_sender(smtp_server), connections=2, render_ahead=4)
+    pool.before_send = before_send
+    summary = pool.run(make_recipients(12), render)
+
+    assert summary.delivered == 12
+    assert len(render_threads) == 1
+    assert not render_threads & send_threads
+
+
+def test_pool_reports_render_failures_and_sends_the_rest(smtp_server, make_sender):
+    def render(recipient):
+        if recipient['email'] == 'user2@example.com':
+            raise FileNotFoundError('attachment.pdf')
+        return render_simple()(recipient)
+
+    summary = SmtpConnectionPool(make_sender(smtp_server), render_ahead=2).run(make_recipients(4), render)
+
+    assert (summary.delivered, summary.failed) == (3, 1)
+    assert 'user2@example.com' not in smtp_server.recipients()
+
+
+def test_recipient_list_error_is_raised_after_sending_what_was_read(smtp_server, make_sender):
+    def recipients():
+        yield from make_recipients(3)
+        raise ValueError('broken row')
+
+    send_queue = SendQueue.from_recipients(recipients())
+    with pytest.raises(ValueError):
+        SmtpConnectionPool(make_sender(smtp_server), render_ahead=2).run_queue(send_queue, render_simple(), 10)
+    assert len(smtp_server.messages) == 3
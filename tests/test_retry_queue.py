@@ -0,0 +1,184 @@
+"""RetryPolicy と SendQueue（一時的なエラーの再送キュー）のテスト"""
+import smtplib
+
+import pytest
+
+import email_bulk_sender
+from conftest import make_recipients, render_simple
+from email_bulk_sender import RetryPolicy, SendItem, SendQueue, SmtpConnectionPool, _is_transient_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(email_bulk_sender.time, 'monotonic', clock)
+    return clock
+
+
+def fast_retries(max_retries=2):
+    return RetryPolicy(max_retries=max_retries, base_delay=0.01, max_delay=0.05, jitter=0)
+
+
+def test_delay_doubles_up_to_the_maximum():
+    policy = RetryPolicy(base_delay=60, max_delay=300, jitter=0)
+    assert [policy.delay(attempt) for attempt in range(5)] == [60, 120, 240, 300, 300]
+
+
+def test_jitter_only_shortens_the_delay(monkeypatch):
+    policy = RetryPolicy(base_delay=60, jitter=0.5)
+    monkeypatch.setattr(email_bulk_sender.random, 'random', lambda: 1.0)
+    assert policy.delay(0) == pytest.approx(30)
+    monkeypatch.setattr(email_bulk_sender.random, 'random', lambda: 0.0)
+    assert policy.delay(0) == pytest.approx(60)
+
+
+def test_from_config():
+    assert RetryPolicy.from_config({'enabled': False}).max_retries == 0
+    policy = RetryPolicy.from_config({'max_retries': 5, 'base_delay': 10})
+    assert (policy.max_retries, policy.base_delay, policy.max_delay) == (5, 10, 1800)
+
+
+@pytest.mark.parametrize('error, expected', [
+    (smtplib.SMTPRecipientsRefused({'a@example.com': (451, b'later')}), True),
+    (smtplib.SMTPRecipientsRefused({'a@example.com': (550, b'unknown')}), False),
+    (smtplib.SMTPDataError(452, b'full'), True),
+    (smtplib.SMTPDataError(554, b'rejected'), False),
+    (smtplib.SMTPServerDisconnected('gone'), True),
+    (FileNotFoundError('attachment.pdf'), False),
+])
+def test_is_transient_error(error, expected):
+    assert _is_transient_error(error) is expected
+
+
+def test_due_retries_are_interleaved_with_fresh_recipients(clock):
+    send_queue = SendQueue.from_recipients(make_recipients(3))
+
+    first, _ = send_queue.next_item()
+    send_queue.task_done(first)
+    send_queue.defer(SendItem(first.index, first.recipient, 1), 10)
+
+    # 再送予定時刻までは新しい受信者を先に払い出す
+    second, _ = send_queue.next_item()
+    assert second.index == 2
+    send_queue.task_done(second)
+
+    clock.now += 10
+    retry, _ = send_queue.next_item()
+    assert (retry.index, retry.attempt) == (1, 1)
+    send_queue.task_done(retry)
+    third, _ = send_queue.next_item()
+    assert third.index == 3
+    send_queue.task_done(third)
+
+    assert send_queue.next_item() == (None, None)
+
+
+def test_waiting_retry_reports_time_until_due(clock):
+    send_queue = SendQueue.from_recipients(make_recipients(1))
+    item, _ = send_queue.next_item()
+    send_queue.task_done(item)
+    send_queue.defer(SendItem(item.index, item.recipient, 1), 30)
+
+    assert send_queue.next_item() == (None, pytest.approx(30))
+    assert [i.index for i in send_queue.drain()] == [1]
+    assert send_queue.next_item() == (None, None)
+
+
+def test_drain_reads_remaining_recipients_lazily(clock):
+    read = []
+
+    def recipients():
+        for recipient in make_recipients(5):
+            read.append(recipient['email'])
+            yield recipient
+
+    send_queue = SendQueue.from_recipients(recipients())
+    item, _ = send_queue.next_item()
+    send_queue.task_done(item)
+    send_queue.defer(SendItem(item.index, item.recipient, 1), 30)
+
+    drained = send_queue.drain()
+    assert len(read) == 1
+    assert next(drained).index == 1
+    assert len(read) == 1
+    assert [i.index for i in drained] == [2, 3, 4, 5]
+    assert send_queue.next_item() == (None, None)
+
+
+def test_drain_stops_at_a_read_error(clock):
+    def recipients():
+        yield from make_recipients(2)
+        raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid start byte')
+
+    send_queue = SendQueue.from_recipients(recipients())
+
+    assert [i.index for i in send_queue.drain()] == [1, 2]
+    assert isinstance(send_queue.error, UnicodeDecodeError)
+
+
+def test_in_flight_items_keep_the_queue_open(clock):
+    send_queue = SendQueue.from_recipients(make_recipients(1))
+    item, _ = send_queue.next_item()
+    assert send_queue.next_item() == (None, 0.5)
+    send_queue.task_done(item)
+    assert send_queue.next_item() == (None, None)
+
+
+def test_transient_refusal_is_retried_until_delivered(smtp_server, make_sender):
+    results = []
+    recipients = make_recipients(2) + [{'affiliation': '', 'name': 'x', 'email': 'once@example.com'}]
+    pool = SmtpConnectionPool(make_sender(smtp_server), retry_policy=fast_retries(),
+                              on_result=lambda result, done, total: results.append((result.status, done)))
+
+    summary = pool.run(recipients, render_simple())
+
+    assert (summary.delivered, summary.retried, summary.failed_total) == (3, 1, 0)
+    # 再送待ちの結果は完了件数に含めない
+    assert results == [('sent', 1), ('sent', 2), ('deferred', 2), ('sent', 3)]
+    assert smtp_server.recipients().count('once@example.com') == 1
+
+
+def test_persistent_transient_refusal_gives_up(smtp_server, make_sender):
+    statuses = []
+    recipients = [{'affiliation': '', 'name': 'x', 'email': 'tempfail@example.com'}]
+    pool = SmtpConnectionPool(make_sender(smtp_server), retry_policy=fast_retries(2),
+                              on_result=lambda result, done, total: statuses.append(result.status))
+
+    summary = pool.run(recipients, render_simple())
+
+    assert statuses == ['deferred', 'deferred', 'gave_up']
+    assert (summary.delivered, summary.failed, summary.gave_up) == (0, 0, 1)
+
+
+def test_permanent_refusal_is_not_retried(smtp_server, make_sender):
+    statuses = []
+    recipients = [{'affiliation': '', 'name': 'x', 'email': 'perm@example.com'}]
+    pool = SmtpConnectionPool(make_sender(smtp_server), retry_policy=fast_retries(),
+                              on_result=lambda result, done, total: statuses.append(result.status))
+
+    summary = pool.run(recipients, render_simple())
+
+    assert statuses == ['failed']
+    assert summary.failed == 1
+    assert smtp_server.commands.count('RCPT') == 1
+
+
+def test_retry_is_sent_only_to_refused_addresses(smtp_server, make_sender):
+    def render(recipient):
+        data = b"Subject: test\r\n\r\nHello\r\n"
+        return 'sender@example.com', [recipient['email'], 'cc@example.com', 'perm-cc@example.com'], data
+
+    recipients = [{'affiliation': '', 'name': 'x', 'email': 'once@example.com'}]
+    summary = SmtpConnectionPool(make_sender(smtp_server), retry_policy=fast_retries()).run(recipients, render)
+
+    assert summary.delivered == 1
+    # CCには1回目で届いているため、再送は一時的なエラーで拒否された To にだけ送る
+    assert [rcpts for _, rcpts, _ in smtp_server.messages] == [['cc@example.com'], ['once@example.com']]
@@ -0,0 +1,130 @@
+"""SendController（送信の一時停止・再開・中止）のテスト"""
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+
+from conftest import make_recipients, render_simple
+from email_bulk_sender import AsyncSendEngine, EmailBulkSender, RateLimiter, SendController, SmtpConnectionPool
+
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(SendController, 'POLL_INTERVAL', 0.01)
+
+
+def checkpoint_in_thread(controller):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(controller.checkpoint()), daemon=True)
+    thread.start()
+    return thread, result
+
+
+def test_checkpoint_waits_while_paused():
+    controller = SendController()
+    assert controller.checkpoint() is True
+
+    controller.pause()
+    thread, result = checkpoint_in_thread(controller)
+    thread.join(0.1)
+    assert thread.is_alive()
+
+    controller.resume()
+    thread.join(1)
+    assert result == [True]
+
+
+def test_cancel_releases_paused_workers():
+    controller = SendController()
+    controller.pause()
+    thread, result = checkpoint_in_thread(controller)
+
+    controller.cancel()
+    thread.join(1)
+
+    assert result == [False]
+    assert controller.cancelled and not controller.paused
+
+
+def test_async_checkpoint():
+    controller = SendController()
+    controller.pause()
+
+    async def run():
+        waiting = asyncio.ensure_future(controller.checkpoint_async())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        controller.resume()
+        return await waiting
+
+    assert asyncio.run(run()) is True
+    controller.cancel()
+    assert asyncio.run(controller.checkpoint_async()) is False
+
+
+@pytest.mark.parametrize('pool_class', [SmtpConnectionPool, AsyncSendEngine])
+def test_pause_holds_sending_until_resumed(smtp_server, make_sender, pool_class):
+    controller = SendController()
+    pool = pool_class(make_sender(smtp_server), connections=2, controller=controller)
+
+    def on_result(result, done, total):
+        if done == 2:
+            controller.pause()
+
+    pool.on_result = on_result
+    runner = threading.Thread(target=pool.run, args=(make_recipients(10), render_simple()), daemon=True)
+    runner.start()
+    time.sleep(0.5)
+
+    # 送信中だったメッセージだけは送り切る
+    held = len(smtp_server.messages)
+    assert 2 <= held <= 4
+    time.sleep(0.2)
+    assert len(smtp_server.messages) == held
+
+    controller.resume()
+    runner.join(5)
+    assert not runner.is_alive()
+    assert pool.summary.delivered == 10
+
+
+@pytest.mark.parametrize('pool_class', [SmtpConnectionPool, AsyncSendEngine])
+def test_cancel_interrupts_rate_limit_wait(smtp_server, make_sender, pool_class):
+    controller = SendController()
+    pool = pool_class(make_sender(smtp_server), controller=controller,
+                      rate_limiter=RateLimiter.from_config({'per_minute': 1}))
+    threading.Timer(0.3, controller.cancel).start()
+
+    start = time.monotonic()
+    summary = pool.run(make_recipients(5), render_simple())
+
+    assert time.monotonic() - start < 3
+    assert summary.delivered == 1
+    # 中止した場合、未送信の受信者は失敗として報告しない
+    assert summary.failed_total == 0
+
+
+def test_ctrl_c_pauses_then_cancels(monkeypatch, capsys):
+    monkeypatch.setattr('sys.stdin', io.StringIO(''))
+    controller = SendController()
+
+    EmailBulkSender._handle_interrupt(controller)
+    assert controller.paused and not controller.cancelled
+
+    EmailBulkSender._handle_interrupt(controller)
+    assert controller.cancelled
+    assert '中止' in capsys.readouterr().out
+
+
+def test_enter_resumes_after_ctrl_c(monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO('\n'))
+    controller = SendController()
+
+    EmailBulkSender._handle_interrupt(controller)
+
+    deadline = time.monotonic() + 2
+    while controller.paused and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not controller.paused and not controller.cancelled
@@ -0,0 +1,101 @@
+"""SendJournal（送信結果のジャーナルと中断からの再開）のテスト"""
+import smtplib
+import sqlite3
+
+from conftest import make_recipients, render_simple
+from email_bulk_sender import SendJournal, SendResult, SmtpConnectionPool
+
+
+def test_results_survive_reopening(tmp_path):
+    path = tmp_path / 'journal.sqlite3'
+    journal = SendJournal(path, 'campaign', batch_size=100, flush_interval=3600)
+    journal.record('a@example.com', 'sent')
+    journal.record('b@example.com', 'deferred', '451 try later')
+    journal.record('c@example.com', 'failed', '550 no such user')
+    journal.close()
+
+    journal = SendJournal(path, 'campaign')
+    assert journal.delivered() == {'a@example.com'}
+    recipients = make_recipients(1) + [{'email': 'a@example.com'}, {'email': 'b@example.com'}]
+    assert journal.pending(recipients) == [recipients[0], recipients[2]]
+    journal.close()
+
+
+def test_records_are_committed_in_batches(tmp_path):
+    path = tmp_path / 'journal.sqlite3'
+    journal = SendJournal(path, 'campaign', batch_size=2, flush_interval=3600)
+
+    def committed():
+        with sqlite3.connect(str(path)) as db:
+            return db.execute("SELECT COUNT(*) FROM outcomes").fetchone()[0]
+
+    journal.record('a@example.com', 'sent')
+    assert committed() == 0
+    journal.record('b@example.com', 'sent')
+    assert committed() == 2
+    journal.close()
+
+
+def test_campaigns_are_kept_apart(tmp_path):
+    path = tmp_path / 'journal.sqlite3'
+    first = SendJournal(path, SendJournal.campaign_id('list.csv', 'a.txt'))
+    first.record('a@example.com', 'sent')
+    first.close()
+
+    second = SendJournal(path, SendJournal.campaign_id('list.csv', 'b.txt'))
+    assert second.delivered() == set()
+    second.close()
+
+
+def test_sent_count_is_per_sender(tmp_path):
+    journal = SendJournal(tmp_path / 'journal.sqlite3', 'campaign')
+    journal.record_result(SendResult(1, {'email': 'a@example.com'}), 'one@example.com')
+    journal.record_result(SendResult(2, {'email': 'b@example.com'}), 'one@example.com')
+    journal.record_result(SendResult(3, {'email': 'c@example.com'}), 'two@example.com')
+    journal.record_result(SendResult(4, {'email': 'd@example.com'}, smtplib.SMTPResponseException(550, b'no')),
+                          'one@example.com')
+
+    assert journal.sent_count('one@example.com') == 2
+    assert journal.sent_count('two@example.com') == 1
+    journal.close()
+
+
+def test_old_journal_gains_sender_column(tmp_path):
+    path = tmp_path / 'journal.sqlite3'
+    with sqlite3.connect(str(path)) as db:
+        db.execute("CREATE TABLE outcomes (id INTEGER PRIMARY KEY, campaign TEXT NOT NULL, email TEXT NOT NULL, "
+                   "status TEXT NOT NULL, detail TEXT, ts REAL NOT NULL)")
+        db.execute("INSERT INTO outcomes (campaign, email, status, detail, ts) "
+                   "VALUES ('campaign', 'a@example.com', 'sent', '', 0)")
+
+    journal = SendJournal(path, 'campaign')
+    journal.record('b@example.com', 'sent', sender='one@example.com')
+    assert journal.delivered() == {'a@example.com', 'b@example.com'}
+    journal.close()
+
+
+def test_interrupted_run_resumes_with_pending_recipients(tmp_path, smtp_server, make_sender):
+    path = tmp_path / 'journal.sqlite3'
+    recipients = make_recipients(6)
+
+    # 3件送った時点で中断する
+    journal = SendJournal(path, 'campaign')
+    pool = SmtpConnectionPool(make_sender(smtp_server), journal=journal)
+
+    def on_result(result, done, total):
+        if done == 3:
+            pool.controller.cancel()
+
+    pool.on_result = on_result
+    pool.run(recipients, render_simple())
+    journal.close()
+    assert len(smtp_server.messages) == 3
+
+    journal = SendJournal(path, 'campaign')
+    pending = journal.pending(recipients)
+    assert pending == recipients[3:]
+    SmtpConnectionPool(make_sender(smtp_server), journal=journal).run(pending, render_simple())
+    assert journal.delivered() == {r['email'] for r in recipients}
+    journal.close()
+
+    assert sorted(smtp_server.recipients()) == sorted(r['email'] for r in recipients)
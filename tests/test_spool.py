@@ -0,0 +1,125 @@
+"""Spool（送信待ちスプールの準備と別プロセスからの送信）のテスト"""
+import email
+import os
+import threading
+
+from conftest import PlainSender, make_recipients
+from email_bulk_sender import EmailBulkSender, SendController, Spool, SpoolEntry, SpoolSink, StreamedMessage
+
+SUBJECT = '{氏名}様へのご案内'
+BODY = '{所属}\n{氏名} 様\n'
+
+
+def prepare(spool_dir, recipients, **options):
+    sender = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+    sink = SpoolSink(spool_dir)
+    summary = sender.send_recipients(recipients, SUBJECT, BODY, sink=sink, **options)
+    return sink, summary
+
+
+def drain(server, spool_dir, **options):
+    sender = PlainSender('sender@example.com', 'password', server.host, server.port)
+    return sender.drain_spool(str(spool_dir), delay=0, poll_interval=0.05, **options)
+
+
+def test_prepare_writes_one_file_per_recipient(tmp_path):
+    spool_dir = tmp_path / 'spool'
+    sink, summary = prepare(spool_dir, make_recipients(3))
+
+    spool = Spool(spool_dir)
+    assert summary.delivered == 3
+    assert spool.pending() == ['00000001.msg', '00000002.msg', '00000003.msg']
+    assert spool.prepared
+    assert spool.read_index()['prepared'] == 3
+    assert os.listdir(spool_dir / 'tmp') == []
+
+    entry = SpoolEntry(spool, '00000002.msg')
+    assert entry['name'] == 'Name 2'
+    from_addr, to_addrs, data = spool.render(entry)
+    assert (from_addr, to_addrs) == ('sender@example.com', ['user2@example.com'])
+    assert email.message_from_bytes(data)['To'] == 'user2@example.com'
+
+
+def test_prepare_again_keeps_existing_files(tmp_path):
+    spool_dir = tmp_path / 'spool'
+    prepare(spool_dir, make_recipients(2))
+    Spool(spool_dir).finish(SpoolEntry(Spool(spool_dir), '00000001.msg'), True)
+
+    sink, summary = prepare(spool_dir, make_recipients(3))
+
+    assert sink.written == 1
+    assert Spool(spool_dir).pending() == ['00000002.msg', '00000003.msg']
+    assert Spool(spool_dir).read_index()['prepared'] == 3
+
+
+def test_cancelled_prepare_is_not_complete(tmp_path):
+    controller = SendController()
+
+    def on_result(result, done, total):
+        if done == 2:
+            controller.cancel()
+
+    prepare(tmp_path, make_recipients(5), on_result=on_result, controller=controller)
+
+    assert len(Spool(tmp_path).pending()) == 2
+    assert not Spool(tmp_path).prepared
+
+
+def test_large_messages_are_streamed_from_the_spool(tmp_path):
+    prepare(tmp_path, make_recipients(1))
+    spool = Spool(tmp_path)
+    entry = SpoolEntry(spool, '00000001.msg')
+
+    _, _, data = spool.render(entry, stream_threshold=1)
+
+    assert isinstance(data, StreamedMessage)
+    assert b''.join(data.chunks()) == spool.render(entry)[2]
+
+
+def test_drain_sends_and_moves_files(tmp_path, smtp_server):
+    recipients = make_recipients(3) + [{'affiliation': '', 'name': 'x', 'email': 'perm@example.com'}]
+    prepare(tmp_path, recipients)
+
+    summary = drain(smtp_server, tmp_path)
+
+    assert (summary.delivered, summary.failed) == (3, 1)
+    assert sorted(smtp_server.recipients()) == sorted(r['email'] for r in recipients[:3])
+    assert sorted(os.listdir(tmp_path / 'cur')) == ['00000001.msg', '00000002.msg', '00000003.msg']
+    assert os.listdir(tmp_path / 'failed') == ['00000004.msg']
+    assert Spool(tmp_path).pending() == []
+
+
+def test_drain_waits_until_preparation_completes(tmp_path, smtp_server):
+    sink = SpoolSink(tmp_path)
+    sink.open()
+    sink.write(1, 'sender@example.com', ['user1@example.com'], b'Subject: 1\r\n\r\nfirst\r\n')
+    result = []
+    drainer = threading.Thread(target=lambda: result.append(drain(smtp_server, tmp_path)), daemon=True)
+    drainer.start()
+
+    drainer.join(0.5)
+    assert drainer.is_alive()
+    sink.write(2, 'sender@example.com', ['user2@example.com'], b'Subject: 2\r\n\r\nsecond\r\n')
+    sink.completed = True
+    sink.close()
+
+    drainer.join(5)
+    assert not drainer.is_alive()
+    assert result[0].delivered == 2
+    assert smtp_server.recipients() == ['user1@example.com', 'user2@example.com']
+
+
+def test_uncertain_delivery_is_not_resent(tmp_path, smtp_server):
+    prepare(tmp_path, make_recipients(2))
+    smtp_server.drop_after_data = 1
+
+    summary = drain(smtp_server, tmp_path)
+
+    assert (summary.delivered, summary.failed) == (1, 1)
+    assert smtp_server.recipients() == ['user1@example.com', 'user2@example.com']
+    assert os.listdir(tmp_path / 'failed') == ['00000001.msg']
+
+
+def test_missing_spool(tmp_path, smtp_server, capsys):
+    assert drain(smtp_server, tmp_path / 'missing') is None
+    assert 'スプールディレクトリが見つかりません' in capsys.readouterr().out
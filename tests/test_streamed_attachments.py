@@ -0,0 +1,105 @@
+"""StreamedAttachment（大きな添付ファイルを送信時に読み込む）のテスト"""
+import email
+import os
+
+import pytest
+
+from conftest import PlainSender
+from email_bulk_sender import (AttachmentCache, CachedAttachment, EmailBulkSender, MessageSkeleton,
+                               SmtpConnectionPool, StreamedAttachment, StreamedMessage, _data_chunks,
+                               _dot_stuff, _flatten_message)
+
+BOUNDARY = '===============0000000000000000042=='
+RECIPIENT = {'affiliation': '株式会社ABC', 'name': '山田太郎', 'email': 'yamada@example.com'}
+
+
+@pytest.fixture
+def large_file(tmp_path):
+    # CHUNK_SIZE の倍数にならない、複数チャンクにまたがるサイズ
+    path = tmp_path / 'large.bin'
+    path.write_bytes(os.urandom(StreamedAttachment.CHUNK_SIZE * 2 + 1000))
+    return str(path)
+
+
+def joined(data) -> bytes:
+    return b''.join(data.chunks()) if isinstance(data, StreamedMessage) else data
+
+
+def flatten(sender, attachments):
+    return _flatten_message(sender.create_message(
+        RECIPIENT['email'], RECIPIENT['name'], RECIPIENT['affiliation'], '{氏名}様', '本文です\n',
+        attachments=attachments, fields=RECIPIENT, boundary=BOUNDARY
+    ))
+
+
+def test_threshold_selects_streaming(large_file, tmp_path):
+    small = tmp_path / 'small.txt'
+    small.write_bytes(b'small')
+    cache = AttachmentCache(stream_threshold=1024)
+
+    assert isinstance(cache.get(large_file), StreamedAttachment)
+    part = cache.get(str(small))
+    assert isinstance(part, CachedAttachment) and not isinstance(part, StreamedAttachment)
+    assert not isinstance(AttachmentCache().get(large_file), StreamedAttachment)
+
+
+def test_chunks_match_in_memory_encoding(large_file):
+    streamed = AttachmentCache(stream_threshold=1).get(large_file)
+    buffered = AttachmentCache().get(large_file)
+
+    chunks = list(streamed.chunks())
+    assert len(chunks) == 3
+    assert all(chunk.endswith(b'\r\n') for chunk in chunks)
+    assert b''.join(chunks) == buffered.get_payload().replace('\n', '\r\n').encode('ascii')
+
+
+def test_streamed_message_matches_buffered_message(large_file):
+    streaming = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+    streaming.attachment_cache = AttachmentCache(stream_threshold=1)
+    buffering = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+
+    from_addr, to_addrs, data = flatten(streaming, [large_file])
+    assert isinstance(data, StreamedMessage)
+    # 添付ファイルの本体はメモリに持たない
+    assert all(len(part) < 10000 for part in data.parts if isinstance(part, bytes))
+
+    assert (from_addr, to_addrs, joined(data)) == flatten(buffering, [large_file])
+
+
+def test_data_chunks_match_dot_stuffed_message(large_file, tmp_path):
+    dotted = tmp_path / 'dotted.txt'
+    dotted.write_bytes(b'.' * 200)
+    sender = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+    sender.attachment_cache = AttachmentCache(stream_threshold=1)
+
+    _, _, data = flatten(sender, [large_file, str(dotted)])
+
+    assert b''.join(_data_chunks(data)) == _dot_stuff(joined(data))
+
+
+def test_skeleton_streams_attachments(large_file):
+    sender = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+    sender.attachment_cache = AttachmentCache(stream_threshold=1)
+
+    from_addr, to_addrs, data = MessageSkeleton(sender, '{氏名}様', '本文です\n', attachments=[large_file],
+                                                boundary=BOUNDARY).render(RECIPIENT)
+
+    assert isinstance(data, StreamedMessage)
+    expected = flatten(sender, [large_file])
+    assert (from_addr, to_addrs, joined(data)) == (expected[0], expected[1], joined(expected[2]))
+
+
+@pytest.mark.parametrize('server_fixture', ['smtp_server', 'plain_smtp_server'])
+def test_streamed_attachment_is_delivered_intact(request, server_fixture, large_file):
+    server = request.getfixturevalue(server_fixture)
+    sender = PlainSender('sender@example.com', 'password', server.host, server.port)
+    sender.attachment_cache = AttachmentCache(stream_threshold=1)
+    render = EmailBulkSender._message_renderer(sender, '{氏名}様', '本文です\n', attachments=[large_file])
+
+    summary = SmtpConnectionPool(sender).run([RECIPIENT], render)
+
+    assert summary.delivered == 1
+    (_, _, data), = server.messages
+    part = [p for p in email.message_from_bytes(data).walk() if p.get_filename()][0]
+    with open(large_file, 'rb') as f:
+        assert part.get_payload(decode=True) == f.read()
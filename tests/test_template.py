@@ -0,0 +1,54 @@
+"""CompiledTemplate（任意の列を差し込めるテンプレート）のテスト"""
+import email
+
+from email_bulk_sender import CompiledTemplate, EmailBulkSender, _column_keys, compile_template
+
+
+def test_japanese_and_english_placeholders_use_the_same_keys():
+    template = CompiledTemplate('{所属}\n{氏名} 様 <{email}>')
+    assert template.fields == ['affiliation', 'name', 'email']
+    assert template.render({'affiliation': '株式会社ABC', 'name': '山田太郎', 'email': 'yamada@example.com'}) == \
+        '株式会社ABC\n山田太郎 様 <yamada@example.com>'
+
+
+def test_arbitrary_columns_are_substituted():
+    template = CompiledTemplate('{ name } さんの会員番号は{会員番号}です')
+    assert template.fields == ['name', '会員番号']
+    assert template.render({'name': '佐藤', '会員番号': 'A-001'}) == '佐藤 さんの会員番号はA-001です'
+
+
+def test_unknown_placeholders_and_braces_are_kept():
+    template = CompiledTemplate('{氏名} 様 {未定義} {} {{x}}\n{改行\nを含む}')
+    assert template.render({'name': '山田'}) == '山田 様 {未定義} {} {{x}}\n{改行\nを含む}'
+
+
+def test_text_without_placeholders_is_returned_as_is():
+    assert CompiledTemplate('').render({}) == ''
+    assert CompiledTemplate('ご案内').render({'name': 'x'}) == 'ご案内'
+
+
+def test_compile_template_reuses_compiled_templates():
+    template = compile_template('{氏名} 様')
+    assert compile_template('{氏名} 様') is template
+    assert compile_template(template) is template
+
+
+def test_column_keys_from_header():
+    assert _column_keys(['所属', ' 氏名 ', 'メールアドレス', '会員番号', '', None]) == \
+        ['affiliation', 'name', 'email', '会員番号', None, None]
+    # 日本語と英語の列が両方ある場合は日本語の列を使う
+    assert _column_keys(['email', 'メールアドレス']) == [None, 'email']
+
+
+def test_create_message_substitutes_every_column():
+    sender = EmailBulkSender('sender@example.com', 'password', 'smtp.example.com', 587)
+    fields = {'affiliation': '株式会社ABC', 'name': '山田太郎', 'email': 'yamada@example.com', 'プラン': 'ゴールド'}
+
+    msg = sender.create_message('yamada@example.com', '山田太郎', '株式会社ABC', '{氏名}様 {プラン}プランのご案内',
+                                '{所属}\n{氏名} 様\nプラン: {プラン}', fields=fields)
+
+    parsed = email.message_from_bytes(msg.as_bytes())
+    subject = str(email.header.make_header(email.header.decode_header(parsed['Subject'])))
+    assert subject == '山田太郎様 ゴールドプランのご案内'
+    body = parsed.get_payload()[0].get_payload(decode=True).decode('utf-8')
+    assert body == '株式会社ABC\n山田太郎 様\nプラン: ゴールド'